@@ -0,0 +1,98 @@
+# coding=utf-8
+"""Compare the precompiled command encoders with the original _mesg and the dict + json.dumps fallback.
+
+The original _mesg rebuilt its handler table on every call before serializing
+the command dict; baseline_mesg below is that implementation, kept for the
+comparison.
+
+    python benchmark/bench_encode.py
+"""
+import os
+import sys
+import json
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from roarm_sdk.generate import CommandGenerator
+from roarm_sdk import common
+from roarm_sdk.common import JsonCmd
+
+CASES = {
+    "roarm_m2": [
+        ("joint_radian_ctrl", JsonCmd.JOINT_RADIAN_CTRL, (1, 1.5708, 1000, 50)),
+        ("joints_radian_ctrl", JsonCmd.JOINTS_RADIAN_CTRL, ([0.1, -0.4, 1.5708, 0.7], 1000, 50)),
+        ("joints_angle_ctrl", JsonCmd.JOINTS_ANGLE_CTRL, ([10, -20, 90, 45], 1000, 50)),
+        ("pose_ctrl", JsonCmd.POSE_CTRL, ([235, 0, 234, 0],)),
+        ("led_ctrl", JsonCmd.LED_CTRL, (128,)),
+    ],
+    "roarm_m3": [
+        ("joint_radian_ctrl", JsonCmd.JOINT_RADIAN_CTRL, (1, 1.5708, 1000, 50)),
+        ("joints_radian_ctrl", JsonCmd.JOINTS_RADIAN_CTRL, ([0.1, -0.4, 1.5708, 0.2, 0.3, 0.7], 1000, 50)),
+        ("joints_angle_ctrl", JsonCmd.JOINTS_ANGLE_CTRL, ([10, -20, 90, 10, 20, 45], 1000, 50)),
+        ("pose_ctrl", JsonCmd.POSE_CTRL, ([235, 0, 234, 0, 0, 45],)),
+        ("led_ctrl", JsonCmd.LED_CTRL, (128,)),
+    ],
+}
+
+
+def baseline_mesg(generator, genre, *args):
+    """_mesg as first released, the handler table is built for every command"""
+    command_data = []
+    for arg in args:
+        if isinstance(arg, list):
+            command_data.extend(arg)
+        else:
+            command_data.append(arg)
+    switch_dict = {
+        JsonCmd.ECHO_SET: common.handle_echo_or_torque_set,
+        JsonCmd.MIDDLE_SET: common.handle_middle_set,
+        JsonCmd.LED_CTRL: common.handle_led_ctrl,
+        JsonCmd.TORQUE_SET: common.handle_echo_or_torque_set,
+        JsonCmd.DYNAMIC_ADAPTATION_SET: common.handle_dynamic_adaptation_set,
+        JsonCmd.JOINT_RADIAN_CTRL: common.handle_joint_radian_ctrl,
+        JsonCmd.JOINTS_RADIAN_CTRL: common.handle_joints_radian_ctrl,
+        JsonCmd.JOINT_ANGLE_CTRL: common.handle_joint_angle_ctrl,
+        JsonCmd.JOINTS_ANGLE_CTRL: common.handle_joints_angle_ctrl,
+        JsonCmd.GRIPPER_MODE_SET: common.handle_gripper_mode_set,
+        JsonCmd.POSE_CTRL: common.handle_pose_ctrl,
+        JsonCmd.WIFI_ON_BOOT: common.handle_wifi_on_boot,
+        JsonCmd.AP_SET: common.handle_ap_or_sta_set,
+        JsonCmd.STA_SET: common.handle_ap_or_sta_set,
+        JsonCmd.APSTA_SET: common.handle_ap_sta_set,
+        JsonCmd.WIFI_CONFIG_CREATE_BY_INPUT: common.handle_ap_sta_set
+    }
+    command = {"T": genre}
+    if command_data and genre in switch_dict:
+        command = switch_dict[genre](generator.type, command, command_data)
+    return (json.dumps(command) + "\n").encode()
+
+
+def bench(number=20000):
+    results = []
+    for roarm_type, cases in CASES.items():
+        generator = CommandGenerator(roarm_type)
+        for name, genre, args in cases:
+            fast = generator._mesg(genre, *args)
+            generic = generator._mesg_generic(genre, generator._process_data_command(args))
+            original = baseline_mesg(generator, genre, *args)
+            assert fast == generic == original, (fast, generic, original)
+            t_original = min(timeit.repeat(lambda: baseline_mesg(generator, genre, *args),
+                                           number=number, repeat=3)) / number
+            t_generic = min(timeit.repeat(
+                lambda: generator._mesg_generic(genre, generator._process_data_command(args)),
+                number=number, repeat=3)) / number
+            t_fast = min(timeit.repeat(lambda: generator._mesg(genre, *args), number=number, repeat=3)) / number
+            results.append((roarm_type, name, t_original, t_generic, t_fast))
+    return results
+
+
+def main():
+    print(f"{'arm':<10}{'command':<22}{'original us':>13}{'json.dumps us':>15}{'compiled us':>14}{'speedup':>10}")
+    for roarm_type, name, t_original, t_generic, t_fast in bench():
+        print(f"{roarm_type:<10}{name:<22}{t_original * 1e6:>13.2f}{t_generic * 1e6:>15.2f}{t_fast * 1e6:>14.2f}"
+              f"{t_original / t_fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# coding=utf-8
+"""Measure the cold start time of the SDK and print the results as JSON.
+
+    python benchmark/bench_import.py [--runs 20] [--output results.json]
+
+Every case runs in a fresh interpreter: "import roarm_sdk", the encode
+only CommandGenerator, and importing plus constructing a serial roarm
+connected to the simulator on a pseudo terminal (POSIX only). The
+optional modules each case ended up importing are listed as well.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+# imported by some transports or features only
+OPTIONAL_MODULES = ("serial", "requests", "urllib3", "asyncio", "numpy", "logging.handlers")
+
+CASES = {
+    "import roarm_sdk": "import roarm_sdk",
+    "import CommandGenerator": "from roarm_sdk.generate import CommandGenerator",
+    "serial roarm": "from roarm_sdk import roarm\n"
+                    "arm = roarm(roarm_type='roarm_m2', port=PORT)\n"
+                    "arm.disconnect()",
+}
+
+CHILD = """
+import sys, time, json
+PORT = {port!r}
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "modules": [m for m in {modules!r} if m in sys.modules]}}))
+"""
+
+
+def run_case(code, port, runs):
+    source = CHILD.format(port=port, code=code, modules=OPTIONAL_MODULES)
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    seconds = []
+    wall = []
+    modules = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", source], env=env, check=True,
+                                stdout=subprocess.PIPE).stdout
+        wall.append(time.perf_counter() - start)
+        result = json.loads(output.decode().strip().splitlines()[-1])
+        seconds.append(result["seconds"])
+        modules = result["modules"]
+    return {
+        "median_ms": statistics.median(seconds) * 1000,
+        "min_ms": min(seconds) * 1000,
+        "process_median_ms": statistics.median(wall) * 1000,
+        "optional_modules": modules,
+    }
+
+
+def bench(runs):
+    results = {}
+    simulator = None
+    port = None
+    if os.name == "posix":
+        from roarm_sdk.simulator import PtySimulator, VirtualRoarm
+        simulator = PtySimulator(VirtualRoarm("roarm_m2")).start()
+        port = simulator.port
+    try:
+        for name, code in CASES.items():
+            if "PORT" in code and port is None:
+                continue
+            results[name] = run_case(code, port, runs)
+    finally:
+        if simulator is not None:
+            simulator.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20, help="fresh interpreters per case")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.time(),
+            "runs": args.runs,
+        },
+        "cold_start": bench(args.runs),
+    }
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
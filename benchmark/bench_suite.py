@@ -0,0 +1,265 @@
+# coding=utf-8
+"""Benchmark the SDK against the simulator and print the results as JSON.
+
+    python benchmark/bench_suite.py [--quick] [--output results.json]
+
+Measures commands/s per CommandGenerator method, feedback_get latency
+percentiles, ReadLine parse cost under fragmented and noisy input,
+calibration_parameters cost and memory growth while drag teaching.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from roarm_sdk.roarm import roarm
+from roarm_sdk.common import ReadLine
+from roarm_sdk.simulator import VirtualRoarm, SimulatedSerial
+from roarm_sdk.utils import calibration_parameters, RoarmDataException
+
+JOINTS = {
+    "roarm_m2": 4,
+    "roarm_m3": 6,
+}
+
+
+def method_cases(roarm_type):
+    n = JOINTS[roarm_type]
+    pose = [235, 0, 234, 0] if n == 4 else [235, 0, 234, 0, 0, 45]
+    return [
+        ("echo_set", {"cmd": 0}),
+        ("led_ctrl", {"led": 128}),
+        ("torque_set", {"cmd": 1}),
+        ("dynamic_adaptation_set", {"mode": 0, "torques": [200] * n}),
+        ("joint_radian_ctrl", {"joint": 1, "radian": 0.5, "speed": 1000, "acc": 50}),
+        ("joints_radian_ctrl", {"radians": [0.1, -0.4, 1.5708] + [0.2] * (n - 3), "speed": 1000, "acc": 50}),
+        ("joint_angle_ctrl", {"joint": 1, "angle": 30, "speed": 1000, "acc": 50}),
+        ("joints_angle_ctrl", {"angles": [10, -20, 90] + [20] * (n - 3), "speed": 1000, "acc": 50}),
+        ("gripper_radian_ctrl", {"radian": 0.5, "speed": 1000, "acc": 50}),
+        ("gripper_angle_ctrl", {"angle": 30, "speed": 1000, "acc": 50}),
+        ("pose_ctrl", {"pose": pose}),
+        ("move_init", {}),
+        ("feedback_get", {}),
+        ("joints_radian_get", {}),
+        ("joints_angle_get", {}),
+        ("gripper_radian_get", {}),
+        ("pose_get", {}),
+    ]
+
+
+def percentiles(samples, points=(50, 90, 99, 99.9)):
+    samples = sorted(samples)
+    result = {}
+    for p in points:
+        index = min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))
+        result[f"p{p:g}"] = samples[index]
+    result["mean"] = sum(samples) / len(samples)
+    result["max"] = samples[-1]
+    return result
+
+
+def simulated_arm(roarm_type, **kwargs):
+    device = VirtualRoarm(roarm_type, **kwargs)
+    return roarm(roarm_type=roarm_type, transport=SimulatedSerial(device))
+
+
+def bench_commands(duration):
+    results = {}
+    for roarm_type in JOINTS:
+        arm = simulated_arm(roarm_type)
+        results[roarm_type] = {}
+        for name, kwargs in method_cases(roarm_type):
+            method = getattr(arm, name)
+            count = 0
+            start = time.perf_counter()
+            end = start + duration
+            while True:
+                method(**kwargs)
+                count += 1
+                now = time.perf_counter()
+                if now >= end:
+                    break
+            results[roarm_type][name] = count / (now - start)
+        arm.disconnect()
+    return results
+
+
+def bench_feedback_latency(samples):
+    results = {}
+    for mode, kwargs in (
+            ("ideal", {}),
+            ("latency_1ms", {"latency": 0.001, "jitter": 0.0005}),
+    ):
+        arm = simulated_arm("roarm_m2", **kwargs)
+        latencies = []
+        for i in range(samples):
+            start = time.perf_counter()
+            arm.feedback_get()
+            latencies.append(time.perf_counter() - start)
+        arm.disconnect()
+        results[mode] = percentiles(latencies)
+    return results
+
+
+class ChunkedStream(object):
+    """Serial-like object returning prepared chunks, one per read."""
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.index = 0
+
+    @property
+    def in_waiting(self):
+        return len(self.chunks[self.index]) if self.index < len(self.chunks) else 0
+
+    def read(self, size=1):
+        if self.index >= len(self.chunks):
+            return b""
+        chunk = self.chunks[self.index]
+        self.index += 1
+        return chunk
+
+    def reset_input_buffer(self):
+        pass
+
+
+def feedback_stream(frames, noise, rng):
+    frame = json.dumps({"T": 1051, "x": 310.5, "y": 0.25, "z": 234.1, "b": 0.0123, "s": -0.0456,
+                        "e": 1.5708, "t": 3.1416, "torB": 0, "torS": 24, "torE": 12, "torH": 0}).encode() + b"\r\n"
+    data = bytearray()
+    for i in range(frames):
+        if noise and rng.random() < noise:
+            data += bytes(rng.randrange(256) for _ in range(rng.randrange(1, 32))).replace(b"{", b"")
+        data += frame
+    return bytes(data)
+
+
+def split(data, max_chunk, rng):
+    chunks = []
+    i = 0
+    while i < len(data):
+        n = rng.randrange(1, max_chunk + 1)
+        chunks.append(data[i:i + n])
+        i += n
+    return chunks
+
+
+def bench_parser(frames):
+    rng = random.Random(0)
+    cases = (
+        ("whole_frames", 0.0, None),
+        ("fragmented_1_16", 0.0, 16),
+        ("fragmented_1_4", 0.0, 4),
+        ("noisy_10pct", 0.1, 64),
+        ("noisy_50pct", 0.5, 64),
+    )
+    results = {}
+    for name, noise, max_chunk in cases:
+        data = feedback_stream(frames, noise, rng)
+        chunks = [data[i:i + 4096] for i in range(0, len(data), 4096)] if max_chunk is None else split(data, max_chunk, rng)
+        stream = ChunkedStream(chunks)
+        reader = ReadLine(stream)
+        reader.timeout = 0
+        parsed = 0
+        start = time.perf_counter()
+        while stream.index < len(chunks) or reader.frames:
+            if reader.readline() is not None:
+                parsed += 1
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "frames": parsed,
+            "chunks": len(chunks),
+            "us_per_frame": elapsed / max(parsed, 1) * 1e6,
+            "stats": reader.parser.stats(),
+        }
+    return results
+
+
+def bench_calibration(number):
+    cases = {
+        "joints_radian_m2": {"roarm_type": "roarm_m2",
+                             "radians": [0.1, -0.4, 1.5708, 0.7], "speed": 1000, "acc": 50},
+        "joints_angle_m3": {"roarm_type": "roarm_m3",
+                            "angles": [10, -20, 90, 10, 20, 45], "speed": 1000, "acc": 50},
+        "pose_m3": {"roarm_type": "roarm_m3", "pose": [235, 0, 234, 0, 0, 45]},
+        "invalid_joints_radian_m2": {"roarm_type": "roarm_m2",
+                                     "radians": [9.0, -0.4, 1.5708, 0.7], "speed": 1000, "acc": 50},
+    }
+    results = {}
+    for name, kwargs in cases.items():
+        start = time.perf_counter()
+        for i in range(number):
+            try:
+                calibration_parameters(**kwargs)
+            except RoarmDataException:
+                pass
+        results[name] = {"us_per_call": (time.perf_counter() - start) / number * 1e6}
+    return results
+
+
+def bench_drag_teach(duration, rate):
+    results = {}
+    directory = tempfile.mkdtemp(prefix="roarm-bench-")
+    for fmt in ("json", "rarm"):
+        arm = simulated_arm("roarm_m2")
+        filename = os.path.join(directory, f"drag_teach.{fmt}")
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        arm.drag_teach_start(filename, rate=rate, interactive=False)
+        time.sleep(duration)
+        current, peak = tracemalloc.get_traced_memory()
+        during = tracemalloc.take_snapshot()
+        count = arm.drag_teach_stop()
+        tracemalloc.stop()
+        growth = sum(stat.size_diff for stat in during.compare_to(before, "filename"))
+        results[fmt] = {
+            "samples": count,
+            "growth_bytes": growth,
+            "bytes_per_sample": growth / max(count, 1),
+            "peak_bytes": peak,
+            "file_bytes": os.path.getsize(filename),
+        }
+        os.remove(filename)
+        arm.disconnect()
+    os.rmdir(directory)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="shorter runs for a smoke test")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
+    scale = 0.1 if args.quick else 1.0
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "time": time.time(),
+                "quick": args.quick,
+            },
+            "commands_per_second": bench_commands(0.5 * scale),
+            "feedback_get_latency": bench_feedback_latency(int(2000 * scale)),
+            "readline_parse": bench_parser(int(20000 * scale)),
+            "calibration_parameters": bench_calibration(int(20000 * scale)),
+            "drag_teach_memory": bench_drag_teach(5.0 * scale, 100),
+        }
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
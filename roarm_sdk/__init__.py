@@ -1,7 +1,6 @@
 # coding=utf-8
 
 from __future__ import absolute_import
-import datetime
 from roarm_sdk.roarm import roarm
 from roarm_sdk.generate import CommandGenerator
 from roarm_sdk import utils
@@ -9,6 +8,7 @@ from roarm_sdk import utils
 __all__ = [   
     "roarm",
     "CommandGenerator",
+    "AsyncRoarm",
     "utils"
 ]
 
@@ -16,7 +16,16 @@ __version__ = "0.1.0"
 __author__ = "waveshareteam"
 __email__ = "2849678712@qq.com"
 __git_url__ = "https://github.com/waveshareteam/waveshare_roarm_sdk.git"
-__copyright__ = "".format(
-    datetime.datetime.now().year
-)
+__copyright__ = ""
 
+
+def __getattr__(name):
+    # asyncio is only imported for AsyncRoarm, serial and requests when a roarm opens its transport
+    if name == "AsyncRoarm":
+        from roarm_sdk.async_roarm import AsyncRoarm
+        return AsyncRoarm
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + ["AsyncRoarm"])
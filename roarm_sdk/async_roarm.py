@@ -0,0 +1,420 @@
+# coding=utf-8
+
+from __future__ import division
+import asyncio
+import json
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from roarm_sdk.generate import CommandGenerator
+from roarm_sdk.common import JsonCmd, FrameParser
+from roarm_sdk.logger import ThrottledLogger
+from roarm_sdk.state import ArmState
+from roarm_sdk.retry import RetryPolicy
+from roarm_sdk.utils import RoarmTimeoutException
+
+
+class AsyncSerialTransport(object):
+    """
+    Non-blocking serial transport for asyncio.
+
+    The port is opened with a zero timeout and read from the event loop
+    whenever data arrives, so no thread is needed for reading. Writes may
+    block while the output buffer is full and run in order on one worker
+    thread instead. A read error, e.g. once the adapter is unplugged, stops
+    reading, fails the pending feedback request and every later call with
+    that error, which is kept in self.error.
+    """
+    def __init__(self, port, baudrate=115200, timeout=0.1, poll_interval=0.002):
+        """
+        Args:
+            port          : port string
+            baudrate      : baud rate, default 115200
+            timeout       : feedback timeout in seconds, default 0.1
+            poll_interval : read interval when the port has no file descriptor
+        """
+        self.log = logging.getLogger('AsyncSerialTransport')
+        self._error_log = ThrottledLogger(self.log, interval=1.0)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.parser = FrameParser()
+        self.error = None
+        import serial
+        self._serial_port = serial.Serial()
+        self._serial_port.port = port
+        self._serial_port.baudrate = baudrate
+        self._serial_port.timeout = 0
+        self._serial_port.rts = False
+        self._loop = None
+        self._fd = None
+        self._poll_task = None
+        self._feedback_future = None
+        self._writer = None
+
+    async def open(self):
+        self._loop = asyncio.get_running_loop()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="roarm-async-serial-writer")
+        self.error = None
+        self._serial_port.open()
+        try:
+            self._fd = self._serial_port.fileno()
+            self._loop.add_reader(self._fd, self._on_readable)
+        except (AttributeError, NotImplementedError, OSError):
+            self._fd = None
+            self._poll_task = self._loop.create_task(self._poll())
+
+    async def close(self):
+        self._stop_reading()
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+        self._serial_port.close()
+
+    async def send(self, command):
+        await self._write(command)
+
+    async def feedback(self, command, timeout=None):
+        """Request feedback, concurrent callers share one request, None on timeout."""
+        if self.error is not None:
+            raise self.error
+        future = self._feedback_future
+        if future is None or future.done():
+            future = self._loop.create_future()
+            self._feedback_future = future
+            await self._write(command)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            if self._feedback_future is future:
+                self._feedback_future = None
+            return None
+
+    async def _write(self, command):
+        if self.error is not None:
+            raise self.error
+        try:
+            await self._loop.run_in_executor(self._writer, self._serial_port.write, command)
+        except OSError as e:
+            self._error_log.warning("[async_serial] write error: %s", e)
+            raise
+
+    def _on_readable(self):
+        try:
+            data = self._serial_port.read(max(1, self._serial_port.in_waiting))
+        except OSError as e:
+            # serial.SerialException is an OSError
+            self._fail(e)
+            return
+        self._handle_data(data)
+
+    async def _poll(self):
+        while True:
+            try:
+                waiting = self._serial_port.in_waiting
+                data = self._serial_port.read(waiting) if waiting else b""
+            except OSError as e:
+                self._fail(e)
+                return
+            if data:
+                self._handle_data(data)
+            await asyncio.sleep(self.poll_interval)
+
+    def _stop_reading(self):
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            self._fd = None
+        if self._poll_task is not None:
+            if self._poll_task is not asyncio.current_task(self._loop):
+                self._poll_task.cancel()
+            self._poll_task = None
+
+    def _fail(self, error):
+        """Stop reading a port that failed and hand its error to the waiting and later callers."""
+        self._error_log.warning("[async_serial] read error, stopped reading: %s", error)
+        self._stop_reading()
+        self.error = error
+        future = self._feedback_future
+        self._feedback_future = None
+        if future is not None and not future.done():
+            future.set_exception(error)
+
+    def _handle_data(self, data):
+        for line in self.parser.feed(data):
+            try:
+                frame = json.loads(line.decode('utf-8'))
+            except (ValueError, UnicodeDecodeError) as e:
+                self.log.debug("[async_serial] dropped frame: %s", e)
+                continue
+            future = self._feedback_future
+            if isinstance(frame, dict) and frame.get("T") == 1051 and future is not None and not future.done():
+                future.set_result(frame)
+
+
+class AsyncHttpTransport(object):
+    """
+    Keep-alive HTTP/1.1 client for the roarm web server built on asyncio
+    streams. Requests on one arm are sent one at a time over one connection.
+    """
+    def __init__(self, host, timeout=1.0):
+        """
+        Args:
+            host    : host string, "ip" or "ip:port"
+            timeout : request timeout in seconds, default 1.0
+        """
+        self.host = host
+        hostname, _, port = host.partition(":")
+        self.address = (hostname, int(port) if port else 80)
+        self.timeout = timeout
+        self._error_log = ThrottledLogger(logging.getLogger('AsyncHttpTransport'), interval=1.0)
+        self._reader = None
+        self._writer = None
+        self._lock = asyncio.Lock()
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        self._drop_connection()
+
+    async def send(self, command):
+        await self.request(command)
+
+    async def feedback(self, command, timeout=None):
+        """Request feedback, None when the try failed: no answer in time, a lost connection or a damaged frame."""
+        try:
+            text = await self.request(command, timeout)
+            return json.loads(text) if text else None
+        except asyncio.TimeoutError:
+            return None
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            # ConnectionError and HTTP errors are OSErrors, json.JSONDecodeError is a ValueError
+            self._error_log.warning("[async_http] feedback failed: %s", e)
+            return None
+
+    async def request(self, command, timeout=None):
+        """Send a command and return the response text, reconnect once if the kept-alive connection was closed."""
+        path = "/js?json=" + quote(command.decode().strip())
+        message = f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\nConnection: keep-alive\r\n\r\n".encode()
+        async with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._writer is None:
+                        self._reader, self._writer = await asyncio.wait_for(
+                            asyncio.open_connection(*self.address), self.timeout)
+                    self._writer.write(message)
+                    await self._writer.drain()
+                    code, text = await asyncio.wait_for(self._read_response(), timeout or self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    self._drop_connection()
+                    if attempt:
+                        raise
+                    continue
+                except asyncio.TimeoutError:
+                    self._drop_connection()
+                    raise
+                # an error status came over a working connection, sending again would not help
+                if code >= 400:
+                    raise ConnectionError(f"HTTP {code} from {self.host}")
+                return text
+
+    async def _read_response(self):
+        status = await self._reader.readuntil(b"\r\n")
+        headers = {}
+        while True:
+            line = await self._reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "content-length" in headers:
+            body = await self._reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            body = b""
+            while True:
+                size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                chunk = await self._reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                body += chunk[:-2]
+        else:
+            body = await self._reader.read()
+            self._drop_connection()
+        if headers.get("connection", "").lower() == "close":
+            self._drop_connection()
+        return int(status.split()[1]), body.decode()
+
+    def _drop_connection(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = None
+        self._writer = None
+
+
+class AsyncRoarm(CommandGenerator):
+    """
+    Roarm Python API for asyncio.
+
+    Exposes the CommandGenerator commands as coroutines:
+
+        async with AsyncRoarm(roarm_type="roarm_m2", port="/dev/ttyUSB0") as arm:
+            await arm.joints_radian_ctrl(radians=[0, 0, 1.57, 0], speed=100, acc=0)
+            print(await arm.joints_radian_get())
+    """
+    def __init__(self, roarm_type=None, port=None, baudrate=115200, host=None, timeout=0.1, debug=False, retries=10,
+                 retry=None):
+        """
+        Args:
+            roarm_type    : "roarm_m2" or "roarm_m3", type : str
+            port          : port string
+            baudrate      : baud rate, default 115200
+            host          : host string
+            timeout       : feedback timeout in seconds, default 0.1
+            debug         : whether show debug info
+            retries       : feedback attempts before giving up, default 10
+            retry         : retry.RetryPolicy, default retries tries within retries * timeout with adaptive waits
+        """
+        super(AsyncRoarm, self).__init__(roarm_type, debug)
+        self.host = host
+        if host:
+            timeout = max(timeout, 1.0)
+        if retry is None:
+            retry = RetryPolicy(attempts=retries, deadline=retries * timeout, timeout=timeout)
+        self.retry = retry
+        if host:
+            self._transport = AsyncHttpTransport(host, timeout=timeout)
+        else:
+            self._transport = AsyncSerialTransport(port, baudrate=baudrate, timeout=timeout)
+
+    async def connect(self):
+        await self._transport.open()
+        return self
+
+    async def disconnect(self):
+        """Disconnect from the roarm
+        """
+        await self._transport.close()
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.disconnect()
+
+    def _mesg(self, genre, *args):
+        real_command = super(AsyncRoarm, self)._mesg(genre, *args)
+        return self._res(real_command, genre)
+
+    async def _res(self, real_command, genre):
+        if genre != JsonCmd.FEEDBACK_GET:
+            await self._transport.send(real_command)
+            data = real_command
+        else:
+            data, _ = await self._feedback(real_command)
+
+        res = self._process_received(data, genre)
+        if res is None:
+            return None
+        elif isinstance(res, list) and len(res) == 1:
+            return res[0]
+
+    async def state_get(self):
+        """Get the feedback decoded once into an ArmState with named joints, pose and torques
+        Return:
+            ArmState, raises RoarmTimeoutException when the roarm did not answer
+        """
+        real_command = super(AsyncRoarm, self)._mesg(JsonCmd.FEEDBACK_GET)
+        data, timestamp = await self._feedback(real_command)
+        return ArmState.from_feedback(self.type, data, timestamp)
+
+    async def _feedback(self, real_command):
+        """Request feedback as the retry policy allows, (data, receipt time)"""
+        retry = self.retry
+        start = time.monotonic()
+        tries = 0
+        for attempt in range(retry.attempts):
+            pause = retry.delay(attempt)
+            if pause:
+                await asyncio.sleep(pause)
+            timeout = retry.next_timeout(start)
+            if timeout is None:
+                break
+            tries += 1
+            sent = time.monotonic()
+            data = await self._transport.feedback(real_command, timeout)
+            if data:
+                timestamp = time.monotonic()
+                if attempt == 0:
+                    retry.observe(timestamp - sent)
+                return data, timestamp
+            retry.failed()
+        raise RoarmTimeoutException(
+            f"No answer to T:{JsonCmd.FEEDBACK_GET} after {tries} tries in {time.monotonic() - start:.3f}s")
+
+    async def move_init(self):
+        """Move roarm to home position
+        """
+        await self.joints_radian_ctrl(radians=self._home_radians(), speed=100, acc=0)
+        return 1
+
+    async def joints_radian_get(self):
+        """Get the radian of all joints
+        Return:
+            list: a list of all radians, type : List[float]
+        """
+        value = await self.feedback_get()
+        return self._joints_radian_from(value)
+
+    async def joints_angle_get(self):
+        """Get the angle of all joints
+        Return:
+            list: a list of all angles, type : List[float]
+        """
+        value = await self.feedback_get()
+        return [(radian * 180 / math.pi) for radian in self._joints_radian_from(value)]
+
+    async def gripper_radian_ctrl(self, radian, speed, acc):
+        """Set gripper radian
+        Args:
+            radian: [0,1.57], type : float
+            speed: [1,4096], type : int
+            acc: [1,254], type : int
+        """
+        await self.joint_radian_ctrl(joint=self._gripper_joint(), radian=radian, speed=speed, acc=acc)
+        return 1
+
+    async def gripper_angle_ctrl(self, angle, speed, acc):
+        """Set gripper angle
+        Args:
+            angle: [0,90], type : float
+            speed: [1,4096], type : int
+            acc: [1,254], type : int
+        """
+        await self.joint_angle_ctrl(joint=self._gripper_joint(), angle=angle, speed=speed, acc=acc)
+        return 1
+
+    async def gripper_radian_get(self):
+        """Get the radian of gripper
+        Return:
+            gripper radian, type : float
+        """
+        value = await self.feedback_get()
+        return self._gripper_radian_from(value)
+
+    async def gripper_angle_get(self):
+        """Get the angle of gripper
+        Return:
+            gripper angle, type : float
+        """
+        value = await self.feedback_get()
+        return (self._gripper_radian_from(value) * 180) / math.pi
+
+    async def pose_get(self):
+        """Get the pose from robot arm, coordinate system based on base
+        Return:
+            list : a list of coords value, type : List[float]
+        """
+        value = await self.feedback_get()
+        return self._pose_from(value)
@@ -0,0 +1,237 @@
+# coding=utf-8
+
+import collections
+import logging
+import threading
+import time
+
+from roarm_sdk.common import JsonCmd
+from roarm_sdk.utils import RoarmDataException
+
+# setpoints that move the whole arm supersede each other
+ARM_SETPOINTS = frozenset((JsonCmd.JOINTS_RADIAN_CTRL, JsonCmd.JOINTS_ANGLE_CTRL, JsonCmd.POSE_CTRL))
+# setpoints of one joint supersede the ones of the same joint
+JOINT_SETPOINTS = frozenset((JsonCmd.JOINT_RADIAN_CTRL, JsonCmd.JOINT_ANGLE_CTRL))
+
+
+def coalesce_key(genre, args):
+    """Key of the target a command moves, None for commands that must all be sent
+    Args:
+        genre : JsonCmd code, type : int
+        args  : arguments passed to _mesg, the joint comes first for a joint setpoint
+    """
+    if genre in ARM_SETPOINTS:
+        return "arm"
+    if genre in JOINT_SETPOINTS:
+        return ("joint", args[0])
+    return None
+
+
+class CommandQueueStats(object):
+    """Counters of a CommandQueue, times in seconds."""
+    def __init__(self):
+        self.queued = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.blocked = 0
+        self.blocked_time = 0.0
+        self.max_depth = 0
+
+    def as_dict(self):
+        return {
+            "queued": self.queued,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "blocked": self.blocked,
+            "blocked_time": self.blocked_time,
+            "max_depth": self.max_depth,
+        }
+
+    def __repr__(self):
+        return "CommandQueueStats({})".format(", ".join(f"{k}={v!r}" for k, v in self.as_dict().items()))
+
+
+class CommandQueue(object):
+    """
+    Outbound command queue drained by a writer thread.
+
+    put() returns as soon as the command is queued. A motion setpoint
+    replaces a pending setpoint of the same target: joints_radian_ctrl,
+    joints_angle_ctrl and pose_ctrl all target the whole arm, while
+    joint_radian_ctrl and joint_angle_ctrl target one joint. The newer
+    setpoint takes the place at the end of the queue, so commands keep the
+    order they were given in. Every other command, e.g. torque_set or
+    led_ctrl, is always sent.
+
+    At most depth commands wait; put() then blocks until the writer makes
+    room, which pushes back on a caller producing faster than the link.
+
+        arm = roarm(roarm_type="roarm_m2", port="/dev/ttyUSB0", queued=True)
+        arm.joints_radian_ctrl(radians, speed=0, acc=0)   # returns at once
+        arm.command_queue.stats
+    """
+    def __init__(self, send, depth=64):
+        """
+        Args:
+            send  : callable(genre, command) writing one encoded command
+            depth : most commands waiting to be sent, type : int
+        """
+        if depth < 1:
+            raise RoarmDataException(f"depth must be at least 1, got {depth}")
+        self.log = logging.getLogger('CommandQueue')
+        self.send = send
+        self.depth = depth
+        self.stats = CommandQueueStats()
+        # entries are [genre, command, key], a superseded entry has its command set to None
+        self._entries = collections.deque()
+        self._pending = {}
+        self._size = 0
+        self._busy = False
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def __len__(self):
+        return self._size
+
+    def start(self):
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="roarm-command-writer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, flush=True, timeout=1.0):
+        """Stop the writer thread
+        Args:
+            flush   : send the waiting commands first, otherwise drop them
+            timeout : seconds to wait for the writer
+        """
+        if flush:
+            self.flush(timeout)
+        with self._condition:
+            self._stopped = True
+            if not flush:
+                self._entries.clear()
+                self._pending.clear()
+                self._size = 0
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def put(self, genre, command, key=None, timeout=None):
+        """Queue a command
+        Args:
+            genre   : JsonCmd code, type : int
+            command : encoded command, type : bytes
+            key     : coalesce_key() of the command, None never coalesces
+            timeout : seconds to wait while the queue is full, None waits forever
+        Return:
+            True when the command replaced a pending one
+        """
+        with self._condition:
+            if self._stopped:
+                raise RoarmDataException("Command queue is stopped")
+            old = self._pending.get(key) if key is not None else None
+            if old is not None:
+                old[1] = None
+                self._size -= 1
+                self.stats.coalesced += 1
+            elif self._size >= self.depth:
+                self._wait_for_room(timeout)
+            entry = [genre, command, key]
+            self._entries.append(entry)
+            if key is not None:
+                self._pending[key] = entry
+            self._size += 1
+            self.stats.queued += 1
+            if self._size > self.stats.max_depth:
+                self.stats.max_depth = self._size
+            self._condition.notify_all()
+            return old is not None
+
+    def flush(self, timeout=None):
+        """Wait until every queued command has been written
+        Return:
+            True when the queue is empty, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._size or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def _wait_for_room(self, timeout):
+        self.stats.blocked += 1
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        try:
+            while self._size >= self.depth:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise RoarmDataException(f"Command queue is full ({self.depth} commands)")
+                if self._stopped:
+                    raise RoarmDataException("Command queue is stopped")
+                self._condition.wait(remaining)
+        finally:
+            self.stats.blocked_time += time.monotonic() - start
+
+    def _next(self):
+        with self._condition:
+            while True:
+                while self._entries:
+                    genre, command, key = entry = self._entries.popleft()
+                    if command is None:
+                        continue
+                    if key is not None and self._pending.get(key) is entry:
+                        del self._pending[key]
+                    self._size -= 1
+                    self._busy = True
+                    self._condition.notify_all()
+                    return genre, command
+                if self._stopped:
+                    return None
+                self._condition.wait()
+
+    def _run(self):
+        while True:
+            entry = self._next()
+            if entry is None:
+                return
+            try:
+                self.send(*entry)
+                self.stats.sent += 1
+            except Exception as e:
+                self.stats.errors += 1
+                self.log.error("[command_queue] send failed: %s", e)
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+
+class CommandBatch(object):
+    """
+    Commands collected by roarm.batch() and sent together.
+
+    results holds one entry per command once the batch has been sent: the
+    encoded command, the echoed command dict when the roarm confirms
+    commands, or None for a command whose echo never came.
+    """
+    def __init__(self):
+        self.thread = threading.get_ident()
+        self.genres = []
+        self.commands = []
+        self.results = None
+
+    def add(self, genre, command):
+        self.genres.append(genre)
+        self.commands.append(command)
+
+    def __len__(self):
+        return len(self.commands)
@@ -7,7 +7,31 @@ import queue
 import threading
 import logging
 import math
-from datetime import datetime
+import collections
+from concurrent.futures import Future
+
+from roarm_sdk.logger import ThrottledLogger
+
+# every command and frame passes here, log a sample of them
+_frame_log = ThrottledLogger(logging.getLogger('DataProcessor'), interval=1.0)
+
+# servo steps per revolution, speed is sent in steps/s and acc in 100 steps/s^2
+SERVO_STEPS = 4096
+STEPS_PER_RADIAN = SERVO_STEPS / (2 * math.pi)
+# angle commands take speed and acc in degrees: speed * 180 / ANGLE_SPEED_STEPS, acc * 180 / ANGLE_ACC_STEPS
+ANGLE_SPEED_STEPS = 2048
+ANGLE_ACC_STEPS = 254 * 100
+
+# command keys of the joints, the last one is the mirrored gripper
+COMMAND_RADIAN_KEYS = {
+    "roarm_m2": ("base", "shoulder", "elbow", "hand"),
+    "roarm_m3": ("base", "shoulder", "elbow", "wrist", "roll", "hand"),
+}
+
+COMMAND_ANGLE_KEYS = {
+    "roarm_m2": ("b", "s", "e", "h"),
+    "roarm_m3": ("b", "s", "e", "t", "r", "h"),
+}
 
 class JsonCmd(object):
     ECHO_SET = 605
@@ -30,50 +54,232 @@ class JsonCmd(object):
     WIFI_CONFIG_CREATE_BY_INPUT = 407     
     WIFI_STOP =408
                    
+# closing delimiter of each frame start
+FRAME_CLOSES = {b"{": b"}", b"[": b"]"}
+
+class FrameParser(object):
+    """Incremental parser splitting a byte stream into JSON frames.
+
+    Bytes are copied once into a fixed buffer and only newly arrived bytes
+    are scanned for the frame end. Every complete frame is returned in
+    arrival order; bytes outside a frame and overlong frames are counted.
+    A frame begins at the brace opening its outermost object, so a
+    truncated frame is dropped and counted as garbled instead of being
+    glued to the frame after it. Braces inside JSON strings, such as an
+    SSID, are not counted.
+    """
+    def __init__(self, max_frame_length=512, frame_start=b'{', frame_end=b"}\r\n"):
+        self.frame_start = frame_start
+        self.frame_end = frame_end
+        self.frame_close = FRAME_CLOSES.get(frame_start, frame_end[:1])
+        self.closed_end = frame_end.startswith(self.frame_close)
+        self.max_frame_length = max_frame_length
+        self.capacity = 4 * max_frame_length
+        self.buf = bytearray(self.capacity)
+        self.view = memoryview(self.buf)
+        self.frames = 0
+        self.dropped_bytes = 0
+        self.garbled_frames = 0
+        self.reset()
+
+    def reset(self):
+        """Discard any partial frame, counters are kept."""
+        self.start = 0
+        self.end = 0
+        self.scan = 0
+
+    def pending(self):
+        return self.end - self.start
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "dropped_bytes": self.dropped_bytes,
+            "garbled_frames": self.garbled_frames,
+        }
+
+    def feed(self, data):
+        """Feed received bytes
+        Args:
+            data: received bytes, type: bytes
+        Return:
+            list: complete frames in arrival order, type: List[bytes]
+        """
+        frames = []
+        n = len(data)
+        if self.end + n <= self.capacity and self.end + n - self.start <= self.max_frame_length \
+                and self.frame_end[-1:] not in data:
+            # a fragment that ends no frame, keep the scan offset and wait for more
+            self.buf[self.end:self.end + n] = data
+            self.end += n
+            return frames
+        data = memoryview(data)
+        while len(data):
+            if self.end == self.capacity:
+                self._compact()
+            n = min(len(data), self.capacity - self.end)
+            self.view[self.end:self.end + n] = data[:n]
+            self.end += n
+            data = data[n:]
+            self._extract(frames)
+        return frames
+
+    def _compact(self):
+        pending = self.end - self.start
+        self.view[:pending] = self.view[self.start:self.end]
+        self.scan -= self.start
+        self.start = 0
+        self.end = pending
+
+    def _extract(self, frames):
+        end_len = len(self.frame_end)
+        while True:
+            idx = self.buf.find(self.frame_end, self.scan, self.end)
+            if idx < 0:
+                self.scan = max(self.start, self.end - end_len + 1)
+                overflow = self.end - self.start - self.max_frame_length
+                if overflow > 0:
+                    self.dropped_bytes += overflow
+                    self.start += overflow
+                    self.scan = max(self.scan, self.start)
+                return
+            stop = idx + end_len
+            first = self._frame_begin(idx)
+            if first < 0:
+                self.dropped_bytes += stop - self.start
+            else:
+                if first > self.start:
+                    # bytes before the frame, a truncated frame when they hold a frame start
+                    if self.buf.find(self.frame_start, self.start, first) >= 0:
+                        self.garbled_frames += 1
+                    self.dropped_bytes += first - self.start
+                if stop - first > self.max_frame_length:
+                    self.garbled_frames += 1
+                    self.dropped_bytes += stop - first
+                else:
+                    frames.append(bytes(self.view[first:stop]))
+                    self.frames += 1
+            self.start = self.scan = stop
+            if self.start == self.end:
+                self.reset()
+
+    def _frame_begin(self, idx):
+        """Start of the frame whose end is at idx, -1 when it has none"""
+        close = idx if self.closed_end else self.buf.rfind(self.frame_close, self.start, idx + len(self.frame_end))
+        first = self.buf.rfind(self.frame_start, self.start, close)
+        if close < 0 or first < 0:
+            return -1
+        if (self.buf.find(self.frame_close, first, close) < 0 and self.buf.find(b"\\", first, close) < 0
+                and self.buf.count(b'"', first, close) % 2 == 0):
+            # flat frames, the feedback among them, begin at the last frame start
+            return first
+        # nested objects or braces in strings, the first frame start whose object closes at close
+        first = self.buf.find(self.frame_start, self.start, close)
+        while first >= 0:
+            if self._closes_at(first, close):
+                return first
+            first = self.buf.find(self.frame_start, first + 1, close)
+        return -1
+
+    def _closes_at(self, first, close):
+        opening, closing = self.frame_start[0], self.frame_close[0]
+        depth = 0
+        in_string = escaped = False
+        for i in range(first, close + 1):
+            byte = self.buf[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif byte == 0x5c:
+                    escaped = True
+                elif byte == 0x22:
+                    in_string = False
+            elif byte == 0x22:
+                in_string = True
+            elif byte == opening:
+                depth += 1
+            elif byte == closing:
+                depth -= 1
+                if depth == 0:
+                    return i == close
+        return False
+
+# pause between polls of a port whose blocking read would outlast the wait
+READ_POLL_INTERVAL = 0.001
+
 class ReadLine:
-    def __init__(self, s):
-        self.buf = bytearray()  
+    def __init__(self, s, timeout=0.1):
         self.s = s         
-        self.timeout = 0.1 
+        self.timeout = timeout
         self.frame_start = b'{'
         self.frame_end =  b"}\r\n"
         self.max_frame_length = 512
+        self.parser = FrameParser(self.max_frame_length, self.frame_start, self.frame_end)
+        self.frames = collections.deque()
+        self.metrics = None
  
     def readline(self):
-        start_time = time.time() 
+        """Return the oldest complete frame, or None after the timeout."""
+        if self.frames:
+            return self.frames.popleft()
+        start_time = time.monotonic()
         while True:
-            i = max(1, min(self.max_frame_length, self.s.in_waiting))
-            data = self.s.read(i)
+            waiting = self.s.in_waiting
+            port_timeout = getattr(self.s, "timeout", 0)
+            if waiting or port_timeout is not None and port_timeout <= self.timeout - (time.monotonic() - start_time):
+                data = self.s.read(max(1, waiting))
+            else:
+                # a blocking read of the port would outlast the wait, poll it instead
+                time.sleep(READ_POLL_INTERVAL)
+                data = None
             if data:
-                self.buf.extend(data)
-
-            end = self.buf.rfind(self.frame_end)
+                if self.metrics is not None:
+                    self.metrics.received(len(data))
+                self.frames.extend(self.parser.feed(data))
+                if self.frames:
+                    return self.frames.popleft()
 
-            if end >= 0:  
-                start = self.buf.rfind(self.frame_start, 0, end)
-                if start >= 0 and start < end:
-                    r = self.buf[start:end + len(self.frame_end)] 
-                    self.buf = self.buf[end + len(self.frame_end):]
-                    return r
-                elif start == -1:
-                    continue
+            if time.monotonic() - start_time > self.timeout:
+                return None
 
-            if time.time() - start_time > self.timeout:
-                break
+    def readframes(self):
+        """Return every complete frame received so far without blocking."""
+        waiting = self.s.in_waiting
+        if waiting:
+            data = self.s.read(waiting)
+            if self.metrics is not None:
+                self.metrics.received(len(data))
+            self.frames.extend(self.parser.feed(data))
+        frames = list(self.frames)
+        self.frames.clear()
+        return frames
  
     def clear_buffer(self):
-        self.buf = bytearray()
+        if self.metrics is not None:
+            self._count_discarded()
+        self.parser.reset()
+        self.frames.clear()
         try:
             self.s.reset_input_buffer()
         except Exception as e:
-            print(f"Error resetting input buffer: {e}")
+            logging.getLogger('ReadLine').error("Error resetting input buffer: %s", e)
+
+    def _count_discarded(self):
+        discarded = self.parser.pending() + sum(len(frame) for frame in self.frames)
+        try:
+            discarded += self.s.in_waiting
+        except Exception:
+            pass
+        if discarded:
+            self.metrics.discarded(discarded)
         
 class BaseController:
-    def __init__(self, roarm_type, port):
+    def __init__(self, roarm_type, port, metrics=None, timeout=0.1):
         self.log = logging.getLogger('BaseController')
         self.ser = port
         self.type = roarm_type
-        self.rl = ReadLine(self.ser)
+        self.rl = ReadLine(self.ser, timeout)
+        self.rl.metrics = self.metrics = metrics
         self.data_buffer = None
         
         feedback_data_m2 = {"T": 1051, "x": 0, "y": 0, "z": 0, "b": 0, "s": 0, "e": 0, "t": 0, "torB": 0, "torS": 0, "torE": 0, "torH": 0}
@@ -87,18 +293,247 @@ class BaseController:
         
     def feedback_data(self):
         try:
-            line = self.rl.readline().decode('utf-8')
-            self.data_buffer = json.loads(line)
+            # in echo mode the echo of a command can arrive before the feedback
+            for _ in range(4):
+                line = self.rl.readline()
+                if line is None:
+                    # timed out, the caller decides whether to try again
+                    return None
+                line = line.decode('utf-8')
+                self.data_buffer = json.loads(line)
+                if self.data_buffer.get("T") == 1051:
+                    break
+            else:
+                self.rl.clear_buffer()
+                return None
             self.base_data = self.data_buffer
             self.rl.clear_buffer()   
             return self.base_data                  
         except json.JSONDecodeError as e:
             self.log.error(f"JSON decode error: {e} with line: {line}")
+            if self.metrics is not None:
+                self.metrics.parse_error()
+            self.rl.clear_buffer()
+        except UnicodeDecodeError as e:
+            self.log.error(f"[base_ctrl.feedback_data] decode error: {e}")
+            if self.metrics is not None:
+                self.metrics.parse_error()
             self.rl.clear_buffer()
         except Exception as e:
             self.log.error(f"[base_ctrl.feedback_data] unexpected error: {e}")
             self.rl.clear_buffer()
     
+FeedbackSnapshot = collections.namedtuple("FeedbackSnapshot", ["data", "timestamp", "seq"])
+
+class FeedbackReader(object):
+    """Background reader that keeps the latest feedback frame of the roarm.
+
+    The reader thread requests feedback at a fixed rate and parses every
+    incoming frame. The newest feedback is published as an immutable
+    FeedbackSnapshot, so readers only take a reference and never lock.
+
+    Every frame is also dispatched by its T code: the oldest future from
+    expect() for that code is resolved with it, and listeners added for
+    that code (or for every code) are called from the reader thread. The
+    input buffer is never flushed, so commands, their echoes in echo mode
+    and feedback can all be in flight at once.
+
+    After max_errors read errors in a row, e.g. once the port is unplugged,
+    the reader stops, drops the latest snapshot and keeps the error in
+    self.error.
+    """
+    def __init__(self, port, rate=50, write_lock=None, metrics=None, max_errors=10):
+        """
+        Args:
+            port       : opened serial port
+            rate       : feedback request rate in Hz, 0 to only listen
+            write_lock : lock shared with the command writer
+            metrics    : metrics.Metrics counting bytes and parse errors
+            max_errors : read errors in a row after which the reader stops
+        """
+        self.log = logging.getLogger('FeedbackReader')
+        self._dropped_log = ThrottledLogger(self.log, interval=1.0)
+        self._error_log = ThrottledLogger(self.log, interval=1.0)
+        self.max_errors = max_errors
+        self.error = None
+        self.ser = port
+        self.rl = ReadLine(self.ser)
+        self.rl.metrics = self.metrics = metrics
+        self.period = 1.0 / rate if rate else 0
+        self.rl.timeout = min(self.period, 0.1) if self.period else 0.1
+        self.write_lock = write_lock if write_lock is not None else threading.Lock()
+        self.request = (json.dumps({"T": JsonCmd.FEEDBACK_GET}) + "\n").encode()
+        self.latest = None
+        self.seq = 0
+        self._frame_condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._waiters = {}
+        self._listeners = {}
+        self._dispatch_lock = threading.Lock()
+        self._listener_log = ThrottledLogger(self.log, interval=1.0)
+
+    def start(self):
+        self._stop_event.clear()
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="roarm-feedback-reader")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait(self, timeout=None, max_age=None):
+        """Wait for a feedback frame, return the latest snapshot or None.
+        Args:
+            timeout : seconds to wait, None waits until a frame arrives or the reader fails
+            max_age : only return a snapshot received at most this many seconds ago
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._frame_condition:
+            while True:
+                snapshot = self.latest
+                if snapshot is not None and (max_age is None or time.monotonic() - snapshot.timestamp <= max_age):
+                    return snapshot
+                if self.error is not None:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._frame_condition.wait(remaining)
+
+    def expect(self, code):
+        """Wait for the next frame of a T code, call before writing the command it answers
+        Args:
+            code: T code, e.g. 1051 for feedback or the JsonCmd of a command echoed in echo mode
+        Return:
+            concurrent.futures.Future of (data, timestamp), pass it to discard() when giving up
+        """
+        future = Future()
+        with self._dispatch_lock:
+            self._waiters.setdefault(code, collections.deque()).append(future)
+        return future
+
+    def discard(self, code, future):
+        """Stop waiting with a future from expect(), so a late frame goes to the next caller."""
+        with self._dispatch_lock:
+            waiters = self._waiters.get(code)
+            if waiters and future in waiters:
+                waiters.remove(future)
+                if not waiters:
+                    del self._waiters[code]
+        future.cancel()
+
+    def add_listener(self, callback, code=None):
+        """Call callback(data, timestamp) from the reader thread for every frame of a T code
+        Args:
+            callback : function taking the frame dict and its receipt time
+            code     : T code, None for every frame
+        """
+        with self._dispatch_lock:
+            self._listeners[code] = self._listeners.get(code, ()) + (callback,)
+
+    def remove_listener(self, callback, code=None):
+        with self._dispatch_lock:
+            # == as a bound method is a new object on every access
+            callbacks = tuple(c for c in self._listeners.get(code, ()) if c != callback)
+            if callbacks:
+                self._listeners[code] = callbacks
+            else:
+                self._listeners.pop(code, None)
+
+    def _run(self):
+        next_request = time.monotonic()
+        errors = 0
+        while not self._stop_event.is_set():
+            if self.period:
+                now = time.monotonic()
+                if now >= next_request:
+                    self._send_request()
+                    next_request += self.period
+                    if next_request < now:
+                        next_request = now + self.period
+            try:
+                if not self.ser.in_waiting:
+                    idle = next_request - time.monotonic() if self.period else self.rl.timeout
+                    time.sleep(min(max(idle, 0), 0.002))
+                    continue
+                lines = self.rl.readframes()
+            except Exception as e:
+                errors += 1
+                if isinstance(e, OSError) and errors >= self.max_errors:
+                    self.log.error("[feedback_reader] stopped after %d read errors: %s", errors, e)
+                    self._fail(e)
+                    return
+                self._error_log.warning("[feedback_reader] read error: %s", e)
+                time.sleep(self.rl.timeout)
+                continue
+            errors = 0
+            timestamp = time.monotonic()
+            for line in lines:
+                self._handle_frame(line, timestamp)
+
+    def _fail(self, error):
+        # wake the waiters, a getter must not keep returning the last pose of a dead link
+        with self._frame_condition:
+            self.error = error
+            self.latest = None
+            self._frame_condition.notify_all()
+
+    def _send_request(self):
+        try:
+            with self.write_lock:
+                self.ser.write(self.request)
+            if self.metrics is not None:
+                self.metrics.sent(len(self.request))
+        except Exception as e:
+            self._error_log.warning("[feedback_reader] write error: %s", e)
+
+    def _handle_frame(self, line, timestamp):
+        try:
+            data = json.loads(line.decode('utf-8'))
+        except (ValueError, UnicodeDecodeError) as e:
+            self._dropped_log.debug("[feedback_reader] dropped frame: %s", e)
+            if self.metrics is not None:
+                self.metrics.parse_error()
+            return
+        if not isinstance(data, dict):
+            return
+        code = data.get("T")
+        if code == 1051:
+            self.seq += 1
+            with self._frame_condition:
+                self.latest = FeedbackSnapshot(data, timestamp, self.seq)
+                self._frame_condition.notify_all()
+        if self._waiters or self._listeners:
+            self._dispatch(code, data, timestamp)
+
+    def _dispatch(self, code, data, timestamp):
+        with self._dispatch_lock:
+            waiters = self._waiters.get(code)
+            future = None
+            while waiters:
+                future = waiters.popleft()
+                if future.set_running_or_notify_cancel():
+                    break
+                future = None
+            if waiters is not None and not waiters:
+                del self._waiters[code]
+            callbacks = self._listeners.get(code, ()) + (self._listeners.get(None, ()) if code is not None else ())
+        if future is not None:
+            future.set_result((data, timestamp))
+        for callback in callbacks:
+            try:
+                callback(data, timestamp)
+            except Exception as e:
+                self._listener_log.warning("[feedback_reader] listener failed: %s", e)
+
 def handle_echo_or_torque_set(roarm_type,command,command_data):
     command.update({"cmd": command_data[0]})
     return command
@@ -164,22 +599,22 @@ def handle_joint_angle_ctrl(roarm_type,command,command_data):
     gripper = switch_dict[roarm_type]
     if command_data[0] == gripper: 
         command_data[1] = 180 - command_data[1]  
-    command_data[2] = (command_data[2] * 180) / 2048
-    command_data[3] = (command_data[3] * 180) / (254*100)         
+    command_data[2] = (command_data[2] * 180) / ANGLE_SPEED_STEPS
+    command_data[3] = (command_data[3] * 180) / ANGLE_ACC_STEPS         
     command.update({"joint": command_data[0], "angle": command_data[1], "spd": command_data[2], "acc": command_data[3]})
     return command
     
 def handle_m2_joints_angle(command,command_data):
     command_data[3] = 180 - command_data[3]  
-    command_data[4] = (command_data[4] * 180) / 2048
-    command_data[5] = (command_data[5] * 180) / (254*100)
+    command_data[4] = (command_data[4] * 180) / ANGLE_SPEED_STEPS
+    command_data[5] = (command_data[5] * 180) / ANGLE_ACC_STEPS
     command.update({"b": command_data[0],"s": command_data[1],"e": command_data[2],"h": command_data[3], "spd": command_data[4], "acc": command_data[5]})  
     return command
     
 def handle_m3_joints_angle(command,command_data):
     command_data[5] = 180 - command_data[5]
-    command_data[6] = (command_data[6] * 180) / 2048
-    command_data[7] = (command_data[7] * 180) / (254*100)   
+    command_data[6] = (command_data[6] * 180) / ANGLE_SPEED_STEPS
+    command_data[7] = (command_data[7] * 180) / ANGLE_ACC_STEPS   
     command.update({"b": command_data[0],"s": command_data[1],"e": command_data[2],"t": command_data[3],"r": command_data[4],"h": command_data[5], "spd": command_data[6], "acc": command_data[7]})  
     return command
     
@@ -230,8 +665,7 @@ def handle_m2_feedback(valid_data,data):
     valid_data.append(data['b'])    
     valid_data.append(data['s'])
     valid_data.append(data['e']) 
-    data['t'] = math.pi - data['t'] 
-    valid_data.append(data['t'])
+    valid_data.append(math.pi - data['t'])
 #    valid_data.append(data['torB'])    
 #    valid_data.append(data['torS'])
 #    valid_data.append(data['torE'])
@@ -245,8 +679,7 @@ def handle_m3_feedback(valid_data,data):
     valid_data.append(data['e'])  
     valid_data.append(data['t'])
     valid_data.append(data['r'])
-    data['g'] = math.pi - data['g']  
-    valid_data.append(data['g'])
+    valid_data.append(math.pi - data['g'])
 #    valid_data.append(data['tB'])    
 #    valid_data.append(data['tS'])
 #    valid_data.append(data['tE'])
@@ -254,7 +687,164 @@ def handle_m3_feedback(valid_data,data):
 #    valid_data.append(data['tR'])     
     return valid_data
                         
+COMMAND_HANDLERS = {
+    JsonCmd.ECHO_SET: handle_echo_or_torque_set,
+    JsonCmd.MIDDLE_SET: handle_middle_set,
+    JsonCmd.LED_CTRL: handle_led_ctrl,
+    JsonCmd.TORQUE_SET: handle_echo_or_torque_set,
+    JsonCmd.DYNAMIC_ADAPTATION_SET: handle_dynamic_adaptation_set,
+    JsonCmd.JOINT_RADIAN_CTRL: handle_joint_radian_ctrl,
+    JsonCmd.JOINTS_RADIAN_CTRL: handle_joints_radian_ctrl,
+    JsonCmd.JOINT_ANGLE_CTRL: handle_joint_angle_ctrl,
+    JsonCmd.JOINTS_ANGLE_CTRL: handle_joints_angle_ctrl,
+    JsonCmd.GRIPPER_MODE_SET: handle_gripper_mode_set,
+    JsonCmd.POSE_CTRL: handle_pose_ctrl,
+    JsonCmd.WIFI_ON_BOOT: handle_wifi_on_boot,
+    JsonCmd.AP_SET: handle_ap_or_sta_set,
+    JsonCmd.STA_SET: handle_ap_or_sta_set,
+    JsonCmd.APSTA_SET: handle_ap_sta_set,
+    JsonCmd.WIFI_CONFIG_CREATE_BY_INPUT: handle_ap_sta_set
+}
+
+FEEDBACK_HANDLERS = {
+    "roarm_m2": handle_m2_feedback,
+    "roarm_m3": handle_m3_feedback
+}
+
+def _json_value(value):
+    # repr() of a finite int or float is exactly what json.dumps writes
+    if type(value) in (int, float) and value - value == 0:
+        return repr(value)
+    return json.dumps(value)
+
+def _template(genre, keys, placeholder="%r"):
+    return '{"T": %d' % genre + ''.join(', "%s": %s' % (key, placeholder) for key in keys) + '}\n'
+
+_NUMBER_TYPES = frozenset((int, float))
+
+def _number_command(fmt, values):
+    # None sends the command through the json.dumps path (bool, NaN, numpy scalars, ...)
+    if not _NUMBER_TYPES.issuperset(map(type, values)):
+        return None
+    text = fmt % values
+    if "nan" in text or "inf" in text:
+        return None
+    return text.encode()
+
+def _fixed_encoder(genre, keys):
+    fmt = _template(genre, keys)
+    n = len(keys)
+
+    def encode(d):
+        return _number_command(fmt, tuple(d[:n]))
+    return encode
+
+def _string_encoder(genre, keys):
+    fmt = _template(genre, keys, "%s")
+    n = len(keys)
+
+    def encode(d):
+        return (fmt % tuple(map(_json_value, d[:n]))).encode()
+    return encode
+
+def _joint_encoder(genre, value_key, gripper, mirror, convert_speed):
+    fmt = _template(genre, ("joint", value_key, "spd", "acc"))
+
+    def encode(d):
+        value = mirror - d[1] if d[0] == gripper else d[1]
+        spd, acc = d[2], d[3]
+        if convert_speed:
+            spd = (spd * 180) / ANGLE_SPEED_STEPS
+            acc = (acc * 180) / ANGLE_ACC_STEPS
+        return _number_command(fmt, (d[0], value, spd, acc))
+    return encode
+
+def _joints_encoder(genre, keys, mirror, convert_speed):
+    fmt = _template(genre, keys)
+    hand = len(keys) - 3
+    n = len(keys)
+
+    def encode(d):
+        values = d[:n]
+        values[hand] = mirror - values[hand]
+        if convert_speed:
+            values[hand + 1] = (values[hand + 1] * 180) / ANGLE_SPEED_STEPS
+            values[hand + 2] = (values[hand + 2] * 180) / ANGLE_ACC_STEPS
+        return _number_command(fmt, tuple(values))
+    return encode
+
+def _pose_encoder(genre, keys, rotations):
+    fmt = _template(genre, keys)
+    n = len(keys)
+
+    def encode(d):
+        values = d[:n]
+        for index in rotations:
+            values[index] = (values[index] * math.pi) / 180
+        values[n - 1] = math.pi - ((values[n - 1] * math.pi) / 180)
+        return _number_command(fmt, tuple(values))
+    return encode
+
+def _gripper_mode_encoder(genre):
+    fmt = _template(genre, ("name", "step"), "%s")
+
+    def encode(d):
+        return (fmt % ('"boot"', _json_value(f'{{"T":1,"mode":{d[0]}}}'))).encode()
+    return encode
+
+def _build_encoders(roarm_type):
+    encoders = {
+        JsonCmd.ECHO_SET: _fixed_encoder(JsonCmd.ECHO_SET, ("cmd",)),
+        JsonCmd.MIDDLE_SET: _fixed_encoder(JsonCmd.MIDDLE_SET, ("id",)),
+        JsonCmd.LED_CTRL: _fixed_encoder(JsonCmd.LED_CTRL, ("led",)),
+        JsonCmd.TORQUE_SET: _fixed_encoder(JsonCmd.TORQUE_SET, ("cmd",)),
+        JsonCmd.GRIPPER_MODE_SET: _gripper_mode_encoder(JsonCmd.GRIPPER_MODE_SET),
+        JsonCmd.WIFI_ON_BOOT: _fixed_encoder(JsonCmd.WIFI_ON_BOOT, ("mode",)),
+        JsonCmd.AP_SET: _string_encoder(JsonCmd.AP_SET, ("ssid", "password")),
+        JsonCmd.STA_SET: _string_encoder(JsonCmd.STA_SET, ("ssid", "password")),
+        JsonCmd.APSTA_SET: _string_encoder(JsonCmd.APSTA_SET, ("ap_ssid", "ap_password", "sta_ssid", "sta_password")),
+        JsonCmd.WIFI_CONFIG_CREATE_BY_INPUT: _string_encoder(
+            JsonCmd.WIFI_CONFIG_CREATE_BY_INPUT, ("ap_ssid", "ap_password", "sta_ssid", "sta_password")),
+    }
+    if roarm_type == "roarm_m2":
+        gripper = 4
+        adaptation_keys = ("mode", "b", "s", "e", "h")
+        pose_keys, rotations = ("x", "y", "z", "t"), ()
+    elif roarm_type == "roarm_m3":
+        gripper = 6
+        adaptation_keys = ("mode", "b", "s", "e", "t", "r", "h")
+        pose_keys, rotations = ("x", "y", "z", "t", "r", "g"), (3, 4)
+    else:
+        return encoders
+    joint_keys = COMMAND_RADIAN_KEYS[roarm_type] + ("spd", "acc")
+    angle_keys = COMMAND_ANGLE_KEYS[roarm_type] + ("spd", "acc")
+    encoders.update({
+        JsonCmd.DYNAMIC_ADAPTATION_SET: _fixed_encoder(JsonCmd.DYNAMIC_ADAPTATION_SET, adaptation_keys),
+        JsonCmd.JOINT_RADIAN_CTRL: _joint_encoder(JsonCmd.JOINT_RADIAN_CTRL, "rad", gripper, math.pi, False),
+        JsonCmd.JOINTS_RADIAN_CTRL: _joints_encoder(JsonCmd.JOINTS_RADIAN_CTRL, joint_keys, math.pi, False),
+        JsonCmd.JOINT_ANGLE_CTRL: _joint_encoder(JsonCmd.JOINT_ANGLE_CTRL, "angle", gripper, 180, True),
+        JsonCmd.JOINTS_ANGLE_CTRL: _joints_encoder(JsonCmd.JOINTS_ANGLE_CTRL, angle_keys, 180, True),
+        JsonCmd.POSE_CTRL: _pose_encoder(JsonCmd.POSE_CTRL, pose_keys, rotations),
+    })
+    return encoders
+
+_ENCODERS = {}
+
+def command_encoders(roarm_type):
+    """Return the precompiled command encoders of a roarm type, keyed by JsonCmd code.
+
+    Each encoder takes the flattened command data and returns the same bytes
+    as the handle_* functions followed by json.dumps, without building a dict,
+    or None when a value needs the generic json.dumps path.
+    """
+    encoders = _ENCODERS.get(roarm_type)
+    if encoders is None:
+        encoders = _ENCODERS[roarm_type] = _build_encoders(roarm_type)
+    return encoders
+
 class DataProcessor(object):
+    _encoders = None
+
     def _mesg(self, genre, *args):
         """
         Args:
@@ -265,35 +855,21 @@ class DataProcessor(object):
                    the array is used to include them. (Data cannot be nested)
         """
         command_data = self._process_data_command(args)
-        switch_dict = {
-            JsonCmd.ECHO_SET: handle_echo_or_torque_set,
-            JsonCmd.MIDDLE_SET: handle_middle_set,
-            JsonCmd.LED_CTRL: handle_led_ctrl,
-            JsonCmd.TORQUE_SET: handle_echo_or_torque_set,
-            JsonCmd.DYNAMIC_ADAPTATION_SET: handle_dynamic_adaptation_set,
-            JsonCmd.JOINT_RADIAN_CTRL: handle_joint_radian_ctrl,
-            JsonCmd.JOINTS_RADIAN_CTRL: handle_joints_radian_ctrl,
-            JsonCmd.JOINT_ANGLE_CTRL: handle_joint_angle_ctrl,
-            JsonCmd.JOINTS_ANGLE_CTRL: handle_joints_angle_ctrl,
-            JsonCmd.GRIPPER_MODE_SET: handle_gripper_mode_set,
-            JsonCmd.POSE_CTRL: handle_pose_ctrl,
-            JsonCmd.WIFI_ON_BOOT: handle_wifi_on_boot,
-            JsonCmd.AP_SET: handle_ap_or_sta_set,
-            JsonCmd.STA_SET: handle_ap_or_sta_set,
-            JsonCmd.APSTA_SET: handle_ap_sta_set,
-            JsonCmd.WIFI_CONFIG_CREATE_BY_INPUT: handle_ap_sta_set
-        }
+        if not command_data:
+            return ('{"T": %d}\n' % genre).encode()
+        if self._encoders is None:
+            self._encoders = command_encoders(self.type)
+        encoder = self._encoders.get(genre)
+        real_command = encoder(command_data) if encoder is not None else None
+        if real_command is None:
+            return self._mesg_generic(genre, command_data)
+        return real_command
 
-        if genre:
-            command = {"T": genre}   
-                         
-        if command_data:
-            if genre in switch_dict:
-                command = switch_dict[genre](self.type,command,command_data) 
-                
-        elif not command_data:
-            command = command     
-                                   
+    def _mesg_generic(self, genre, command_data):
+        """Build the command as a dict with the handle_* functions and serialize it."""
+        command = {"T": genre}   
+        if command_data and genre in COMMAND_HANDLERS:
+            command = COMMAND_HANDLERS[genre](self.type,command,command_data) 
         real_command = self._flatten(command)
         return real_command
         
@@ -306,65 +882,58 @@ class DataProcessor(object):
         if not args:
             return []
         processed_args = []
-        for index in range(len(args)):
-            if isinstance(args[index], list):
-                processed_args.extend(args[index])
+        for arg in args:
+            if hasattr(arg, "tolist"):
+                # numpy arrays and scalars become python numbers
+                arg = arg.tolist()
+            if isinstance(arg, (list, tuple)):
+                processed_args.extend(arg)
             else:
-                processed_args.append(args[index])
+                processed_args.append(arg)
 
         return processed_args
     
     def _process_received(self, data, genre): 
         if not data:
             return None
-        print(data)  
-        switch_dict = {
-            "roarm_m2": handle_m2_feedback,
-            "roarm_m3": handle_m3_feedback
-        }                
+        _frame_log.debug("received %s", data)
         res = []      
         valid_data = []      
         if genre == JsonCmd.FEEDBACK_GET:   
             valid_data.append(data['x'])    
             valid_data.append(data['y'])
             valid_data.append(data['z'])             
-            if self.type in switch_dict:
-                valid_data = switch_dict[self.type](valid_data,data)                                   
+            if self.type in FEEDBACK_HANDLERS:
+                valid_data = FEEDBACK_HANDLERS[self.type](valid_data,data)                                   
         else: 
             valid_data = data  
         res.append(valid_data)            
         return res
 
 def write(self, command, method=None):
+    _frame_log.debug("_write: %r", command)
+    if self.metrics is not None:
+        self.metrics.sent(len(command))
     if method == "http":
-        log_command = ""
-        for i in command:
-            if isinstance(i, str):
-                log_command += i
-            else:
-                log_command += hex(i)[2:] + " "
-        # self.log.debug("_write: {}".format(log_command))
-
         self.sock.sendall(command)
     else:
-        self._serial_port.reset_input_buffer()
-        command_log = ""
-        for i in command:
-            if isinstance(i, str):
-                command_log += i[2:] + " "
-            else:
-                command_log += hex(i)[2:] + " "
-        #self.log.debug("_write: {}".format(command_log))
-        self._serial_port.write(command)
-        self._serial_port.flush()
+        if self.feedback_reader is None:
+            self._serial_port.reset_input_buffer()
+        with self._write_lock:
+            self._serial_port.write(command)
+            self._serial_port.flush()
 
-def read(self, genre):
+def read(self, genre, timeout=None):
     if genre != JsonCmd.FEEDBACK_GET:
         request_data = json.dumps({'T': 105}) + "\n"      
         self._serial_port.write(request_data.encode())    
+        if self.metrics is not None:
+            self.metrics.sent(len(request_data))
 
     if self.base_controller is None:
-        self.base_controller = BaseController(port=self._serial_port, roarm_type=self.type)  
+        self.base_controller = BaseController(port=self._serial_port, roarm_type=self.type, metrics=self.metrics)  
+    if timeout is not None:
+        self.base_controller.rl.timeout = timeout
 
     data = self.base_controller.feedback_data()
     if data:
@@ -0,0 +1,192 @@
+# coding=utf-8
+
+import collections
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from roarm_sdk.roarm import roarm
+
+
+ArmResult = collections.namedtuple("ArmResult", ["name", "value", "error", "latency"])
+
+
+class RoarmFleet(object):
+    """
+    Controls several roarm connections at once.
+
+    Commands are fanned out to all arms concurrently, so a fleet-wide move
+    costs one round trip instead of one per arm. Every call returns a dict
+    of ArmResult(name, value, error, latency) keyed by arm name; a failing
+    or slow arm never blocks the others. An arm that timed out is unhealthy
+    and skipped until its call returns, so it never holds more than one
+    worker.
+
+        fleet = RoarmFleet.from_config([
+            {"name": "left", "roarm_type": "roarm_m2", "port": "/dev/ttyUSB0"},
+            {"name": "right", "roarm_type": "roarm_m3", "host": "192.168.4.1"},
+        ])
+        fleet.move_init()
+        states = fleet.feedback_get(timeout=0.2)
+    """
+    def __init__(self, arms=None, timeout=None, sync=True, sync_timeout=0.1):
+        """
+        Args:
+            arms         : roarm instances keyed by name, type : dict
+            timeout      : default per-arm timeout in seconds, None waits forever
+            sync         : whether arms start each command together on a barrier
+            sync_timeout : longest wait on the barrier before an arm starts alone
+        """
+        self.log = logging.getLogger('RoarmFleet')
+        self.arms = collections.OrderedDict(arms or {})
+        self.timeout = timeout
+        self.sync = sync
+        self.sync_timeout = sync_timeout
+        self.last_latency = {}
+        self._executor = None
+        # futures of calls that timed out and are still running, keyed by arm name
+        self._busy = {}
+
+    @classmethod
+    def from_config(cls, configs, timeout=None, sync=True):
+        """Open every arm described in configs
+        Args:
+            configs : list of dicts with "name" and the roarm() arguments
+        """
+        arms = collections.OrderedDict()
+        for config in configs:
+            config = dict(config)
+            name = config.pop("name")
+            arms[name] = roarm(**config)
+        return cls(arms, timeout=timeout, sync=sync)
+
+    def add(self, name, arm):
+        self.arms[name] = arm
+        self._shutdown_executor()
+
+    def remove(self, name):
+        arm = self.arms.pop(name)
+        self._busy.pop(name, None)
+        self._shutdown_executor()
+        return arm
+
+    @property
+    def unhealthy(self):
+        """Names of the arms still running a call that timed out"""
+        return [name for name, future in list(self._busy.items()) if not future.done()]
+
+    def __len__(self):
+        return len(self.arms)
+
+    def __getitem__(self, name):
+        return self.arms[name]
+
+    def __getattr__(self, method):
+        if method.startswith("_") or not hasattr(roarm, method):
+            raise AttributeError(method)
+
+        def fan_out(*args, **kwargs):
+            return self.call(method, *args, **kwargs)
+        fan_out.__name__ = method
+        return fan_out
+
+    def call(self, method, *args, **kwargs):
+        """Call the same roarm method on every arm
+        Args:
+            method  : roarm method name, type : str
+            timeout : per-arm timeout in seconds, keyword only
+            names   : arms to address, default all, keyword only
+        Return:
+            dict: ArmResult keyed by arm name
+        """
+        timeout = kwargs.pop("timeout", self.timeout)
+        names = kwargs.pop("names", None)
+        return self.map(lambda name, arm: getattr(arm, method)(*args, **kwargs), timeout=timeout, names=names)
+
+    def map(self, func, timeout=None, names=None):
+        """Run func(name, arm) for every arm concurrently, e.g. to send different poses per arm type
+        Args:
+            func    : callable taking (name, arm)
+            timeout : per-arm timeout in seconds
+            names   : arms to address, default all
+        Return:
+            dict: ArmResult keyed by arm name
+        """
+        names = list(self.arms) if names is None else list(names)
+        if not names:
+            return collections.OrderedDict()
+        unhealthy = set(self.unhealthy)
+        ready = [name for name in names if name not in unhealthy]
+        barrier = threading.Barrier(len(ready)) if self.sync and len(ready) > 1 else None
+        executor = self._get_executor()
+        futures = collections.OrderedDict(
+            (name, executor.submit(self._run, func, name, self.arms[name], barrier)) for name in ready)
+
+        results = collections.OrderedDict()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for name in names:
+            future = futures.get(name)
+            if future is None:
+                results[name] = ArmResult(name, None, TimeoutError(f"{name} is still busy with a call that timed out"),
+                                          None)
+                continue
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            try:
+                results[name] = future.result(remaining)
+            except TimeoutError:
+                results[name] = ArmResult(name, None, TimeoutError(f"{name} did not answer within {timeout}s"), None)
+                self._mark_busy(name, future)
+                if barrier is not None:
+                    barrier.abort()
+            self.last_latency[name] = results[name].latency
+        return results
+
+    def feedback_get(self, timeout=None, names=None):
+        """Get feedback from all arms in one call
+        Return:
+            dict: ArmResult keyed by arm name, value is the feedback list
+        """
+        return self.call("feedback_get", timeout=self.timeout if timeout is None else timeout, names=names)
+
+    def disconnect(self):
+        """Disconnect every arm
+        """
+        results = self.call("disconnect")
+        self._shutdown_executor()
+        return results
+
+    def _run(self, func, name, arm, barrier):
+        if barrier is not None:
+            try:
+                barrier.wait(self.sync_timeout)
+            except threading.BrokenBarrierError:
+                pass
+        start = time.perf_counter()
+        try:
+            value = func(name, arm)
+            error = None
+        except Exception as e:
+            self.log.error("[fleet] %s failed: %s", name, e)
+            value, error = None, e
+        return ArmResult(name, value, error, time.perf_counter() - start)
+
+    def _mark_busy(self, name, future):
+        self.log.warning("[fleet] %s timed out, skipping it until its call returns", name)
+        self._busy[name] = future
+
+        def done(future):
+            if self._busy.get(name) is future:
+                self._busy.pop(name, None)
+                self.log.info("[fleet] %s answered again", name)
+        future.add_done_callback(done)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.arms)), thread_name_prefix="roarm-fleet")
+        return self._executor
+
+    def _shutdown_executor(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
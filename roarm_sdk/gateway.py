@@ -0,0 +1,606 @@
+# coding=utf-8
+"""Share one roarm between processes over a local TCP socket.
+
+    python -m roarm_sdk.gateway --roarm-type roarm_m2 --port /dev/ttyUSB0 --listen 127.0.0.1:8765
+
+The gateway owns the serial port. Clients speak the firmware protocol,
+one JSON command per line, and get a {"gateway": ...} answer to every
+command but a feedback request, so any roarm can use it as its transport:
+
+    arm = roarm(roarm_type="roarm_m2", transport=GatewayClient(port=8765))
+"""
+import argparse
+import collections
+import json
+import logging
+import math
+import select
+import socket
+import socketserver
+import threading
+import time
+
+from roarm_sdk.common import JsonCmd, COMMAND_RADIAN_KEYS, COMMAND_ANGLE_KEYS, ANGLE_SPEED_STEPS, ANGLE_ACC_STEPS
+from roarm_sdk.utils import RoarmDataException, RoarmTimeoutException
+
+# commands that move or de-energize the arm, only the motion owner may send them
+MOTION_COMMANDS = frozenset((
+    JsonCmd.JOINT_RADIAN_CTRL,
+    JsonCmd.JOINTS_RADIAN_CTRL,
+    JsonCmd.JOINT_ANGLE_CTRL,
+    JsonCmd.JOINTS_ANGLE_CTRL,
+    JsonCmd.POSE_CTRL,
+    JsonCmd.TORQUE_SET,
+    JsonCmd.DYNAMIC_ADAPTATION_SET,
+    JsonCmd.MIDDLE_SET,
+))
+
+# commands changing settings every client shares, guarded by the motion owner as well
+CONFIG_COMMANDS = frozenset((
+    JsonCmd.ECHO_SET,
+    JsonCmd.GRIPPER_MODE_SET,
+    JsonCmd.WIFI_ON_BOOT,
+    JsonCmd.AP_SET,
+    JsonCmd.STA_SET,
+    JsonCmd.APSTA_SET,
+    JsonCmd.WIFI_CONFIG_CREATE_BY_STATUS,
+    JsonCmd.WIFI_CONFIG_CREATE_BY_INPUT,
+    JsonCmd.WIFI_STOP,
+))
+
+OWNER_COMMANDS = MOTION_COMMANDS | CONFIG_COMMANDS
+
+
+def _mirrored(values, mirror):
+    values[-1] = mirror - values[-1]
+    return values
+
+def _joint_value(roarm_type, command, key, mirror):
+    value = command[key]
+    return mirror - value if command["joint"] == len(COMMAND_RADIAN_KEYS[roarm_type]) else value
+
+def _angle_speed(command):
+    return {"speed": int(round(command["spd"] * ANGLE_SPEED_STEPS / 180)),
+            "acc": int(round(command["acc"] * ANGLE_ACC_STEPS / 180))}
+
+def _pose(roarm_type, command):
+    if roarm_type == "roarm_m3":
+        pose = [command[key] for key in ("x", "y", "z")] + [math.degrees(command[key]) for key in ("t", "r", "g")]
+    else:
+        pose = [command[key] for key in ("x", "y", "z")] + [math.degrees(command["t"])]
+    return _mirrored(pose, 180)
+
+def _gripper_mode(command):
+    return json.loads(command["step"])["mode"]
+
+# the public CommandGenerator call of each firmware command, undoing the unit conversions of its encoder
+_DECODERS = {
+    JsonCmd.ECHO_SET: lambda t, c: ("echo_set", {"cmd": c["cmd"]}),
+    JsonCmd.MIDDLE_SET: lambda t, c: ("middle_set", {}),
+    JsonCmd.LED_CTRL: lambda t, c: ("led_ctrl", {"led": c["led"]}),
+    JsonCmd.TORQUE_SET: lambda t, c: ("torque_set", {"cmd": c["cmd"]}),
+    JsonCmd.DYNAMIC_ADAPTATION_SET: lambda t, c: (
+        "dynamic_adaptation_set", {"mode": c["mode"], "torques": [c[key] for key in COMMAND_ANGLE_KEYS[t]]}),
+    JsonCmd.JOINT_RADIAN_CTRL: lambda t, c: (
+        "joint_radian_ctrl",
+        {"joint": c["joint"], "radian": _joint_value(t, c, "rad", math.pi), "speed": c["spd"], "acc": c["acc"]}),
+    JsonCmd.JOINTS_RADIAN_CTRL: lambda t, c: (
+        "joints_radian_ctrl",
+        {"radians": _mirrored([c[key] for key in COMMAND_RADIAN_KEYS[t]], math.pi), "speed": c["spd"],
+         "acc": c["acc"]}),
+    JsonCmd.JOINT_ANGLE_CTRL: lambda t, c: (
+        "joint_angle_ctrl", dict(joint=c["joint"], angle=_joint_value(t, c, "angle", 180), **_angle_speed(c))),
+    JsonCmd.JOINTS_ANGLE_CTRL: lambda t, c: (
+        "joints_angle_ctrl", dict(angles=_mirrored([c[key] for key in COMMAND_ANGLE_KEYS[t]], 180),
+                                  **_angle_speed(c))),
+    JsonCmd.POSE_CTRL: lambda t, c: ("pose_ctrl", {"pose": _pose(t, c)}),
+    JsonCmd.GRIPPER_MODE_SET: lambda t, c: ("gripper_mode_set", {"mode": _gripper_mode(c)}),
+    JsonCmd.WIFI_ON_BOOT: lambda t, c: ("wifi_on_boot", {"wifi_cmd": c["mode"]}),
+    JsonCmd.AP_SET: lambda t, c: ("ap_set", {"ssid": c["ssid"], "password": c["password"]}),
+    JsonCmd.STA_SET: lambda t, c: ("sta_set", {"ssid": c["ssid"], "password": c["password"]}),
+    JsonCmd.APSTA_SET: lambda t, c: (
+        "apsta_set", {key: c[key] for key in ("ap_ssid", "ap_password", "sta_ssid", "sta_password")}),
+    JsonCmd.WIFI_CONFIG_CREATE_BY_STATUS: lambda t, c: ("wifi_config_creat_by_status", {}),
+    JsonCmd.WIFI_CONFIG_CREATE_BY_INPUT: lambda t, c: (
+        "wifi_config_creat_by_input", {key: c[key] for key in ("ap_ssid", "ap_password", "sta_ssid", "sta_password")}),
+    JsonCmd.WIFI_STOP: lambda t, c: ("wifi_stop", {}),
+}
+
+def _decode_command(roarm_type, command):
+    """Public roarm call of a firmware command
+    Return:
+        (method name, keyword arguments), raises RoarmDataException for an unknown or incomplete command
+    """
+    decoder = _DECODERS.get(command.get("T"))
+    if decoder is None:
+        raise RoarmDataException(f"unsupported command T:{command.get('T')}")
+    try:
+        return decoder(roarm_type, command)
+    except (KeyError, TypeError, ValueError) as e:
+        raise RoarmDataException(f"invalid T:{command.get('T')} command: {e!r}")
+
+
+def _frame(data):
+    # the firmware ends its frames with "}\r\n", FrameParser relies on it
+    return (json.dumps(data) + "\r\n").encode()
+
+
+class _Connection(object):
+    """One gateway client, frames to it are sent by its own thread."""
+    def __init__(self, sock, name, depth=256):
+        self.log = logging.getLogger('RoarmGateway')
+        self.sock = sock
+        self.name = name
+        self.feedback = True
+        self.dropped = 0
+        self._frames = collections.deque(maxlen=depth)
+        self._replies = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"roarm-gateway-{name}")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def send(self, frame):
+        """Queue a frame, the oldest one is dropped when the client does not keep up"""
+        with self._condition:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._frames.append(frame)
+            self._condition.notify()
+
+    def reply(self, **fields):
+        """Queue a gateway answer, answers are never dropped since the client waits for each one"""
+        with self._condition:
+            self._replies.append(_frame(dict(fields)))
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._frames and not self._replies and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                frames = self._replies + list(self._frames)
+                self._replies = []
+                self._frames.clear()
+            try:
+                self.sock.sendall(b"".join(frames))
+            except OSError as e:
+                self.log.info("[gateway] %s: send failed: %s", self.name, e)
+                return
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        gateway = self.server.gateway
+        connection = gateway._connect(self.request, "%s:%s" % self.client_address[:2])
+        try:
+            for line in self.rfile:
+                gateway._handle(connection, line)
+        except OSError:
+            pass
+        finally:
+            gateway._disconnect(connection)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class RoarmGateway(object):
+    """
+    TCP gateway owning the serial port of one roarm.
+
+    Every client line is a firmware command. Feedback requests (T:105) are
+    answered from the latest frame of the gateway's own feedback reader,
+    so clients never add polling load to the serial link, and every
+    feedback frame is also broadcast to the clients that did not turn
+    feedback off. Other commands are decoded and sent through the public
+    roarm methods, so they are checked against the joint limits like any
+    other command, and answered with {"gateway": "ok", "T": code}, or
+    {"gateway": "error", "T": code, "error": reason} when refused, or
+    {"gateway": "timeout", ...} when the arm did not answer. Other frames,
+    e.g. echoes, go to the client that last sent a command with their T code.
+
+    Motion and shared settings commands (OWNER_COMMANDS) are only accepted
+    from the motion owner: the first client sending one, or asking with
+    {"gateway": "acquire"}, owns the motion until it sends
+    {"gateway": "release"}, disconnects or sends no such command for
+    owner_timeout seconds. {"gateway": "feedback", "enabled": false} stops
+    the broadcast to a client, {"gateway": "status"} reports the clients
+    and the owner.
+
+        arm = roarm(roarm_type="roarm_m2", port="/dev/ttyUSB0")
+        with RoarmGateway(arm, port=8765):
+            ...
+    """
+    def __init__(self, arm, host="127.0.0.1", port=0, owner_timeout=5.0, client_depth=256):
+        """
+        Args:
+            arm           : serial or transport roarm, the gateway starts its streaming
+            host          : listen address, default localhost only
+            port          : listen port, 0 picks a free one, see address
+            owner_timeout : seconds without a motion command after which the owner loses the motion,
+                            None keeps it until released or disconnected
+            client_depth  : frames queued for a slow client before the oldest is dropped
+        """
+        if arm.host:
+            raise RoarmDataException("The gateway needs a serial connection")
+        self.log = logging.getLogger('RoarmGateway')
+        self.arm = arm
+        self.owner_timeout = owner_timeout
+        self.client_depth = client_depth
+        self.owner = None
+        self._owner_time = 0.0
+        self._clients = ()
+        self._last_sender = {}
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _Handler, bind_and_activate=True)
+        self._server.gateway = self
+        self.address = self._server.server_address
+        self._thread = None
+
+    @property
+    def clients(self):
+        return len(self._clients)
+
+    def start(self):
+        if self.arm.feedback_reader is None:
+            self.arm.start_streaming(self.arm.feedback_rate)
+        self.arm.add_frame_listener(self._dispatch)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="roarm-gateway")
+        self._thread.daemon = True
+        self._thread.start()
+        self.log.info("[gateway] listening on %s:%s", *self.address[:2])
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.arm.remove_frame_listener(self._dispatch)
+        for connection in self._clients:
+            connection.close()
+            try:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def serve_forever(self):
+        """Run until interrupted"""
+        self.start()
+        try:
+            while True:
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _connect(self, sock, name):
+        connection = _Connection(sock, name, self.client_depth)
+        with self._lock:
+            self._clients += (connection,)
+        self.log.info("[gateway] %s connected", name)
+        return connection
+
+    def _disconnect(self, connection):
+        with self._lock:
+            self._clients = tuple(c for c in self._clients if c is not connection)
+            if self.owner is connection:
+                self.owner = None
+            for code, sender in list(self._last_sender.items()):
+                if sender is connection:
+                    del self._last_sender[code]
+        connection.close()
+        self.log.info("[gateway] %s disconnected, %d frames dropped", connection.name, connection.dropped)
+
+    def _dispatch(self, data, timestamp):
+        code = data.get("T")
+        frame = _frame(data)
+        if code == 1051:
+            for connection in self._clients:
+                if connection.feedback:
+                    connection.send(frame)
+            return
+        connection = self._last_sender.get(code)
+        if connection is not None:
+            connection.send(frame)
+
+    def _handle(self, connection, line):
+        line = line.strip()
+        if not line:
+            return
+        try:
+            command = json.loads(line)
+        except ValueError:
+            connection.reply(gateway="error", error="invalid json")
+            return
+        if not isinstance(command, dict):
+            connection.reply(gateway="error", error="expected a json object")
+            return
+        if "gateway" in command:
+            self._control(connection, command)
+            return
+        genre = command.get("T")
+        if genre == JsonCmd.FEEDBACK_GET:
+            timeout = max(self.arm.retry.timeout, 2 * self.arm.feedback_reader.period)
+            snapshot = self.arm.feedback_reader.wait(timeout, max_age=timeout)
+            if snapshot is not None:
+                connection.send(_frame(snapshot.data))
+            return
+        try:
+            method, kwargs = _decode_command(self.arm.type, command)
+        except RoarmDataException as e:
+            connection.reply(gateway="error", T=genre, error=str(e))
+            return
+        if genre in OWNER_COMMANDS and not self._claim(connection):
+            connection.reply(gateway="error", T=genre, error=f"motion is owned by {self.owner.name}")
+            return
+        self._last_sender[genre] = connection
+        try:
+            getattr(self.arm, method)(**kwargs)
+        except RoarmDataException as e:
+            connection.reply(gateway="error", T=genre, error=str(e))
+        except RoarmTimeoutException as e:
+            connection.reply(gateway="timeout", T=genre, error=str(e))
+        else:
+            connection.reply(gateway="ok", T=genre)
+
+    def _control(self, connection, command):
+        action = command["gateway"]
+        if action == "acquire":
+            ok = self._claim(connection)
+            connection.reply(gateway="acquire", ok=ok, owner=self.owner.name if self.owner else None)
+        elif action == "release":
+            with self._lock:
+                if self.owner is connection:
+                    self.owner = None
+            connection.reply(gateway="release", ok=True)
+        elif action == "feedback":
+            connection.feedback = bool(command.get("enabled", True))
+            connection.reply(gateway="feedback", enabled=connection.feedback)
+        elif action == "status":
+            connection.reply(gateway="status", clients=[c.name for c in self._clients],
+                             owner=self.owner.name if self.owner else None)
+        else:
+            connection.reply(gateway="error", error=f"unknown gateway action {action!r}")
+
+    def _claim(self, connection):
+        now = time.monotonic()
+        with self._lock:
+            owner = self.owner
+            if (owner is not None and owner is not connection and self.owner_timeout is not None
+                    and now - self._owner_time > self.owner_timeout):
+                self.log.info("[gateway] %s lost the motion after %.1fs idle", owner.name, now - self._owner_time)
+                owner = self.owner = None
+            if owner is None:
+                self.owner = connection
+                self.log.info("[gateway] %s owns the motion", connection.name)
+            if self.owner is connection:
+                self._owner_time = now
+                return True
+            return False
+
+
+class GatewayClient(object):
+    """
+    Serial port look-alike connected to a RoarmGateway, pass it as a roarm transport.
+
+    Every written command except a feedback request waits for the answer
+    of the gateway, so a refused command raises RoarmDataException, and a
+    command the arm did not answer RoarmTimeoutException, in the thread
+    that sent it. The answers are taken out of the byte stream, reads only
+    see the frames of the arm.
+
+    With feedback on, the gateway broadcasts every feedback frame; a roarm
+    streaming with feedback_rate=0 then only listens and sends no feedback
+    requests at all.
+
+        arm = roarm(roarm_type="roarm_m2", transport=GatewayClient(port=8765), streaming=True, feedback_rate=0)
+    """
+    def __init__(self, host="127.0.0.1", port=8765, timeout=0.1, feedback=True, connect_timeout=2.0,
+                 reply_timeout=5.0):
+        """
+        Args:
+            host            : gateway address
+            port            : gateway port
+            timeout         : read timeout in seconds, default 0.1
+            feedback        : whether receive the broadcast feedback frames
+            connect_timeout : seconds to wait for the connection
+            reply_timeout   : seconds to wait for the gateway to answer a command
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.feedback = feedback
+        self.connect_timeout = connect_timeout
+        self.reply_timeout = reply_timeout
+        self.sock = None
+        self._buf = bytearray()
+        self._partial = bytearray()
+        self._replies = collections.deque()
+        self._late_replies = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.open()
+
+    @property
+    def is_open(self):
+        return self.sock is not None
+
+    def open(self):
+        if self.sock is not None:
+            return
+        self.sock = socket.create_connection((self.host, self.port), self.connect_timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if not self.feedback:
+            self.set_feedback(False)
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def acquire(self):
+        """Ask for the motion
+        Return:
+            whether this client owns the motion now
+        """
+        return self._control({"gateway": "acquire"})["ok"]
+
+    def release(self):
+        self._control({"gateway": "release"})
+
+    def set_feedback(self, enabled):
+        self.feedback = enabled
+        self._control({"gateway": "feedback", "enabled": bool(enabled)})
+
+    def status(self):
+        """Return the gateway status, {"clients": [...], "owner": name or None}"""
+        reply = self._control({"gateway": "status"})
+        return {"clients": reply["clients"], "owner": reply["owner"]}
+
+    @property
+    def in_waiting(self):
+        with self._lock:
+            self._receive(0)
+            return len(self._buf)
+
+    def read(self, size=1):
+        with self._lock:
+            if not self._buf:
+                self._receive(self.timeout)
+            data = bytes(self._buf[:size])
+            del self._buf[:size]
+            return data
+
+    def write(self, data):
+        """Send commands and wait for the gateway to answer each of them
+        Raises RoarmDataException when the gateway refused one, RoarmTimeoutException when it did not answer.
+        """
+        answers = sum(1 for line in bytes(data).splitlines() if _answered(line))
+        with self._write_lock:
+            self.sock.sendall(data)
+            replies = [self._reply() for _ in range(answers)]
+        for reply in replies:
+            if reply.get("gateway") == "timeout":
+                raise RoarmTimeoutException(reply.get("error"))
+            if reply.get("gateway") == "error":
+                raise RoarmDataException(f"The gateway refused T:{reply.get('T')}: {reply.get('error')}")
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        with self._lock:
+            self._receive(0)
+            del self._buf[:]
+
+    def _control(self, command):
+        with self._write_lock:
+            self.sock.sendall(_frame(command))
+            reply = self._reply()
+        if reply.get("gateway") == "error":
+            raise RoarmDataException(reply.get("error"))
+        return reply
+
+    def _reply(self):
+        # the reading thread may take the answer out of the stream as well, so poll in short steps
+        deadline = time.monotonic() + self.reply_timeout
+        while True:
+            with self._lock:
+                if self._replies:
+                    return self._replies.popleft()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # an answer arriving later belongs to this command, not to the next one
+                    self._late_replies += 1
+                    raise RoarmTimeoutException(f"No answer from the gateway in {self.reply_timeout}s")
+                self._receive(min(remaining, 0.01))
+
+    def _receive(self, timeout):
+        # append whatever arrived, waiting up to timeout for the first bytes
+        while True:
+            readable, _, _ = select.select([self.sock], [], [], timeout)
+            if not readable:
+                return
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("The gateway closed the connection")
+            self._split(chunk)
+            timeout = 0
+
+    def _split(self, chunk):
+        # gateway answers go to the replies, everything else to the read buffer, a partial line waits
+        self._partial += chunk
+        end = self._partial.rfind(b"\n") + 1
+        if not end:
+            return
+        lines = bytes(self._partial[:end])
+        del self._partial[:end]
+        if b'"gateway"' not in lines:
+            self._buf += lines
+            return
+        for line in lines.splitlines(True):
+            if line.startswith(b'{"gateway"'):
+                if self._late_replies:
+                    self._late_replies -= 1
+                else:
+                    self._replies.append(json.loads(line))
+            else:
+                self._buf += line
+
+
+def _answered(line):
+    """Whether the gateway answers a written line, it answers everything but feedback requests"""
+    line = line.strip()
+    if not line:
+        return False
+    try:
+        command = json.loads(line)
+    except ValueError:
+        return True
+    return not (isinstance(command, dict) and command.get("T") == JsonCmd.FEEDBACK_GET and "gateway" not in command)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Share one roarm between processes over a local TCP socket.")
+    parser.add_argument("--roarm-type", required=True, choices=("roarm_m2", "roarm_m3"))
+    parser.add_argument("--port", required=True, help="serial port of the roarm")
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument("--listen", default="127.0.0.1:8765", help="address and port to listen on")
+    parser.add_argument("--feedback-rate", type=int, default=50, help="feedback requests per second")
+    parser.add_argument("--owner-timeout", type=float, default=5.0)
+    args = parser.parse_args()
+
+    from roarm_sdk.roarm import roarm
+    logging.basicConfig(level=logging.INFO)
+    host, _, port = args.listen.rpartition(":")
+    arm = roarm(roarm_type=args.roarm_type, port=args.port, baudrate=args.baudrate,
+                streaming=True, feedback_rate=args.feedback_rate)
+    try:
+        RoarmGateway(arm, host=host or "127.0.0.1", port=int(port), owner_timeout=args.owner_timeout).serve_forever()
+    finally:
+        arm.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,28 +2,61 @@
 
 import sys
 import logging
+import contextlib
+import threading
 import time
 import math
 
 from roarm_sdk.logger import setup_logging
-from roarm_sdk.utils import calibration_parameters
-from roarm_sdk.common import JsonCmd, DataProcessor
+from roarm_sdk.utils import calibration_parameters, skip_calibration, check_trajectory
+from roarm_sdk.common import JsonCmd, DataProcessor, command_encoders
 
 
 class CommandGenerator(DataProcessor):
 
-    def __init__(self, roarm_type=None, debug=False):
+    def __init__(self, roarm_type=None, debug=False, validate=True):
         """
         Args:
             roarm_type : "roarm_m2" or "roarm_m3, type : str
             debug : whether show debug info
+            validate : whether check parameters before sending
         """
         self.type = roarm_type
         self.debug = debug
         setup_logging(self.debug)
         self.log = logging.getLogger(__name__)
-        self.calibration_parameters = calibration_parameters
+        self.validate = validate
+        self._skipping = threading.local()
+        self._encoders = command_encoders(self.type)
                 
+    @property
+    def calibration_parameters(self):
+        """Parameter check of the calling thread, a no-op when validation is off or skipped"""
+        if self.validate and not getattr(self._skipping, "active", False):
+            return calibration_parameters
+        return skip_calibration
+
+    @contextlib.contextmanager
+    def skip_validation(self):
+        """Skip parameter checks inside the block, e.g. for a trajectory checked by trajectory_check()
+        Only commands of the calling thread skip them, other threads sharing the arm are still checked.
+        """
+        active = getattr(self._skipping, "active", False)
+        self._skipping.active = True
+        try:
+            yield self
+        finally:
+            self._skipping.active = active
+
+    def trajectory_check(self, points, param_type="radians"):
+        """Check a whole trajectory against the joint limits in one call
+        Args:
+            points: joint vectors, type : List[List[float]] or N x k numpy array
+            param_type: "radians", "angles", "positions" or "torques", type : str
+        """
+        check_trajectory(self.type, points, param_type)
+        return 1
+
     def echo_set(self, cmd):
         """Set echo 
         Args:
@@ -42,11 +75,7 @@ class CommandGenerator(DataProcessor):
     def move_init(self):
         """Move roarm to home position
         """
-        switch_dict = {
-        "roarm_m2": [0, 0, 1.5708, 0],
-        "roarm_m3": [0, 0, 1.5708, 0, 0, 0],
-        }
-        radians = switch_dict[self.type]
+        radians = self._home_radians()
         self.joints_radian_ctrl(radians=radians,speed=100,acc=0)
         return 1  
 
@@ -115,12 +144,7 @@ class CommandGenerator(DataProcessor):
             list: a list of all radians, type : List[float]
         """
         value = self.feedback_get()
-        switch_dict = {
-            "roarm_m2": value[3:7],
-            "roarm_m3": value[4:10],
-        }
-        radians = switch_dict[self.type]
-        return radians
+        return self._joints_radian_from(value)
 
     def joint_angle_ctrl(self, joint, angle, speed, acc):
         """Send one angle of joint to robot arm
@@ -149,11 +173,7 @@ class CommandGenerator(DataProcessor):
             list: a list of all angles, type : List[float]
         """
         value = self.feedback_get()
-        switch_dict = {
-            "roarm_m2": value[3:7],
-            "roarm_m3": value[4:10],
-        }
-        radians = switch_dict[self.type]    
+        radians = self._joints_radian_from(value)
         angles = [(radian * 180 / math.pi) for radian in radians]
         return angles
 
@@ -174,11 +194,7 @@ class CommandGenerator(DataProcessor):
             speed: [1,4096], type : int
             acc: [1,254], type : int
         """
-        switch_dict = {
-            "roarm_m2": 4,
-            "roarm_m3": 6,
-        }
-        gripper = switch_dict[self.type]
+        gripper = self._gripper_joint()
         self.joint_radian_ctrl(joint=gripper,radian=radian,speed=speed,acc=acc) 
         return 1
         
@@ -189,11 +205,7 @@ class CommandGenerator(DataProcessor):
             speed: [1,4096], type : int
             acc: [1,254], type : int
         """
-        switch_dict = {
-            "roarm_m2": 4,
-            "roarm_m3": 6,
-        }
-        gripper = switch_dict[self.type]        
+        gripper = self._gripper_joint()
         self.joint_angle_ctrl(joint=gripper,angle=angle,speed=speed,acc=acc) 
         return 1        
                         
@@ -202,27 +214,16 @@ class CommandGenerator(DataProcessor):
         Return:
             gripper radian, type : float
         """
-        switch_dict = {
-            "roarm_m2": 6,
-            "roarm_m3": 9,
-        }
-        gripper = switch_dict[self.type]        
         value = self.feedback_get()
-        radian = value[gripper]
-        return radian
+        return self._gripper_radian_from(value)
 
     def gripper_angle_get(self):
         """Get the angle of gripper
         Return:
             gripper angle, type : float
         """
-        switch_dict = {
-            "roarm_m2": 6,
-            "roarm_m3": 9,
-        }
-        gripper = switch_dict[self.type]                 
         value =  self.feedback_get()
-        angle = (value[gripper]*180)/math.pi
+        angle = (self._gripper_radian_from(value)*180)/math.pi
         return angle
         
     def pose_ctrl(self, pose):
@@ -238,16 +239,8 @@ class CommandGenerator(DataProcessor):
         Return:
             list : a list of coords value, type : List[float] 
         """  
-        poses = []               
         value =  self.feedback_get() 
-        value.extend([0] * (20 - len(value)))       
-        switch_dict = {
-            "roarm_m2": value[0:3] + [value[6]],
-            "roarm_m3": value[0:4] + [value[8], value[9]],
-        }      
-        poses = switch_dict[self.type]                    
-        poses[3:] = [(pose * 180 / math.pi) for pose in poses[3:]] 
-        return poses
+        return self._pose_from(value)
         
     def wifi_on_boot(self, wifi_cmd):
         """Set wifi mode        
@@ -312,4 +305,37 @@ class CommandGenerator(DataProcessor):
         """Stop wifi
         """
         return self._mesg(JsonCmd.WIFI_STOP)
+
+    def _home_radians(self):
+        switch_dict = {
+        "roarm_m2": [0, 0, 1.5708, 0],
+        "roarm_m3": [0, 0, 1.5708, 0, 0, 0],
+        }
+        return switch_dict[self.type]
+
+    def _gripper_joint(self):
+        switch_dict = {
+            "roarm_m2": 4,
+            "roarm_m3": 6,
+        }
+        return switch_dict[self.type]
+
+    def _joints_radian_from(self, value):
+        switch_dict = {
+            "roarm_m2": value[3:7],
+            "roarm_m3": value[4:10],
+        }
+        return switch_dict[self.type]
+
+    def _gripper_radian_from(self, value):
+        switch_dict = {
+            "roarm_m2": 6,
+            "roarm_m3": 9,
+        }
+        return value[switch_dict[self.type]]
+
+    def _pose_from(self, value):
+        if self.type == "roarm_m3":
+            return value[0:3] + [value[3] * 180 / math.pi, value[8] * 180 / math.pi, value[9] * 180 / math.pi]
+        return value[0:3] + [value[6] * 180 / math.pi]
                 
\ No newline at end of file
@@ -0,0 +1,224 @@
+# coding=utf-8
+
+from __future__ import division
+import math
+
+import numpy as np
+
+from roarm_sdk.utils import COMPILED_LIMITS, RoarmDataException
+
+# (a, b) of each link in mm: a along the link, b the perpendicular offset.
+# A link at angle phi from the vertical reaches r = a*sin(phi) + b*cos(phi), z = a*cos(phi) - b*sin(phi).
+LINKS = {
+    "roarm_m2": {
+        "shoulder": (236.82, 30.0),
+        "elbow": (280.15, 1.73),
+    },
+    "roarm_m3": {
+        "shoulder": (236.82, 30.0),
+        "elbow": (215.99, 0.0),
+        "wrist": (67.85, 5.98),
+    },
+}
+
+JOINT_COUNTS = {
+    "roarm_m2": 4,
+    "roarm_m3": 6,
+}
+
+
+class Kinematics(object):
+    """
+    Batched forward and inverse kinematics of the RoArm-M2/M3.
+
+    Joints are the radians of joints_radian_get/joints_radian_ctrl and poses
+    use the units of pose_ctrl: x, y, z in mm, then the gripper angle in
+    degrees for the M2, or pitch, roll and gripper angle in degrees for the
+    M3. Pitch is the tool angle below the horizontal. Every method takes one
+    vector or an N x k array and answers in the same shape.
+
+        kin = Kinematics("roarm_m2")
+        poses = kin.fk(np.random.uniform(lo, hi, (10000, 4)))
+        joints, ok = kin.ik(poses, seed=current_joints)
+    """
+    def __init__(self, roarm_type, links=None):
+        """
+        Args:
+            roarm_type : "roarm_m2" or "roarm_m3", type : str
+            links      : link (a, b) lengths in mm overriding LINKS, e.g. {"wrist": (120.0, 0.0)} for a longer tool
+        """
+        if roarm_type not in LINKS:
+            raise RoarmDataException(f"Unknown roarm_type: {roarm_type}")
+        self.type = roarm_type
+        self.joints = JOINT_COUNTS[roarm_type]
+        self.links = dict(LINKS[roarm_type])
+        self.links.update(links or {})
+        self.wrist = "wrist" in self.links
+        a2, b2 = self.links["shoulder"]
+        a3, b3 = self.links["elbow"]
+        self._l2, self._d2 = math.hypot(a2, b2), math.atan2(b2, a2)
+        self._l3, self._d3 = math.hypot(a3, b3), math.atan2(b3, a3)
+        radians_min, radians_max = COMPILED_LIMITS[roarm_type]["radians"]
+        positions_min, positions_max = COMPILED_LIMITS[roarm_type]["positions"]
+        self.radians_min, self.radians_max = np.array(radians_min, float), np.array(radians_max, float)
+        self.positions_min, self.positions_max = np.array(positions_min, float), np.array(positions_max, float)
+
+    def fk(self, joints):
+        """Forward kinematics
+        Args:
+            joints : joint radians, type : array of shape (n,) or (N, n)
+        Return:
+            poses in pose_ctrl units, type : ndarray of shape (k,) or (N, k)
+        """
+        q, single = self._batch(joints, self.joints)
+        base, shoulder, elbow = q[:, 0], q[:, 1], q[:, 2]
+        r, z = self._link("shoulder", shoulder)
+        r3, z3 = self._link("elbow", shoulder + elbow)
+        r, z = r + r3, z + z3
+        if self.wrist:
+            tool = shoulder + elbow + q[:, 3]
+            r4, z4 = self._link("wrist", tool)
+            r, z = r + r4, z + z4
+            pitch = (tool + math.pi / 2) % (2 * math.pi) - math.pi
+            angles = np.column_stack((pitch, q[:, 4], q[:, 5]))
+        else:
+            angles = q[:, 3:4]
+        poses = np.column_stack((r * np.cos(base), r * np.sin(base), z, np.degrees(angles)))
+        return poses[0] if single else poses
+
+    def ik(self, poses, seed=None, elbow_up=True):
+        """Inverse kinematics
+        Args:
+            poses    : poses in pose_ctrl units, type : array of shape (k,) or (N, k)
+            seed     : joint radians to stay close to, e.g. the current joints or the previous path point,
+                       type : array of shape (n,) or (N, n); None prefers the front, elbow_up solution
+            elbow_up : preferred elbow branch when no seed is given
+        Return:
+            joints : joint radians, NaN where the pose is out of reach, type : ndarray of shape (n,) or (N, n)
+            ok     : whether the pose is reachable within the radians limits, type : bool or ndarray of shape (N,)
+        """
+        p, single = self._batch(poses, self.joints)
+        x, y, z = p[:, 0], p[:, 1], p[:, 2]
+        r = np.hypot(x, y)
+        base = np.arctan2(y, x)
+        n = len(p)
+        candidates = np.empty((4, n, self.joints))
+        reachable = np.empty((4, n), bool)
+        branches = ((1, 1), (1, -1), (-1, 1), (-1, -1)) if elbow_up else ((1, -1), (1, 1), (-1, -1), (-1, 1))
+        for i, (side, elbow_sign) in enumerate(branches):
+            # side -1 reaches behind the base by turning it half a revolution
+            b = base if side > 0 else np.where(base > 0, base - math.pi, base + math.pi)
+            wr, wz = side * r, z
+            if self.wrist:
+                tool = np.radians(p[:, 3]) + math.pi / 2
+                r4, z4 = self._link("wrist", tool)
+                wr, wz = wr - r4, wz - z4
+            shoulder, elbow, reachable[i] = self._planar_ik(wr, wz, elbow_sign)
+            candidates[i, :, 0] = b
+            candidates[i, :, 1] = shoulder
+            candidates[i, :, 2] = elbow
+            if self.wrist:
+                candidates[i, :, 3] = tool - shoulder - elbow
+                candidates[i, :, 4] = np.radians(p[:, 4])
+                candidates[i, :, 5] = np.radians(p[:, 5])
+            else:
+                candidates[i, :, 3] = np.radians(p[:, 3])
+
+        # shoulder, elbow and wrist limits span less than a revolution, bring each angle into its range
+        for j in range(1, 4 if self.wrist else 3):
+            low = self.radians_min[j]
+            candidates[..., j] = (candidates[..., j] - low) % (2 * math.pi) + low
+        if seed is None:
+            cost = np.broadcast_to(np.arange(4.0)[:, None], (4, n)).copy()
+        else:
+            s, _ = self._batch(seed, self.joints)
+            # the base limits exceed half a revolution, take the turn nearest the seed
+            turns = np.round((s[:, 0] - candidates[..., 0]) / (2 * math.pi))
+            candidates[..., 0] += 2 * math.pi * turns
+            delta = candidates - s
+            cost = np.einsum("bnj,bnj->bn", delta, delta)
+        within = reachable & self._within_limits(candidates)
+        # solutions within limits win, then any reachable one so callers can see how far off it is
+        cost = np.where(within, cost, np.where(reachable, cost + 1e9, np.inf))
+        best = np.argmin(cost, axis=0)
+        index = np.arange(n)
+        joints = candidates[best, index]
+        ok = within[best, index]
+        joints[~reachable[best, index]] = np.nan
+        if single:
+            return joints[0], bool(ok[0])
+        return joints, ok
+
+    def joints_within_limits(self, joints):
+        """Whether joint radians are within the radians limits
+        Return:
+            bool or ndarray of shape (N,)
+        """
+        q, single = self._batch(joints, self.joints)
+        ok = self._within_limits(q)
+        return bool(ok[0]) if single else ok
+
+    def poses_within_limits(self, poses):
+        """Whether poses are within the positions limits checked by pose_ctrl
+        Return:
+            bool or ndarray of shape (N,)
+        """
+        p, single = self._batch(poses, self.joints)
+        ok = np.all((p >= self.positions_min) & (p <= self.positions_max), axis=-1)
+        return bool(ok[0]) if single else ok
+
+    def reachable(self, poses, seed=None):
+        """Whether poses are within the positions limits and reachable within the radians limits
+        Return:
+            bool or ndarray of shape (N,)
+        """
+        return self.ik(poses, seed)[1] & self.poses_within_limits(poses)
+
+    def _within_limits(self, joints):
+        with np.errstate(invalid="ignore"):
+            return np.all((joints >= self.radians_min) & (joints <= self.radians_max), axis=-1)
+
+    def _link(self, name, phi):
+        a, b = self.links[name]
+        sin, cos = np.sin(phi), np.cos(phi)
+        return a * sin + b * cos, a * cos - b * sin
+
+    def _planar_ik(self, r, z, elbow_sign):
+        """Shoulder and elbow radians placing the end of the elbow link at (r, z)"""
+        l2, l3 = self._l2, self._l3
+        d2 = r * r + z * z
+        cos_gamma = (d2 - l2 * l2 - l3 * l3) / (2 * l2 * l3)
+        reachable = np.abs(cos_gamma) <= 1 + 1e-9
+        gamma = elbow_sign * np.arccos(np.clip(cos_gamma, -1, 1))
+        # angle of link 2 from the vertical
+        alpha = np.arctan2(r, z) - np.arctan2(l3 * np.sin(gamma), l2 + l3 * np.cos(gamma))
+        shoulder = alpha - self._d2
+        elbow = gamma + self._d2 - self._d3
+        return shoulder, elbow, reachable
+
+    @staticmethod
+    def _batch(values, width):
+        array = np.asarray(values, dtype=float)
+        single = array.ndim == 1
+        array = np.atleast_2d(array)
+        if array.shape[-1] != width:
+            raise RoarmDataException(f"Expected {width} values per row, got {array.shape[-1]}")
+        return array, single
+
+
+_KINEMATICS = {}
+
+def kinematics(roarm_type):
+    """Return the shared Kinematics of a roarm type with the default links."""
+    kin = _KINEMATICS.get(roarm_type)
+    if kin is None:
+        kin = _KINEMATICS[roarm_type] = Kinematics(roarm_type)
+    return kin
+
+def forward_kinematics(roarm_type, joints):
+    """Kinematics(roarm_type).fk(joints)"""
+    return kinematics(roarm_type).fk(joints)
+
+def inverse_kinematics(roarm_type, poses, seed=None):
+    """Kinematics(roarm_type).ik(poses, seed)"""
+    return kinematics(roarm_type).ik(poses, seed)
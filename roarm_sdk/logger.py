@@ -1,6 +1,13 @@
 # coding=utf-8
 import logging
-import logging.handlers
+import struct
+import threading
+import time
+
+from roarm_sdk.utils import RoarmDataException
+
+# handlers added by setup_logging, each only once however many roarms call it
+_handlers = {}
 
 def setup_logging(debug=False):
     root_logger = logging.getLogger()
@@ -9,16 +16,169 @@ def setup_logging(debug=False):
         fmt="%(asctime)s.%(msecs)03d %(levelname).4s [%(name)s] %(message)s",
         datefmt="%H:%M:%S",
     )
-    logger_handle = logging.StreamHandler()
-    logger_handle.setFormatter(debug_fomatter)
-    if debug:
-        logger_handle.setLevel(logging.DEBUG)
-        save = logging.handlers.RotatingFileHandler(
+    logger_handle = _handlers.get("stream")
+    if logger_handle is None:
+        logger_handle = _handlers["stream"] = logging.StreamHandler()
+        logger_handle.setFormatter(debug_fomatter)
+        logger_handle.setLevel(logging.WARNING)
+        root_logger.addHandler(logger_handle)
+    if not debug:
+        return
+    logger_handle.setLevel(logging.DEBUG)
+    if "file" not in _handlers:
+        # socket and pickle come with logging.handlers, only load them for the debug log file
+        from logging.handlers import RotatingFileHandler
+        save = _handlers["file"] = RotatingFileHandler(
         "python_debug.log", maxBytes=100*1024*1024, backupCount=1)
         save.setFormatter(debug_fomatter)
         root_logger.addHandler(save)
-    else:
-        logger_handle.setLevel(logging.WARNING)
+    # only a debug roarm makes debug calls build log records
+    root_logger.setLevel(logging.DEBUG)
+
+
+class ThrottledLogger(object):
+    """
+    Rate limited logging for high-frequency paths.
+
+    Each message format is logged at most once per interval, or every n-th
+    call, with the number of suppressed calls appended. Arguments are only
+    formatted when a record is emitted, and nothing is done at all while
+    the level is disabled.
+
+        log = ThrottledLogger(logging.getLogger('FeedbackReader'), interval=1.0)
+        log.debug("frame %s", frame)
+    """
+    def __init__(self, logger, interval=1.0, every=None):
+        """
+        Args:
+            logger   : logging.Logger
+            interval : shortest time in seconds between two records of one message
+            every    : log every n-th call of one message instead of by time
+        """
+        self.logger = logger
+        self.interval = interval
+        self.every = every
+        self._last = {}
+        self._suppressed = {}
+
+    def debug(self, msg, *args):
+        self.log(logging.DEBUG, msg, *args)
+
+    def info(self, msg, *args):
+        self.log(logging.INFO, msg, *args)
+
+    def warning(self, msg, *args):
+        self.log(logging.WARNING, msg, *args)
+
+    def log(self, level, msg, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        suppressed = self._suppressed.get(msg, 0)
+        if self.every is not None:
+            emit = suppressed + 1 >= self.every
+        else:
+            now = time.monotonic()
+            emit = now - self._last.get(msg, -self.interval) >= self.interval
+            if emit:
+                self._last[msg] = now
+        if not emit:
+            self._suppressed[msg] = suppressed + 1
+            return
+        self._suppressed[msg] = 0
+        if suppressed:
+            self.logger.log(level, msg + " (%d suppressed)", *(args + (suppressed,)))
+        else:
+            self.logger.log(level, msg, *args)
+
+
+CAPTURE_MAGIC = b"RCAP"
+CAPTURE_HEADER = struct.Struct("<4sH")
+# monotonic timestamp, direction, payload length
+CAPTURE_RECORD = struct.Struct("<dBI")
+CAPTURE_TX = 0
+CAPTURE_RX = 1
+
+
+class WireCapture(object):
+    """
+    Binary log of every byte written to and read from the roarm.
+
+    Each record is a little-endian (timestamp, direction, length) header
+    followed by the raw bytes, so captures stay small and cost one write
+    per chunk. Read them back with read_capture().
+    """
+    def __init__(self, filename):
+        """
+        Args:
+            filename : capture file, type : str
+        """
+        self.filename = filename
+        self.file = open(filename, "wb")
+        self.file.write(CAPTURE_HEADER.pack(CAPTURE_MAGIC, 1))
+        self._lock = threading.Lock()
+
+    def record(self, direction, data):
+        if not data or self.file.closed:
+            return
+        if isinstance(data, str):
+            data = data.encode()
+        with self._lock:
+            self.file.write(CAPTURE_RECORD.pack(time.monotonic(), direction, len(data)) + bytes(data))
+
+    def flush(self):
+        with self._lock:
+            self.file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+class CapturePort(object):
+    """Serial port wrapper recording writes and reads to a WireCapture."""
+    def __init__(self, port, capture):
+        self._port = port
+        self._capture = capture
+
+    def write(self, data):
+        self._capture.record(CAPTURE_TX, data)
+        return self._port.write(data)
+
+    def read(self, size=1):
+        data = self._port.read(size)
+        self._capture.record(CAPTURE_RX, data)
+        return data
+
+    def close(self):
+        self._port.close()
+        self._capture.close()
+
+    def __getattr__(self, name):
+        return getattr(self._port, name)
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._port, name, value)
+
 
-    root_logger.addHandler(logger_handle)
-    root_logger.setLevel(0)
+def read_capture(filename):
+    """Iterate over a WireCapture file
+    Return:
+        generator of (timestamp, direction, bytes), direction is CAPTURE_TX or CAPTURE_RX
+    """
+    with open(filename, "rb") as file:
+        magic, version = CAPTURE_HEADER.unpack(file.read(CAPTURE_HEADER.size))
+        if magic != CAPTURE_MAGIC:
+            raise RoarmDataException(f"{filename} is not a wire capture")
+        while True:
+            header = file.read(CAPTURE_RECORD.size)
+            if len(header) < CAPTURE_RECORD.size:
+                return
+            timestamp, direction, length = CAPTURE_RECORD.unpack(header)
+            data = file.read(length)
+            if len(data) < length:
+                return
+            yield timestamp, direction, data
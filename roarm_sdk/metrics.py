@@ -0,0 +1,248 @@
+# coding=utf-8
+
+from __future__ import division
+import bisect
+import threading
+
+from roarm_sdk.common import JsonCmd
+
+# upper bounds in seconds of the command latency buckets, the last bucket is +Inf
+LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+COMMAND_NAMES = {value: name.lower() for name, value in vars(JsonCmd).items() if name.isupper()}
+
+
+class Histogram(object):
+    """Latency histogram with fixed bucket bounds in seconds."""
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q quantile, inf when it is past the last bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            if total >= rank:
+                return bound
+        return float("inf")
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.mean,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip(self.buckets + (float("inf"),), self.counts)),
+        }
+
+
+class CommandMetrics(object):
+    """Counters of one JsonCmd code."""
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.sent = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.latency = Histogram(buckets)
+
+    def as_dict(self):
+        return {
+            "sent": self.sent,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "latency": self.latency.as_dict(),
+        }
+
+
+class Metrics(object):
+    """
+    Counters and latency histograms of one roarm connection.
+
+    Each request is counted under its JsonCmd code with the time from the
+    first try to the answer (or to the write for commands without an
+    answer), the retries it needed and whether it ran out of tries. The
+    connection counts bytes written and read, frames that failed to
+    decode and bytes thrown away when the input buffer is cleared.
+
+    A roarm only collects metrics when built with metrics=True, otherwise
+    its metrics attribute is None and no counter is touched.
+
+        arm = roarm(roarm_type="roarm_m2", port="/dev/ttyUSB0", metrics=True)
+        arm.metrics.as_dict()
+        text = arm.metrics.prometheus()
+    """
+    def __init__(self, labels=None, buckets=LATENCY_BUCKETS):
+        """
+        Args:
+            labels  : labels added to every exported sample, e.g. {"arm": "left"}, type : dict
+            buckets : latency bucket upper bounds in seconds
+        """
+        self.labels = dict(labels or {})
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.commands = {}
+            self.bytes_sent = 0
+            self.bytes_received = 0
+            self.parse_errors = 0
+            self.discarded_bytes = 0
+
+    def command(self, genre, latency, tries=1, timeout=False):
+        """Count one request
+        Args:
+            genre   : JsonCmd code, type : int
+            latency : seconds from the first try to the answer, type : float
+            tries   : number of tries, type : int
+            timeout : whether every try failed, type : bool
+        """
+        with self._lock:
+            metrics = self.commands.get(genre)
+            if metrics is None:
+                metrics = self.commands[genre] = CommandMetrics(self.buckets)
+            metrics.sent += 1
+            metrics.retries += tries - 1
+            if timeout:
+                metrics.timeouts += 1
+            else:
+                metrics.latency.observe(latency)
+
+    def error(self, genre):
+        """Count a request that raised an exception"""
+        with self._lock:
+            metrics = self.commands.get(genre)
+            if metrics is None:
+                metrics = self.commands[genre] = CommandMetrics(self.buckets)
+            metrics.errors += 1
+
+    # the byte and frame counters are updated by the reader thread and the callers alike
+    def sent(self, size):
+        with self._lock:
+            self.bytes_sent += size
+
+    def received(self, size):
+        with self._lock:
+            self.bytes_received += size
+
+    def parse_error(self):
+        with self._lock:
+            self.parse_errors += 1
+
+    def discarded(self, size):
+        with self._lock:
+            self.discarded_bytes += size
+
+    @property
+    def retries(self):
+        with self._lock:
+            return sum(metrics.retries for metrics in self.commands.values())
+
+    @property
+    def timeouts(self):
+        with self._lock:
+            return sum(metrics.timeouts for metrics in self.commands.values())
+
+    def as_dict(self):
+        with self._lock:
+            commands = {COMMAND_NAMES.get(genre, str(genre)): metrics.as_dict()
+                        for genre, metrics in sorted(self.commands.items())}
+            return {
+                "commands": commands,
+                "retries": sum(metrics.retries for metrics in self.commands.values()),
+                "timeouts": sum(metrics.timeouts for metrics in self.commands.values()),
+                "parse_errors": self.parse_errors,
+                "discarded_bytes": self.discarded_bytes,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+            }
+
+    def prometheus(self, prefix="roarm"):
+        """Export in the Prometheus text exposition format
+        Args:
+            prefix : metric name prefix, type : str
+        Return:
+            str
+        """
+        lines = []
+
+        def header(name, kind, text):
+            lines.append(f"# HELP {prefix}_{name} {text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        def sample(name, value, **labels):
+            lines.append(f"{prefix}_{name}{_labels(dict(self.labels, **labels))} {_number(value)}")
+
+        with self._lock:
+            commands = sorted(self.commands.items())
+            per_command = [(genre, {"cmd": COMMAND_NAMES.get(genre, str(genre)), "code": str(genre)}, metrics)
+                           for genre, metrics in commands]
+            for name, attribute, text in (("commands_total", "sent", "Requests sent by JsonCmd code."),
+                                          ("retries_total", "retries", "Retries needed by the requests."),
+                                          ("timeouts_total", "timeouts", "Requests that got no answer in any try."),
+                                          ("errors_total", "errors", "Requests that raised an exception.")):
+                header(name, "counter", text)
+                for genre, labels, metrics in per_command:
+                    sample(name, getattr(metrics, attribute), **labels)
+
+            header("request_latency_seconds", "histogram", "Time from the first try to the answer.")
+            for genre, labels, metrics in per_command:
+                histogram = metrics.latency
+                total = 0
+                for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                    total += count
+                    sample("request_latency_seconds_bucket", total, **dict(labels, le=_number(bound)))
+                sample("request_latency_seconds_sum", histogram.sum, **labels)
+                sample("request_latency_seconds_count", histogram.count, **labels)
+
+            counters = (("parse_errors_total", self.parse_errors, "Received frames that failed to decode."),
+                        ("discarded_bytes_total", self.discarded_bytes,
+                         "Received bytes thrown away when clearing the input buffer."),
+                        ("sent_bytes_total", self.bytes_sent, "Bytes written to the roarm."),
+                        ("received_bytes_total", self.bytes_received, "Bytes read from the roarm."))
+
+        for name, value, text in counters:
+            header(name, "counter", text)
+            sample(name, value)
+        return "\n".join(lines) + "\n"
+
+    def __repr__(self):
+        values = self.as_dict()
+        return (f"Metrics(requests={sum(m['sent'] for m in values['commands'].values())}, "
+                f"retries={values['retries']}, timeouts={values['timeouts']}, parse_errors={values['parse_errors']}, "
+                f"bytes_sent={values['bytes_sent']}, bytes_received={values['bytes_received']})")
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value)
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = ((key, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+               for key, value in labels.items())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
@@ -0,0 +1,210 @@
+# coding=utf-8
+
+from __future__ import division
+import collections
+
+import numpy as np
+
+from roarm_sdk.kinematics import Kinematics, kinematics
+from roarm_sdk.utils import RoarmDataException
+
+INTERPOLATIONS = ("linear", "cubic", "quintic")
+
+# time scaling s(u) of a rest-to-rest move and its peak speed relative to the mean speed
+PROFILES = {
+    "linear": (lambda u: u, 1.0),
+    "cubic": (lambda u: u * u * (3 - 2 * u), 1.5),
+    "quintic": (lambda u: u * u * u * (10 + u * (6 * u - 15)), 1.875),
+}
+
+
+def sample_times(duration, rate):
+    """Setpoint times from 0 to duration, 1 / rate apart and ending exactly at duration
+    A grid point closer than half a step to duration is left out, so the last two setpoints are never
+    a few microseconds apart.
+    """
+    step = 1.0 / rate
+    times = np.arange(0, duration, step)
+    if len(times) > 1 and duration - times[-1] < step / 2:
+        times = times[:-1]
+    return np.append(times, duration)
+
+
+class CartesianPath(object):
+    """
+    Cartesian tool path interpolated on the host into dense joint setpoints.
+
+    "linear" follows straight segments between the waypoints, timed along
+    the whole path by a rest-to-rest profile. "cubic" and "quintic" pass a
+    clamped spline through the waypoints; both start and stop at rest, the
+    quintic also with zero acceleration. With two waypoints every kind is a
+    straight line. The poses are solved once with batched IK, so a path can
+    be replayed any number of times at no extra cost.
+
+        path = CartesianPath("roarm_m2", [[250, -80, 120, 30], [250, 80, 120, 30]], speed=100)
+        arm.path_move(path)
+    """
+    def __init__(self, roarm_type, waypoints, duration=None, speed=None, interpolation="linear", profile="quintic",
+                 rate=50, seed=None, max_step=0.5, links=None):
+        """
+        Args:
+            roarm_type    : "roarm_m2" or "roarm_m3", type : str
+            waypoints     : poses in pose_ctrl units, at least two, type : List[List[float]]
+            duration      : move time in seconds
+            speed         : peak tool speed in mm/s, used when duration is None
+            interpolation : "linear", "cubic" or "quintic"
+            profile       : time scaling of a "linear" path, "linear", "cubic" or "quintic"
+            rate          : setpoints per second, default 50
+            seed          : joint radians the first setpoint stays close to, e.g. the current joints
+            max_step      : largest joint change in radians allowed between two setpoints
+            links         : link lengths overriding kinematics.LINKS
+        """
+        if interpolation not in INTERPOLATIONS:
+            raise RoarmDataException(f"interpolation must be one of {INTERPOLATIONS}, got {interpolation}")
+        if profile not in PROFILES:
+            raise RoarmDataException(f"profile must be one of {tuple(PROFILES)}, got {profile}")
+        self.type = roarm_type
+        self.kinematics = kinematics(roarm_type) if links is None else Kinematics(roarm_type, links)
+        waypoints = np.array(waypoints, dtype=float)
+        if waypoints.ndim != 2 or len(waypoints) < 2 or waypoints.shape[1] != self.kinematics.joints:
+            raise RoarmDataException(f"waypoints must be at least two poses of {self.kinematics.joints} values")
+        # a repeated waypoint would be a zero-length knot of the spline
+        keep = np.concatenate(([True], np.abs(np.diff(waypoints, axis=0)).max(axis=1) > 1e-12))
+        self.waypoints = waypoints = waypoints[keep] if keep.sum() >= 2 else waypoints[[0, -1]]
+        self.interpolation = interpolation
+        self.profile = profile
+        self.rate = rate
+        self.max_step = max_step
+
+        lengths = np.linalg.norm(np.diff(waypoints[:, :3], axis=0), axis=1)
+        # orientation or gripper only moves are timed by degrees instead of mm
+        turns = np.linalg.norm(np.diff(waypoints[:, 3:], axis=0), axis=1)
+        lengths = np.where(lengths > 0, lengths, turns)
+        length = lengths.sum()
+        if duration is None:
+            if not speed:
+                raise RoarmDataException("duration or speed is required")
+            peak = PROFILES[profile][1] if interpolation == "linear" else PROFILES[interpolation][1]
+            duration = length * peak / speed
+        self.length = float(length)
+        self.duration = max(float(duration), 1.0 / rate)
+
+        self.times = sample_times(self.duration, rate)
+        self.poses = self._interpolate(lengths)
+        self.joints = self._solve(seed, max_step)
+
+    def points(self):
+        """Return the setpoints as (timestamp, radians) tuples for TrajectoryExecutor"""
+        return list(zip(self.times.tolist(), self.joints.tolist()))
+
+    def __len__(self):
+        return len(self.times)
+
+    def __iter__(self):
+        return iter(self.points())
+
+    def _interpolate(self, lengths):
+        knots = np.concatenate(([0.0], np.cumsum(lengths)))
+        knots = knots / knots[-1] if knots[-1] else np.linspace(0, 1, len(knots))
+        if self.interpolation == "linear":
+            s = PROFILES[self.profile][0](self.times / self.duration)
+            return np.column_stack([np.interp(s, knots, column) for column in self.waypoints.T])
+        knot_times = knots * self.duration
+        velocities, accelerations = _clamped_cubic(knot_times, self.waypoints)
+        if self.interpolation == "cubic":
+            return _cubic_eval(knot_times, self.waypoints, accelerations, self.times)
+        accelerations[0] = accelerations[-1] = 0
+        return _quintic_eval(knot_times, self.waypoints, velocities, accelerations, self.times)
+
+    def _solve(self, seed, max_step):
+        kin = self.kinematics
+        if seed is None:
+            seed = kin.ik(self.poses[0])[0]
+        joints, ok = kin.ik(self.poses, seed=seed)
+        # warm start every setpoint from the one before it to stay on one branch
+        joints, ok = kin.ik(self.poses, seed=np.vstack((joints[:1], joints[:-1])))
+        if not ok.all():
+            index = int(np.argmin(ok))
+            raise RoarmDataException(
+                f"Pose {self.poses[index].round(2).tolist()} at {self.times[index]:.3f}s is out of reach")
+        steps = np.abs(np.diff(joints, axis=0)).max(axis=1) if len(joints) > 1 else np.zeros(1)
+        if steps.max() > max_step:
+            index = int(np.argmax(steps)) + 1
+            raise RoarmDataException(
+                f"Joints jump {steps.max():.3f} rad at {self.times[index]:.3f}s, the path crosses a singularity")
+        return joints
+
+
+def _clamped_cubic(t, y):
+    """Knot velocities and accelerations of the cubic spline through y with zero end velocity"""
+    n = len(t)
+    h = np.diff(t)
+    slopes = np.diff(y, axis=0) / h[:, None]
+    a = np.zeros((n, n))
+    rhs = np.zeros_like(y)
+    a[0, 0], a[0, 1] = 2 * h[0], h[0]
+    rhs[0] = 6 * slopes[0]
+    a[-1, -2], a[-1, -1] = h[-1], 2 * h[-1]
+    rhs[-1] = -6 * slopes[-1]
+    for i in range(1, n - 1):
+        a[i, i - 1], a[i, i], a[i, i + 1] = h[i - 1], 2 * (h[i - 1] + h[i]), h[i]
+        rhs[i] = 6 * (slopes[i] - slopes[i - 1])
+    m = np.linalg.solve(a, rhs)
+    velocities = np.zeros_like(y)
+    velocities[:-1] = slopes - h[:, None] * (2 * m[:-1] + m[1:]) / 6
+    velocities[-1] = 0
+    return velocities, m
+
+
+def _segments(t, times):
+    i = np.clip(np.searchsorted(t, times, side="right") - 1, 0, len(t) - 2)
+    h = (t[i + 1] - t[i])[:, None]
+    return i, h, (times[:, None] - t[i][:, None]) / h
+
+
+def _cubic_eval(t, y, m, times):
+    i, h, u = _segments(t, times)
+    w = 1 - u
+    return (w * y[i] + u * y[i + 1]
+            + h * h / 6 * ((w ** 3 - w) * m[i] + (u ** 3 - u) * m[i + 1]))
+
+
+def _quintic_eval(t, y, v, a, times):
+    i, h, u = _segments(t, times)
+    u2, u3 = u * u, u * u * u
+    u4, u5 = u3 * u, u3 * u2
+    h0 = 1 - 10 * u3 + 15 * u4 - 6 * u5
+    h1 = u - 6 * u3 + 8 * u4 - 3 * u5
+    h2 = 0.5 * u2 - 1.5 * u3 + 1.5 * u4 - 0.5 * u5
+    h3 = 0.5 * u3 - u4 + 0.5 * u5
+    h4 = -4 * u3 + 7 * u4 - 3 * u5
+    h5 = 10 * u3 - 15 * u4 + 6 * u5
+    return (h0 * y[i] + h1 * h * v[i] + h2 * h * h * a[i]
+            + h3 * h * h * a[i + 1] + h4 * h * v[i + 1] + h5 * y[i + 1])
+
+
+_PATHS = collections.OrderedDict()
+_PATH_CACHE_SIZE = 32
+
+def cartesian_path(roarm_type, waypoints, duration=None, speed=None, interpolation="linear", profile="quintic",
+                   rate=50, seed=None):
+    """Return a CartesianPath, reusing the one built for the same waypoints and timing
+    A path is only reused while it starts within max_step of seed, so it stays on the IK branch of the arm.
+    A path starting at a pose read from the arm never repeats, pass the start pose to reuse it on repeated cycles.
+    Return:
+        CartesianPath
+    """
+    key = (roarm_type, tuple(map(tuple, np.asarray(waypoints, dtype=float).tolist())), duration, speed,
+           interpolation, profile, rate)
+    path = _PATHS.get(key)
+    if path is not None and seed is not None and np.abs(path.joints[0] - np.asarray(seed)).max() > path.max_step:
+        path = None
+    if path is None:
+        path = CartesianPath(roarm_type, waypoints, duration=duration, speed=speed, interpolation=interpolation,
+                             profile=profile, rate=rate, seed=seed)
+        _PATHS[key] = path
+        if len(_PATHS) > _PATH_CACHE_SIZE:
+            _PATHS.popitem(last=False)
+    else:
+        _PATHS.move_to_end(key)
+    return path
@@ -0,0 +1,234 @@
+# coding=utf-8
+
+from __future__ import division
+import math
+
+import numpy as np
+
+from roarm_sdk.common import STEPS_PER_RADIAN
+from roarm_sdk.motion import sample_times
+from roarm_sdk.utils import RoarmDataException, SPEED_RANGE, ACC_RANGE
+
+PLAN_MODES = ("time_optimal", "min_jerk")
+
+# peak speed and peak acceleration of the quintic s(u) = 10u^3 - 15u^4 + 6u^5 for a unit move in unit time
+MIN_JERK_PEAK_VELOCITY = 1.875
+MIN_JERK_PEAK_ACC = 10 / math.sqrt(3)
+
+# most rounds of slowing down blended corners that accelerate too hard
+BLEND_ROUNDS = 100
+
+
+def radians_to_speed(velocity):
+    """Convert rad/s to the servo speed unit, 1 to 4096 (0 would mean the fastest)"""
+    return int(min(SPEED_RANGE[1], max(1, math.ceil(abs(velocity) * STEPS_PER_RADIAN))))
+
+def radians_to_acc(acceleration):
+    """Convert rad/s^2 to the servo acc unit, 1 to 254 (0 would mean the fastest)"""
+    return int(min(ACC_RANGE[1], max(1, math.ceil(abs(acceleration) * STEPS_PER_RADIAN / 100))))
+
+def speed_to_radians(speed):
+    """Convert the servo speed unit to rad/s, 0 is the fastest"""
+    return (speed or SPEED_RANGE[1]) / STEPS_PER_RADIAN
+
+def acc_to_radians(acc):
+    """Convert the servo acc unit to rad/s^2, 0 is the fastest"""
+    return (acc or ACC_RANGE[1]) * 100 / STEPS_PER_RADIAN
+
+
+class TrajectoryPlan(object):
+    """
+    Timing of a joint path through waypoints under per-joint limits.
+
+    "time_optimal" follows the piecewise linear path through the waypoints
+    as fast as the limits allow: the path is divided into steps of at most
+    resolution radians and the path speed is found by a forward (accelerate)
+    and a backward (brake) pass, starting and ending at rest. The velocity
+    changes linearly over each step, so it never jumps: corners are blended
+    within a fraction of a step and slow the arm down as much as their
+    sharpness needs, so dense paths such as drag teach recordings or
+    CartesianPath joints are followed without stopping, and the limits hold
+    between the grid points too, whatever rate points() samples at.
+    "min_jerk" stops at every waypoint with a quintic profile, the shortest
+    one the limits allow.
+
+        plan = TrajectoryPlan(waypoints, velocity=2.0, acceleration=8.0)
+        arm.trajectory_move(plan)
+    """
+    def __init__(self, waypoints, velocity=None, acceleration=None, mode="time_optimal", resolution=0.01):
+        """
+        Args:
+            waypoints    : joint radians, at least two, repeated waypoints are merged, type : List[List[float]]
+            velocity     : joint speed limit in rad/s, one value or one per joint, default the servo maximum
+            acceleration : joint acceleration limit in rad/s^2, one value or one per joint, default the servo maximum
+            mode         : "time_optimal" or "min_jerk"
+            resolution   : largest joint step in radians of the time_optimal path grid
+        """
+        if mode not in PLAN_MODES:
+            raise RoarmDataException(f"mode must be one of {PLAN_MODES}, got {mode}")
+        q = np.array(waypoints, dtype=float)
+        if q.ndim != 2 or len(q) < 2:
+            raise RoarmDataException("waypoints must be at least two joint vectors")
+        keep = np.concatenate(([True], np.abs(np.diff(q, axis=0)).max(axis=1) > 1e-12))
+        if keep.sum() < 2:
+            raise RoarmDataException("waypoints do not move")
+        self.waypoints = q = q[keep]
+        joints = q.shape[1]
+        self.velocity = self._limits(speed_to_radians(0) if velocity is None else velocity, joints, "velocity")
+        self.acceleration = self._limits(acc_to_radians(0) if acceleration is None else acceleration, joints,
+                                         "acceleration")
+        self.mode = mode
+        self.deltas = np.diff(q, axis=0)
+        if mode == "min_jerk":
+            durations = self._min_jerk_durations()
+            self.times = np.concatenate(([0.0], np.cumsum(durations)))
+        else:
+            self._grid, self._grid_times, self._grid_index, self._grid_velocities = self._time_optimal(resolution)
+            self.times = self._grid_times[self._grid_index]
+
+    @property
+    def duration(self):
+        return float(self.times[-1])
+
+    @property
+    def durations(self):
+        return np.diff(self.times)
+
+    def segment_velocities(self):
+        """Peak joint rad/s of each segment, type : ndarray of shape (N - 1, n)"""
+        if self.mode == "min_jerk":
+            return MIN_JERK_PEAK_VELOCITY * np.abs(self.deltas) / self.durations[:, None]
+        speeds = np.abs(self._grid_velocities)
+        return np.maximum.reduceat(np.maximum(speeds[:-1], speeds[1:]), self._grid_index[:-1], axis=0)
+
+    def segment_accelerations(self):
+        """Peak joint rad/s^2 of each segment, type : ndarray of shape (N - 1, n)"""
+        if self.mode == "min_jerk":
+            return MIN_JERK_PEAK_ACC * np.abs(self.deltas) / self.durations[:, None] ** 2
+        accelerations = np.abs(np.diff(self._grid_velocities, axis=0)) / np.diff(self._grid_times)[:, None]
+        return np.maximum.reduceat(accelerations, self._grid_index[:-1], axis=0)
+
+    def commands(self):
+        """Point-to-point moves in servo units, the firmware ramps each one
+        Return:
+            list of (radians, speed, acc) for joints_radian_ctrl, one per waypoint after the first
+        """
+        speeds = self.segment_velocities().max(axis=1)
+        accs = self.segment_accelerations().max(axis=1)
+        return [(radians, radians_to_speed(speed), radians_to_acc(acc))
+                for radians, speed, acc in zip(self.waypoints[1:].tolist(), speeds, accs)]
+
+    def points(self, rate=None):
+        """Timed setpoints for TrajectoryExecutor
+        Args:
+            rate : resample at this many setpoints per second, None returns the waypoints
+        Return:
+            list of (timestamp, radians)
+        """
+        if rate is None:
+            return list(zip(self.times.tolist(), self.waypoints.tolist()))
+        times = sample_times(self.duration, rate)
+        if self.mode == "time_optimal":
+            # the velocity changes linearly over every grid step
+            i = np.clip(np.searchsorted(self._grid_times, times, side="right") - 1, 0, len(self._grid) - 2)
+            elapsed = (times - self._grid_times[i])[:, None]
+            start, end = self._grid_velocities[i], self._grid_velocities[i + 1]
+            step = (self._grid_times[i + 1] - self._grid_times[i])[:, None]
+            radians = self._grid[i] + elapsed * (start + elapsed * (end - start) / (2 * step))
+            return list(zip(times.tolist(), radians.tolist()))
+        i = np.clip(np.searchsorted(self.times, times, side="right") - 1, 0, len(self.deltas) - 1)
+        u = np.clip((times - self.times[i]) / self.durations[i], 0, 1)
+        u = u * u * u * (10 + u * (6 * u - 15))
+        radians = self.waypoints[i] + u[:, None] * self.deltas[i]
+        return list(zip(times.tolist(), radians.tolist()))
+
+    def _min_jerk_durations(self):
+        distance = np.abs(self.deltas)
+        by_velocity = MIN_JERK_PEAK_VELOCITY * distance / self.velocity
+        by_acceleration = np.sqrt(MIN_JERK_PEAK_ACC * distance / self.acceleration)
+        return np.maximum(by_velocity, by_acceleration).max(axis=1)
+
+    def _time_optimal(self, resolution):
+        # grid of small linear steps, every waypoint is a grid point
+        counts = np.maximum(1, np.ceil(np.abs(self.deltas).max(axis=1) / resolution)).astype(int)
+        # a rest to rest move needs a grid point between start and end
+        counts[0] = max(counts[0], 2) if len(counts) == 1 else counts[0]
+        index = np.concatenate(([0], np.cumsum(counts)))
+        segment = np.repeat(np.arange(len(counts)), counts)
+        u = (np.arange(index[-1]) - index[segment]) / counts[segment]
+        grid = np.vstack((self.waypoints[segment] + u[:, None] * self.deltas[segment], self.waypoints[-1:]))
+
+        # path parameter s advances by 1 per grid step, x = (ds/dt)^2
+        steps = np.diff(grid, axis=0)
+        tangents = np.vstack((steps[:1], (steps[:-1] + steps[1:]) / 2, steps[-1:]))
+        curvature = np.vstack((np.zeros_like(steps[:1]), np.diff(steps, axis=0), np.zeros_like(steps[:1])))
+        v_limit = self.velocity ** 2 / np.maximum(steps ** 2, 1e-300)
+        x_max = np.full(len(grid), np.inf)
+        x_max[:-1] = v_limit.min(axis=1)
+        x_max[1:] = np.minimum(x_max[1:], x_max[:-1].copy())
+        with np.errstate(divide="ignore"):
+            bend_limit = (self.acceleration / np.abs(curvature)).min(axis=1)
+        # a corner turns the velocity of the steps on both sides, slow down on both of them
+        bend_limit[1:-1] = np.minimum(bend_limit[1:-1], np.minimum(bend_limit[:-2], bend_limit[2:]))
+        x_max = np.minimum(x_max, bend_limit)
+        x_max[0] = x_max[-1] = 0.0
+
+        acceleration = self.acceleration.tolist()
+        tangents, curvature = tangents.tolist(), curvature.tolist()
+
+        def bounds(i, x):
+            # range of d2s/dt2 keeping every joint acceleration q' s'' + q'' x within its limit
+            low, high = -math.inf, math.inf
+            for a, tangent, bend in zip(acceleration, tangents[i], curvature[i]):
+                if tangent == 0:
+                    continue
+                lo, hi = (-a - bend * x) / tangent, (a - bend * x) / tangent
+                if lo > hi:
+                    lo, hi = hi, lo
+                low, high = max(low, lo), min(high, hi)
+            return low, high
+
+        def passes(x_max):
+            x = x_max.tolist()
+            for i in range(len(x) - 1):
+                x[i + 1] = min(x[i + 1], max(0.0, x[i] + 2 * bounds(i, x[i])[1]))
+            for i in range(len(x) - 1, 0, -1):
+                x[i - 1] = min(x[i - 1], max(0.0, x[i] - 2 * bounds(i, x[i])[0]))
+            return np.array(x)
+
+        for _ in range(BLEND_ROUNDS):
+            x = passes(x_max)
+            rates = np.sqrt(x)
+            pair = rates[:-1] + rates[1:]
+            with np.errstate(divide="ignore"):
+                durations = np.where(pair > 0, 2 / pair, np.inf)
+            if not np.isfinite(durations).all():
+                raise RoarmDataException("Cannot time the path, it has a step the limits never allow")
+            # the velocity at a grid point follows the steps on both sides weighted by their durations, so
+            # the joints pass straight stretches exactly and cut each corner by a fraction of a step
+            weighted = steps * durations[:, None]
+            velocities = np.zeros_like(grid)
+            spans = (durations[:-1] + durations[1:])[:, None]
+            velocities[1:-1] = rates[1:-1, None] * (weighted[:-1] + weighted[1:]) / spans
+            excess = (np.abs(np.diff(velocities, axis=0)) / durations[:, None] / self.acceleration).max(axis=1)
+            over = np.flatnonzero(excess > 1 + 1e-9)
+            if not len(over):
+                break
+            # a blended corner accelerates harder than the grid estimate, slow down on both ends of its steps
+            scale = np.ones(len(x))
+            np.minimum.at(scale, over, 1 / excess[over])
+            np.minimum.at(scale, over + 1, 1 / excess[over])
+            x_max = x * scale
+        else:
+            raise RoarmDataException("Cannot time the path within the acceleration limits")
+        times = np.concatenate(([0.0], np.cumsum(durations)))
+        moves = (velocities[:-1] + velocities[1:]) / 2 * durations[:, None]
+        positions = np.vstack((grid[:1], grid[0] + np.cumsum(moves, axis=0)))
+        return positions, times, index, velocities
+
+    @staticmethod
+    def _limits(values, joints, name):
+        values = np.broadcast_to(np.asarray(values, dtype=float), (joints,)).copy()
+        if (values <= 0).any():
+            raise RoarmDataException(f"{name} limits must be positive, got {values.tolist()}")
+        return values
@@ -0,0 +1,216 @@
+# coding=utf-8
+
+from __future__ import division
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+from roarm_sdk.utils import RoarmDataException
+
+RECORDING_EXTENSION = ".rarm"
+RECORDING_MAGIC = b"RARM"
+RECORDING_VERSION = 1
+# magic, version, joint count, roarm type, padding to 32 bytes
+HEADER = struct.Struct("<4sHH16s8x")
+
+JOINT_COUNTS = {
+    "roarm_m2": 4,
+    "roarm_m3": 6,
+}
+
+
+def is_recording(filename):
+    return str(filename).endswith(RECORDING_EXTENSION)
+
+
+class RecordingWriter(object):
+    """
+    Append-only writer of drag teach samples.
+
+    The file starts with a 32 byte header (magic, version, joint count and
+    roarm type) followed by fixed-width little-endian float64 records of
+    [timestamp, joint 1, ..., joint n]. Records are written as they arrive,
+    so a crash loses at most the last flush_interval seconds.
+    """
+    def __init__(self, filename, roarm_type, joints=None, flush_interval=1.0, append=False):
+        """
+        Args:
+            filename       : recording file, type : str
+            roarm_type     : "roarm_m2" or "roarm_m3", type : str
+            joints         : joint count, default from roarm_type
+            flush_interval : seconds between flushes to disk, 0 flushes every record
+            append         : whether continue an existing recording
+        """
+        if joints is None:
+            if roarm_type not in JOINT_COUNTS:
+                raise RoarmDataException(f"Unknown roarm_type: {roarm_type}")
+            joints = JOINT_COUNTS[roarm_type]
+        self.filename = filename
+        self.roarm_type = roarm_type
+        self.joints = joints
+        self.flush_interval = flush_interval
+        self.record = struct.Struct(f"<{joints + 1}d")
+        self.count = 0
+        if append and os.path.exists(filename) and os.path.getsize(filename) >= HEADER.size:
+            with RecordingReader(filename) as reader:
+                if reader.joints != joints:
+                    raise RoarmDataException(f"{filename} has {reader.joints} joints, expected {joints}")
+                self.count = len(reader)
+            self.file = open(filename, "r+b")
+            # drop a partial record left by a crash
+            self.file.truncate(HEADER.size + self.count * self.record.size)
+            self.file.seek(0, os.SEEK_END)
+        else:
+            self.file = open(filename, "wb")
+            self.file.write(HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, joints, roarm_type.encode()))
+        self._last_flush = time.monotonic()
+
+    def write(self, timestamp, radians):
+        """Append one sample
+        Args:
+            timestamp : seconds, type : float
+            radians   : joint radians, type : List[float]
+        """
+        self.file.write(self.record.pack(timestamp, *radians))
+        self.count += 1
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self.file.flush()
+            self._last_flush = now
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class RecordingReader(object):
+    """
+    Memory-mapped reader of a recording written by RecordingWriter.
+
+    Samples are read straight from the mapped file; iterating yields
+    (timestamp, radians) tuples that TrajectoryExecutor.run accepts.
+    """
+    def __init__(self, filename):
+        """
+        Args:
+            filename : recording file, type : str
+        """
+        self.filename = filename
+        self.file = open(filename, "rb")
+        header = self.file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            self.file.close()
+            raise RoarmDataException(f"{filename} is not a roarm recording")
+        magic, version, joints, roarm_type = HEADER.unpack(header)
+        if magic != RECORDING_MAGIC or version > RECORDING_VERSION:
+            self.file.close()
+            raise RoarmDataException(f"{filename} is not a supported roarm recording")
+        self.joints = joints
+        self.roarm_type = roarm_type.rstrip(b"\0").decode()
+        self.width = joints + 1
+        self.record = struct.Struct(f"<{self.width}d")
+        size = os.path.getsize(filename)
+        self._count = (size - HEADER.size) // self.record.size
+        self._mmap = None
+        self._values = None
+        if self._count:
+            self._mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            if sys.byteorder == "little":
+                end = HEADER.size + self._count * self.record.size
+                self._values = memoryview(self._mmap)[HEADER.size:end].cast("d")
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        if self._values is not None:
+            start = index * self.width
+            row = self._values[start:start + self.width]
+            return row[0], row[1:].tolist()
+        row = self.record.unpack_from(self._mmap, HEADER.size + index * self.record.size)
+        return row[0], list(row[1:])
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    def as_array(self):
+        """Return an N x (joints + 1) numpy array view of the samples, column 0 is the timestamp"""
+        import numpy as np
+        if not self._count:
+            return np.empty((0, self.width))
+        return np.frombuffer(self._mmap, dtype="<f8", count=self._count * self.width,
+                             offset=HEADER.size).reshape(self._count, self.width)
+
+    def close(self):
+        if self._values is not None:
+            self._values.release()
+            self._values = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # a numpy view from as_array() still uses the mapping
+                pass
+            self._mmap = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def json_to_recording(json_filename, recording_filename, roarm_type=None):
+    """Convert a drag teach JSON file to the recording format
+    Args:
+        json_filename      : drag teach JSON file, type : str
+        recording_filename : recording file to write, type : str
+        roarm_type         : "roarm_m2" or "roarm_m3", default from the joint count
+    Return:
+        number of records, type : int
+    """
+    with open(json_filename, "r") as file:
+        data = json.load(file)
+    if not data:
+        raise RoarmDataException(f"{json_filename} has no records")
+    joints = len(data[0]["radians"])
+    if roarm_type is None:
+        for name, count in JOINT_COUNTS.items():
+            if count == joints:
+                roarm_type = name
+    if roarm_type is None:
+        raise RoarmDataException(f"Cannot tell the roarm_type of {joints} joint records")
+    with RecordingWriter(recording_filename, roarm_type, joints=joints, flush_interval=float("inf")) as writer:
+        for record in data:
+            writer.write(record["timestamped"], record["radians"])
+        return writer.count
+
+
+def recording_to_json(recording_filename, json_filename):
+    """Convert a recording to the drag teach JSON format
+    Args:
+        recording_filename : recording file, type : str
+        json_filename      : drag teach JSON file to write, type : str
+    Return:
+        number of records, type : int
+    """
+    with RecordingReader(recording_filename) as reader:
+        data = [{"timestamped": timestamp, "radians": radians} for timestamp, radians in reader]
+    with open(json_filename, "w") as file:
+        json.dump(data, file, indent=4)
+    return len(data)
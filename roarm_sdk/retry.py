@@ -0,0 +1,108 @@
+# coding=utf-8
+
+from __future__ import division
+import time
+
+
+class RetryPolicy(object):
+    """
+    How long to wait for an answer and how often to ask again.
+
+    With adaptive timeouts the wait for an answer follows the measured
+    round trip time like TCP does: smoothed RTT plus four times its mean
+    deviation, kept between min_timeout and timeout, so a quick link gives
+    up on a lost frame early while a slow one is not retried needlessly.
+    Every unanswered try makes the wait backoff_factor times longer, up to
+    timeout, and only a first try answered in time brings it back, since a
+    late answer cannot tell which try it belongs to. Retries start after a
+    pause growing the same way. Tries stop after attempts tries or once
+    deadline seconds have passed since the first one; the caller then
+    raises RoarmTimeoutException.
+
+        arm = roarm(roarm_type="roarm_m2", port="/dev/ttyUSB0",
+                    retry=RetryPolicy(attempts=5, deadline=0.3))
+    """
+    def __init__(self, attempts=10, deadline=1.0, timeout=0.1, min_timeout=0.02, adaptive=True,
+                 backoff=0.002, backoff_factor=2.0, max_backoff=0.05):
+        """
+        Args:
+            attempts       : most tries of one request, type : int
+            deadline       : seconds from the first try after which no new try starts, None for no limit
+            timeout        : longest wait for an answer to one try in seconds
+            min_timeout    : shortest adaptive try timeout in seconds
+            adaptive       : whether derive the try timeout from the measured round trip time
+            backoff        : pause before the second try in seconds
+            backoff_factor : growth of the wait and the pause from try to try
+            max_backoff    : longest pause in seconds
+        """
+        self.attempts = max(1, int(attempts))
+        self.deadline = deadline
+        self.timeout = timeout
+        self.min_timeout = min(min_timeout, timeout)
+        self.adaptive = adaptive
+        self.backoff = backoff
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.srtt = None
+        self.rttvar = None
+        self.scale = 1.0
+
+    @property
+    def try_timeout(self):
+        """Current wait for one answer in seconds"""
+        if not self.adaptive or self.srtt is None:
+            return self.timeout
+        return min(self.timeout, max(self.min_timeout, self.srtt + 4 * self.rttvar) * self.scale)
+
+    def observe(self, rtt):
+        """Feed the round trip time of a first try answered in time"""
+        self.scale = 1.0
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar += (abs(self.srtt - rtt) - self.rttvar) / 4
+            self.srtt += (rtt - self.srtt) / 8
+
+    def failed(self):
+        """Wait longer after a try that was not answered in time"""
+        if self.adaptive and self.srtt is not None and self.try_timeout < self.timeout:
+            self.scale *= self.backoff_factor
+
+    def delay(self, attempt):
+        """Pause before try number attempt, counted from 0"""
+        if attempt == 0:
+            return 0.0
+        return min(self.max_backoff, self.backoff * self.backoff_factor ** (attempt - 1))
+
+    def next_timeout(self, start, clock=time.monotonic):
+        """Wait for an answer to the next try of a request first tried at start
+        Return:
+            seconds, or None once the deadline has passed
+        """
+        timeout = self.try_timeout
+        if self.deadline is None:
+            return timeout
+        remaining = start + self.deadline - clock()
+        if remaining <= 0:
+            return None
+        return min(timeout, remaining)
+
+    def tries(self, clock=time.monotonic, sleep=time.sleep):
+        """Yield (attempt, timeout) for each try, pausing between them
+        Return:
+            generator ending when the attempts or the deadline run out
+        """
+        start = clock()
+        for attempt in range(self.attempts):
+            pause = self.delay(attempt)
+            if pause:
+                sleep(pause)
+            timeout = self.next_timeout(start, clock)
+            if timeout is None:
+                return
+            yield attempt, timeout
+
+    def __repr__(self):
+        return (f"RetryPolicy(attempts={self.attempts}, deadline={self.deadline}, timeout={self.timeout}, "
+                f"try_timeout={self.try_timeout:.4f})")
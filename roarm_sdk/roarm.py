@@ -3,48 +3,108 @@
 from __future__ import division
 import time
 import threading
-import serial
-import requests
 import json
+import contextlib
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 from roarm_sdk.generate import CommandGenerator
-from roarm_sdk.common import JsonCmd, write, read
-from roarm_sdk.utils import calibration_parameters
+from roarm_sdk.common import JsonCmd, FeedbackReader, write, read
+from roarm_sdk.trajectory import TrajectoryExecutor
+from roarm_sdk.recording import RecordingWriter, RecordingReader, is_recording
+from roarm_sdk.sampler import DragTeachSampler
+from roarm_sdk.state import ArmState
+from roarm_sdk.subscription import Subscription
+from roarm_sdk.metrics import Metrics
+from roarm_sdk.command_queue import CommandQueue, CommandBatch, coalesce_key
+from roarm_sdk.logger import WireCapture, CapturePort, CAPTURE_TX, CAPTURE_RX
+from roarm_sdk.retry import RetryPolicy
+from roarm_sdk.utils import RoarmDataException, RoarmTimeoutException
 
 
 class roarm(CommandGenerator):
     """
     Roarm Python API communication class.
     """
-    def __init__(self, roarm_type=None, port=None, baudrate=115200, host=None, timeout=0.1, debug=False, thread_lock=True):
+    def __init__(self, roarm_type=None, port=None, baudrate=115200, host=None, timeout=0.1, debug=False, thread_lock=True,
+                 streaming=False, feedback_rate=50, http_timeout=1.0, http_retries=3, pipeline=False, validate=True,
+                 transport=None, capture=None, metrics=False, queued=False, queue_depth=64, confirm=False, retry=None):
         """
         Args:
             roarm_type    : port string
             port          : port string
             baudrate      : baud rate string, default '115200'
             host          : host string
-            timeout       : default 0.1
+            timeout       : longest wait for an answer in seconds, default 0.1
             debug         : whether show debug info
+            streaming     : whether read feedback in a background thread
+            feedback_rate : feedback request rate in Hz when streaming, default 50
+            http_timeout  : http request timeout in seconds, default 1.0
+            http_retries  : http retries with backoff, default 3
+            pipeline      : whether send http commands without waiting for the response
+            validate      : whether check parameters before sending
+            transport     : opened serial-like object used instead of port, e.g. simulator.SimulatedSerial
+            capture       : file name or logger.WireCapture recording every byte sent and received
+            metrics       : whether count requests, retries, latency and bytes in self.metrics, or a metrics.Metrics
+            queued        : whether send commands from a writer thread, superseded setpoints are coalesced
+            queue_depth   : most commands waiting in the queue, default 64
+            confirm       : whether wait for the echo of each command, needs streaming and echo_set(1)
+            retry         : retry.RetryPolicy, default up to 10 tries within 10 * timeout
+                            (http_timeout over http) with adaptive waits
         """
         self.type = roarm_type
-        super(roarm, self).__init__(self.type,debug)
-        self.calibration_parameters = calibration_parameters
+        super(roarm, self).__init__(self.type,debug,validate)
         self.thread_lock = thread_lock
         self.host =None            
+        self._http_session = None
         self.stop_flag = False
+        self._drag_teach = None
         self.base_controller = None
+        self.feedback_reader = None
+        self.command_queue = None
+        self.feedback_rate = feedback_rate
+        self._batch = None
+        self._subscriptions = ()
+        self._subscriptions_lock = threading.Lock()
+        self.confirm = confirm
+        self._write_lock = threading.Lock()
+        self._capture = None
+        self.metrics = None
+        if retry is None:
+            wait = http_timeout if host else timeout
+            retry = RetryPolicy(attempts=10, deadline=10 * wait, timeout=wait)
+        self.retry = retry
+        if metrics:
+            self.metrics = metrics if isinstance(metrics, Metrics) else Metrics(
+                labels={"roarm_type": roarm_type, "port": host or port or type(transport).__name__})
 
         if thread_lock:
             self.lock = threading.Lock()
+        if confirm and not streaming:
+            raise RoarmDataException("confirm requires streaming, echoes are read by the feedback reader")
         if host:
             self.host = host
+            from roarm_sdk.session import HttpSession
+            self._http_session = HttpSession(host, timeout=http_timeout, retries=http_retries, pipeline=pipeline)
+        elif transport is not None:
+            self._serial_port = transport
         else:    
+            import serial
             self._serial_port = serial.Serial()
             self._serial_port.port = port
             self._serial_port.baudrate = baudrate
-            self._serial_port.timeout = timeout
+            # a blocking read never outlasts the shortest wait, ReadLine keeps reading until its own timeout;
+            # a transport passed in is left as it is, ReadLine polls it when a read could outlast a try
+            self._serial_port.timeout = retry.min_timeout if timeout is None else min(timeout, retry.min_timeout)
             self._serial_port.rts = False
             self._serial_port.open() 
+        if capture is not None:
+            self._capture = capture if isinstance(capture, WireCapture) else WireCapture(capture)
+            if not self.host:
+                self._serial_port = CapturePort(self._serial_port, self._capture)
+        if streaming:
+            self.start_streaming(feedback_rate)
+        if queued:
+            self.start_queue(queue_depth)
 
     _write = write
     _read = read
@@ -59,6 +119,15 @@ class roarm(CommandGenerator):
                    the array is used to include them. (Data cannot be nested)
         """
         real_command = super(roarm, self)._mesg(genre, *args)  
+        batch = self._batch
+        if batch is not None and genre != JsonCmd.FEEDBACK_GET and batch.thread == threading.get_ident():
+            batch.add(genre, real_command)
+            return real_command
+        if self.command_queue is not None and genre != JsonCmd.FEEDBACK_GET:
+            self.command_queue.put(genre, real_command, coalesce_key(genre, args))
+            return real_command
+        if genre == JsonCmd.FEEDBACK_GET and self.feedback_reader is not None:
+            return self._res(real_command, genre)
         if self.thread_lock:
             with self.lock:
                 return self._res(real_command, genre)
@@ -66,34 +135,299 @@ class roarm(CommandGenerator):
             return self._res(real_command, genre)
 
     def _res(self, real_command, genre):
-        try_count = 0
-        while try_count < 10:     
-            if self.host:
-                url = f"http://{self.host}/js?json={real_command.decode()}"
-                response = requests.get(url)
-                if genre != JsonCmd.FEEDBACK_GET:
-                    data = real_command
-                else:                                
-                    data = json.loads(response.text)
-            else:
-                self._write(real_command)
-                if genre != JsonCmd.FEEDBACK_GET:
-                    data = real_command
-                else:          
-                    data = self._read(genre)   
-                
-            if data is not None and data != b'':
-                break
-            try_count += 1
-        else:
-            return -1
-              
+        data, timestamp = self._request(real_command, genre)
         res = self._process_received(data, genre)
         if res is None:
             return None
         elif isinstance(res, list) and len(res) == 1:
             return res[0]      
+
+    def _request(self, real_command, genre):
+        """Send a command and return (response, receipt time)
+        Raises RoarmTimeoutException when no try was answered within the retry policy.
+        """
+        metrics = self.metrics
+        start = time.monotonic()
+        try:
+            data, timestamp, tries = self._try_request(real_command, genre)
+        except Exception:
+            if metrics is not None:
+                metrics.error(genre)
+            raise
+        if metrics is not None:
+            metrics.command(genre, time.monotonic() - start, tries, timeout=data is None)
+        if data is None:
+            raise RoarmTimeoutException(
+                f"No answer to T:{genre} after {tries} tries in {time.monotonic() - start:.3f}s")
+        return data, timestamp
+
+    def _try_request(self, real_command, genre):
+        """Try a command as the retry policy allows, (data, receipt time, tries) or (None, None, tries)"""
+        retry = self.retry
+        tries = 0
+        for attempt, timeout in retry.tries():
+            tries += 1
+            start = time.monotonic()
+            if self.host:
+                if self._capture is not None:
+                    self._capture.record(CAPTURE_TX, real_command)
+                if self.metrics is not None:
+                    self.metrics.sent(len(real_command))
+                try:
+                    if genre != JsonCmd.FEEDBACK_GET:
+                        self._http_session.send(real_command)
+                        return real_command, time.monotonic(), tries
+                    text = self._http_session.request(real_command, timeout)
+                except RoarmTimeoutException as e:
+                    self.log.debug("[roarm] try %d: %s", tries, e)
+                    retry.failed()
+                    continue
+                if self._capture is not None:
+                    self._capture.record(CAPTURE_RX, text)
+                if self.metrics is not None:
+                    self.metrics.received(len(text))
+                try:
+                    data, timestamp = json.loads(text), time.monotonic()
+                except ValueError as e:
+                    # a truncated or garbled body is a failed try like a lost frame
+                    self.log.debug("[roarm] try %d: bad answer %r: %s", tries, text[:64], e)
+                    retry.failed()
+                    continue
+            elif genre == JsonCmd.FEEDBACK_GET and self.feedback_reader is not None and self.feedback_reader.period:
+                # frames come at the stream period, not as answers, so the period bounds the wait and the
+                # age of the snapshot, an older one means the link stopped answering
+                fresh = max(timeout, 2 * self.feedback_reader.period)
+                snapshot = self.feedback_reader.wait(fresh, max_age=fresh)
+                if snapshot:
+                    return snapshot.data, snapshot.timestamp, tries
+                continue
+            elif self.feedback_reader is not None and (
+                    genre == JsonCmd.FEEDBACK_GET or self.confirm and genre != JsonCmd.ECHO_SET):
+                # the reply is 1051 for feedback and the command itself in echo mode, echo_set is never waited for
+                data, timestamp = self._exchange(real_command, 1051 if genre == JsonCmd.FEEDBACK_GET else genre,
+                                                 timeout)
+            else:
+                self._write(real_command)
+                if genre != JsonCmd.FEEDBACK_GET:
+                    return real_command, time.monotonic(), tries
+                data, timestamp = self._read(genre, timeout), time.monotonic()
+
+            if data:
+                # like Karn's algorithm only a first try is timed, a retried answer may belong to any try
+                if attempt == 0 and genre == JsonCmd.FEEDBACK_GET:
+                    retry.observe(timestamp - start)
+                return data, timestamp, tries
+            retry.failed()
+        return None, None, tries
+
+    def _exchange(self, real_command, code, timeout=None):
+        """Write a command and wait for the next frame of a T code, (None, None) on timeout"""
+        reader = self.feedback_reader
+        future = reader.expect(code)
+        self._write(real_command)
+        try:
+            return future.result(self.retry.timeout if timeout is None else timeout)
+        except FutureTimeoutError:
+            reader.discard(code, future)
+            return None, None
+
+    def state_get(self):
+        """Get the feedback decoded once into an ArmState with named joints, pose and torques
+        Return:
+            ArmState, raises RoarmTimeoutException when the roarm did not answer
+        """
+        real_command = super(roarm, self)._mesg(JsonCmd.FEEDBACK_GET)
+        if self.thread_lock and self.feedback_reader is None:
+            with self.lock:
+                data, timestamp = self._request(real_command, JsonCmd.FEEDBACK_GET)
+        else:
+            data, timestamp = self._request(real_command, JsonCmd.FEEDBACK_GET)
+        return ArmState.from_feedback(self.type, data, timestamp)
             
+    def start_streaming(self, rate=50):
+        """Start reading feedback in a background thread
+        Args:
+            rate: feedback request rate in Hz, 0 to only listen, type: int
+        """
+        if self.host:
+            raise RoarmDataException("Streaming mode requires a serial connection")
+        if self.feedback_reader is not None:
+            return 1
+        self.feedback_reader = FeedbackReader(self._serial_port, rate=rate, write_lock=self._write_lock,
+                                              metrics=self.metrics)
+        self.feedback_reader.start()
+        return 1
+
+    def stop_streaming(self):
+        """Stop the background feedback reader, closing every subscription
+        """
+        for subscription in self._subscriptions:
+            subscription.close()
+        if self.feedback_reader is not None:
+            self.feedback_reader.stop()
+            self.feedback_reader = None
+        return 1
+
+    def start_queue(self, depth=64):
+        """Send commands from a writer thread, the command methods return once the command is queued
+        Args:
+            depth: most commands waiting to be sent, a full queue blocks the caller, type: int
+        """
+        if self.command_queue is not None:
+            return 1
+        self.command_queue = CommandQueue(self._send_raw, depth=depth)
+        self.command_queue.start()
+        return 1
+
+    def stop_queue(self, flush=True):
+        """Stop the writer thread
+        Args:
+            flush: send the waiting commands first, otherwise drop them, type: bool
+        """
+        if self.command_queue is not None:
+            self.command_queue.stop(flush=flush)
+            self.command_queue = None
+        return 1
+
+    def _send_raw(self, genre, command):
+        if self.thread_lock:
+            with self.lock:
+                self._request(command, genre)
+        else:
+            self._request(command, genre)
+
+    def subscribe(self, callback=None, maxlen=64, every=1, rate=None):
+        """Receive every feedback frame of the shared background reader as an ArmState
+        Args:
+            callback: function called with each ArmState from the subscription's thread, None to iterate
+            maxlen: most states waiting for a slow consumer, the oldest is dropped first, type: int
+            every: keep every n-th frame, type: int
+            rate: keep at most this many states per second, type: float
+        Return:
+            Subscription, close it to unsubscribe
+        """
+        if self.feedback_reader is None:
+            self.start_streaming(self.feedback_rate)
+        subscription = Subscription(maxlen=maxlen, every=every, rate=rate, callback=callback,
+                                    on_close=self._unsubscribe)
+        with self._subscriptions_lock:
+            if not self._subscriptions:
+                self.feedback_reader.add_listener(self._publish, 1051)
+            self._subscriptions += (subscription,)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._subscriptions_lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if s is not subscription)
+            if not self._subscriptions and self.feedback_reader is not None:
+                self.feedback_reader.remove_listener(self._publish, 1051)
+
+    def _publish(self, data, timestamp):
+        # decode once for every subscriber
+        state = ArmState.from_feedback(self.type, data, timestamp)
+        for subscription in self._subscriptions:
+            subscription.offer(state)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Collect the commands given inside the block and send them in one write when it ends
+
+            with arm.batch() as batch:
+                arm.led_ctrl(255)
+                arm.torque_set(1)
+                arm.joints_radian_ctrl(radians, speed, acc)
+            batch.results
+
+        Every command is validated when it is given, so an invalid one aborts the block before
+        anything is sent. feedback_get and commands from other threads are not batched. Over
+        http each command is still one request, sent back to back on the kept-alive connection.
+        With confirm, a command whose echo never came leaves None in the results and raises
+        RoarmTimeoutException once the whole batch has been waited for.
+        Return:
+            CommandBatch, its results are set when the block ends
+        """
+        if self._batch is not None:
+            raise RoarmDataException("Batches cannot be nested")
+        batch = self._batch = CommandBatch()
+        try:
+            yield batch
+        finally:
+            self._batch = None
+        batch.results = self._send_batch(batch)
+        missing = batch.results.count(None)
+        if missing:
+            raise RoarmTimeoutException(f"{missing} of {len(batch)} batched commands were not confirmed")
+
+    def _send_batch(self, batch):
+        if not batch.commands:
+            return []
+        if self.command_queue is not None:
+            self.command_queue.flush()
+        if self.thread_lock:
+            with self.lock:
+                return self._write_batch(batch)
+        return self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        start = time.monotonic()
+        if self.host:
+            for command in batch.commands:
+                if self._capture is not None:
+                    self._capture.record(CAPTURE_TX, command)
+                if self.metrics is not None:
+                    self.metrics.sent(len(command))
+                self._http_session.send(command)
+            if self._http_session.pipeline:
+                self._http_session.flush()
+            results = list(batch.commands)
+        elif self.confirm and self.feedback_reader is not None:
+            reader = self.feedback_reader
+            futures = [None if genre == JsonCmd.ECHO_SET else reader.expect(genre) for genre in batch.genres]
+            self._write(b"".join(batch.commands))
+            results = []
+            for genre, command, future in zip(batch.genres, batch.commands, futures):
+                if future is None:
+                    results.append(command)
+                    continue
+                try:
+                    results.append(future.result(self.retry.timeout)[0])
+                except FutureTimeoutError:
+                    reader.discard(genre, future)
+                    results.append(None)
+        else:
+            self._write(b"".join(batch.commands))
+            results = list(batch.commands)
+        if self.metrics is not None:
+            latency = time.monotonic() - start
+            for genre, result in zip(batch.genres, results):
+                self.metrics.command(genre, latency, timeout=result is None)
+        return results
+
+    def add_frame_listener(self, callback, code=None):
+        """Call callback(data, timestamp) from the reader thread for every received frame of a T code
+        Args:
+            callback: function taking the frame dict and its receipt time
+            code: T code, e.g. 1051 for feedback, None for every frame
+        """
+        if self.feedback_reader is None:
+            raise RoarmDataException("Frame listeners require streaming")
+        self.feedback_reader.add_listener(callback, code)
+        return 1
+
+    def remove_frame_listener(self, callback, code=None):
+        if self.feedback_reader is not None:
+            self.feedback_reader.remove_listener(callback, code)
+        return 1
+
+    def feedback_snapshot(self):
+        """Get the latest feedback received by the background reader
+        Return:
+            FeedbackSnapshot(data, timestamp, seq) or None
+        """
+        if self.feedback_reader is None:
+            return None
+        return self.feedback_reader.latest
+
     def breath_led(self, duration=1.0, steps=10):
         """Set breath_led
         Args:
@@ -115,82 +449,173 @@ class roarm(CommandGenerator):
         input("Press any to stop data collection...\n")
         self.stop_flag = True
         
-    def drag_teach_start(self, filename):
+    def drag_teach_start(self, filename, rate=50, interactive=True, decimation=1, dedup_threshold=None):
         """Start drag teach
         Args:
             filename: file to save data, type: str
+                      a ".rarm" file is written record by record in the binary recording format
+                      timestamps are epoch seconds in both formats, taken from the monotonic frame receipt time
+            rate: sample rate in Hz, type: int
+            interactive: wait for a key press, otherwise return at once and stop with drag_teach_stop()
+            decimation: keep every n-th sample, type: int
+            dedup_threshold: skip samples whose joints moved less than this many radians, type: float
         """
+        if self._drag_teach is not None:
+            raise RoarmDataException("Drag teach is already running")
         self.torque_set(cmd=0) 
-        data = []
-        print(f"Starting data collection.")
-        input_thread = threading.Thread(target=self.listen_for_input)
-        input_thread.daemon = True 
-        input_thread.start()
-        print("Press any to stop data collection...\n")
-        while not self.stop_flag: 
-            radians = self.joints_radian_get()
-            record = {
-                "timestamped": time.time(),
-                "radians": radians
-            }
-            data.append(record)
-        try:
-            with open(filename, "w") as file:
-                json.dump(data, file, indent=4)
-            print(f"Data saved. Total {len(data)} records.")
-        except Exception as e:
-            print(f"Error saving data: {e}")
+        self.stop_flag = False
+        # one offset for the whole recording keeps the sample intervals free of wall clock steps
+        epoch = time.time() - time.monotonic()
+        if is_recording(filename):
+            storage = RecordingWriter(filename, self.type)
+            sink = lambda timestamp, radians: storage.write(epoch + timestamp, radians)
+        else:
+            storage = []
+            sink = lambda timestamp, radians: storage.append({"timestamped": epoch + timestamp, "radians": radians})
+        sampler = DragTeachSampler(self, rate=rate, decimation=decimation, dedup_threshold=dedup_threshold)
+        self._drag_teach = (filename, storage, sampler)
+        sampler.start(sink)
+        if not interactive:
+            return 1
+        print("Starting data collection.")
+        self.listen_for_input()
+        return self.drag_teach_stop()
 
-    def drag_teach_replay(self, filename):
+    def drag_teach_stop(self):
+        """Stop drag teach and save the data
+        Return:
+            number of records saved, type: int
+        """
+        if self._drag_teach is None:
+            return 0
+        filename, storage, sampler = self._drag_teach
+        self._drag_teach = None
+        self.stop_flag = True
+        count = sampler.stop()
+        if isinstance(storage, RecordingWriter):
+            storage.close()
+        else:
+            try:
+                with open(filename, "w") as file:
+                    json.dump(storage, file, indent=4)
+            except Exception as e:
+                self.log.error("Error saving data: %s", e)
+                return 0
+        self.log.info("Data saved. Total %d records.", count)
+        return count
+
+    def drag_teach_replay(self, filename, speed=0, acc=0, time_scale=1.0):
         """Replay drag teach data 
         Args:
             filename: file to save data, type: str
+            speed: servo speed of each setpoint, 0 is the fastest, type: int
+            acc: servo acceleration of each setpoint, 0 is the fastest, type: int
+            time_scale: > 1 replays slower, < 1 replays faster, type: float
+        Return:
+            TrajectoryStats of the replay
         """
         try:
-            with open(filename, "r") as file:
-                data = json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            print("Error: File not found or empty. Ensure data exists in the file.")
+            if is_recording(filename):
+                data = RecordingReader(filename)
+            else:
+                with open(filename, "r") as file:
+                    data = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError, RoarmDataException):
+            self.log.error("File not found or empty. Ensure data exists in %s.", filename)
             return
 
         total_steps = len(data)
 
-        if total_steps < 2:
-            print("Error: Not enough data to calculate velocity and acceleration.")
-            return
-        switch_dict = {
-        "roarm_m2": [0, 0, 0, 0], 
-        "roarm_m3": [0, 0, 0, 0, 0, 0],
-        }
-        prev_speed = switch_dict[self.type]  
-
-        for i in range(1, total_steps):
-            record1 = data[i-1]
-            record2 = data[i]
-
-            timestamp1, radians1 = record1["timestamped"], record1["radians"]
-            timestamp2, radians2 = record2["timestamped"], record2["radians"]
-
-            time_diff = timestamp2 - timestamp1
-            if time_diff == 0:
-                print(f"Warning: Zero time difference at step {i}, skipping velocity and acceleration calculation.")
-                continue
+        try:
+            if total_steps < 2:
+                self.log.error("Not enough data to replay.")
+                return
 
-            radians_diff = [r2 - r1 for r1, r2 in zip(radians1, radians2)]    
-            angular_velocity = [r_diff / time_diff for r_diff in radians_diff]
-            speed = [abs(int(angular_vel * 2048 / 3.1415926)) for angular_vel in angular_velocity]           
-            acceleration = [abs(int((spd - prev_spd) / (100*time_diff))) if time_diff != 0 else 0 for spd, prev_spd in zip(speed, prev_speed)]
-            
-            for joint, radian, spd, acc in zip(range(1, len(prev_speed)+1), radians2, speed, acceleration):
-                if spd != 0:
-                    print(f"Speed for joint {joint}: {spd}, Acceleration: {acc}")
-                    self.joint_radian_ctrl(joint=joint, radian=radian, speed=spd, acc=acc)
-                    time.sleep(time_diff)
-            prev_speed = speed
+            executor = TrajectoryExecutor(self, speed=speed, acc=acc)
+            stats = executor.run(data, time_scale=time_scale)
+        finally:
+            if isinstance(data, RecordingReader):
+                data.close()
+        self.log.info("Replayed %d steps from %s.", total_steps, filename)
+        return stats
 
-        print(f"Replayed {total_steps} steps from {filename}.")
+    def linear_move(self, pose, start=None, duration=None, speed=None, profile="quintic", rate=50):
+        """Move the tool along a straight line, interpolated on the host
+        Args:
+            pose: target pose in pose_ctrl units, type: List[float]
+            start: start pose, default the current pose; pass it to reuse the path on repeated cycles
+            duration: move time in seconds, type: float
+            speed: peak tool speed in mm/s when duration is None, type: float
+            profile: time scaling, "linear", "cubic" or "quintic"
+            rate: setpoints per second, default 50
+        Return:
+            TrajectoryStats of the move
+        """
+        return self.spline_move([pose], start=start, duration=duration, speed=speed, interpolation="linear",
+                                profile=profile, rate=rate)
+
+    def spline_move(self, waypoints, start=None, duration=None, speed=None, interpolation="quintic", profile="quintic",
+                    rate=50):
+        """Move the tool through waypoints on a spline, interpolated on the host
+        Args:
+            waypoints: poses in pose_ctrl units after the start, type: List[List[float]]
+            start: start pose, default the current pose; pass it to reuse the path on repeated cycles
+            duration: move time in seconds, type: float
+            speed: peak tool speed in mm/s when duration is None, type: float
+            interpolation: "linear", "cubic" or "quintic"
+            profile: time scaling of a "linear" path
+            rate: setpoints per second, default 50
+        Return:
+            TrajectoryStats of the move
+        """
+        from roarm_sdk.motion import cartesian_path
+        seed = None
+        if start is None:
+            start = self.pose_get()
+            seed = self.joints_radian_get()
+        path = cartesian_path(self.type, [start] + list(waypoints), duration=duration, speed=speed,
+                              interpolation=interpolation, profile=profile, rate=rate, seed=seed)
+        return self.path_move(path)
+
+    def path_move(self, path, time_scale=1.0):
+        """Stream a precomputed motion.CartesianPath as joints_radian_ctrl setpoints
+        Args:
+            path: CartesianPath
+            time_scale: > 1 moves slower, < 1 moves faster, type: float
+        Return:
+            TrajectoryStats of the move
+        """
+        return TrajectoryExecutor(self).run(path.points(), time_scale=time_scale)
+
+    def trajectory_move(self, waypoints, velocity=None, acceleration=None, mode="time_optimal", rate=50):
+        """Move through joint waypoints as fast as the joint limits allow
+        Args:
+            waypoints: joint radians or a planner.TrajectoryPlan, type: List[List[float]]
+            velocity: joint speed limit in rad/s, one value or one per joint
+            acceleration: joint acceleration limit in rad/s^2, one value or one per joint
+            mode: "time_optimal" or "min_jerk"
+            rate: setpoints per second, default 50
+        Return:
+            TrajectoryStats of the move
+        """
+        from roarm_sdk.planner import TrajectoryPlan
+        plan = waypoints
+        if not isinstance(plan, TrajectoryPlan):
+            plan = TrajectoryPlan(waypoints, velocity=velocity, acceleration=acceleration, mode=mode)
+        if self.validate:
+            # setpoints between waypoints stay inside the limits box of the waypoints
+            self.trajectory_check(plan.waypoints)
+        with self.skip_validation():
+            return TrajectoryExecutor(self).run(plan.points(rate))
 
     def disconnect(self):
         """Disconnect from the roarm 
         """
-        self._serial_port.close()
+        self.stop_queue()
+        self.stop_streaming()
+        if self.host:
+            self._http_session.close()
+        else:
+            self._serial_port.close()
+        if self._capture is not None:
+            self._capture.close()
@@ -0,0 +1,119 @@
+# coding=utf-8
+
+from __future__ import division
+import logging
+import threading
+import time
+
+from roarm_sdk.logger import ThrottledLogger
+from roarm_sdk.state import ArmState
+
+
+class DragTeachSampler(object):
+    """
+    Samples joint radians at a fixed rate in a background thread.
+
+    Samples are taken on absolute monotonic deadlines and stamped with the
+    monotonic time the feedback frame was received, also when it is
+    requested, so the round trip time does not add jitter. When the roarm
+    is streaming, the frame receipt time of the background reader is used
+    and a frame is never recorded twice. Failed samples are counted in
+    errors and logged at most once per second.
+
+        sampler = DragTeachSampler(arm, rate=50)
+        sampler.start(writer.write)
+        ...
+        sampler.stop()
+    """
+    def __init__(self, arm, rate=50, decimation=1, dedup_threshold=None):
+        """
+        Args:
+            arm             : roarm instance
+            rate            : target sample rate in Hz, default 50
+            decimation      : keep every n-th sample, default 1
+            dedup_threshold : skip samples whose joints all moved less than this many radians, None keeps all
+        """
+        self.log = logging.getLogger('DragTeachSampler')
+        self._error_log = ThrottledLogger(self.log, interval=1.0)
+        self.arm = arm
+        self.period = 1.0 / rate
+        self.decimation = max(1, int(decimation))
+        self.dedup_threshold = dedup_threshold
+        self.count = 0
+        self.sampled = 0
+        self.errors = 0
+        self.overruns = 0
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self, sink):
+        """Start sampling in a background thread
+        Args:
+            sink : callable(timestamp, radians) receiving each kept sample
+        """
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, args=(sink,), name="roarm-drag-teach")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop sampling
+        Return:
+            number of kept samples, type : int
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        return self.count
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def run(self, sink):
+        """Sample in the calling thread until stop() is called"""
+        last = None
+        last_seq = None
+        next_sample = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                timestamp, radians, seq = self._sample()
+            except Exception as e:
+                self.errors += 1
+                self._error_log.warning("[drag_teach] sample failed: %s", e)
+                timestamp = radians = seq = None
+
+            if radians is not None and (seq is None or seq != last_seq):
+                last_seq = seq
+                self.sampled += 1
+                if self.sampled % self.decimation == 0 and not self._is_duplicate(last, radians):
+                    sink(timestamp, radians)
+                    last = radians
+                    self.count += 1
+
+            next_sample += self.period
+            wait = next_sample - time.monotonic()
+            if wait > 0:
+                self._stop_event.wait(wait)
+            else:
+                self.overruns += 1
+                if wait < -self.period:
+                    next_sample = time.monotonic()
+
+    def _sample(self):
+        reader = getattr(self.arm, "feedback_reader", None)
+        if reader is not None:
+            snapshot = reader.latest
+            if snapshot is None:
+                return None, None, None
+            state = ArmState.from_feedback(self.arm.type, snapshot.data, snapshot.timestamp)
+            return state.timestamp, list(state.radians), snapshot.seq
+        state = self.arm.state_get()
+        return state.timestamp, list(state.radians), None
+
+    def _is_duplicate(self, last, radians):
+        if self.dedup_threshold is None or last is None:
+            return False
+        return all(abs(a - b) < self.dedup_threshold for a, b in zip(last, radians))
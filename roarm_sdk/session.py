@@ -0,0 +1,129 @@
+# coding=utf-8
+
+import logging
+import threading
+import queue
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ReadTimeoutError
+from urllib3.util.retry import Retry
+
+from roarm_sdk.utils import RoarmTimeoutException
+
+
+class HttpSession(object):
+    """
+    Keep-alive HTTP connection pool to the roarm web server.
+
+    Commands reuse pooled connections instead of opening a new TCP connection
+    per request. Fire-and-forget commands can be pipelined through a sender
+    thread, which keeps their order and lets the caller continue at once.
+    request() first waits for the pipelined commands, so a feedback read
+    after a move never overtakes it and both threads never use the session
+    at the same time.
+
+    Only failed connections are retried here: a command whose response
+    timed out may have been executed, so it is not sent again. An HTTP
+    error status is raised as RoarmTimeoutException, so the caller's retry
+    policy and metrics count it like a try without an answer.
+    """
+    def __init__(self, host, timeout=1.0, retries=3, backoff=0.05, pool_size=4, pipeline=False, pipeline_depth=64):
+        """
+        Args:
+            host           : host string
+            timeout        : connect and read timeout in seconds, default 1.0
+            retries        : retries for failed connections, default 3
+            backoff        : exponential backoff factor in seconds, default 0.05
+            pool_size      : kept-alive connections, default 4
+            pipeline       : whether send commands from a background thread
+            pipeline_depth : max pipelined commands waiting to be sent
+        """
+        self.log = logging.getLogger('HttpSession')
+        self.url = f"http://{host}/js"
+        self.timeout = timeout
+        self.pipeline = pipeline
+        self.errors = 0
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=False,
+            status=0,
+            other=0,
+            backoff_factor=backoff,
+            allowed_methods=frozenset(["GET"]),
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry))
+        self._queue = queue.Queue(maxsize=pipeline_depth)
+        self._sender = None
+
+    def request(self, command, timeout=None):
+        """Send a command and wait for the response
+        Args:
+            command: encoded json command, type: bytes
+            timeout: read timeout in seconds, default self.timeout
+        Return:
+            response text, type: str
+        """
+        if self._sender is not None and self._sender is not threading.current_thread():
+            self.flush()
+        return self._get(command, timeout)
+
+    def _get(self, command, timeout=None):
+        try:
+            response = self.session.get(self.url, params={"json": command.decode().strip()},
+                                        timeout=(self.timeout, timeout or self.timeout))
+        except requests.Timeout as e:
+            raise RoarmTimeoutException(f"No answer from {self.url}: {e}") from e
+        except requests.ConnectionError as e:
+            # a timeout while reading the body, or after the connection retries, is reported as a connection error
+            reason = e.args[0] if e.args else None
+            if isinstance(reason, MaxRetryError):
+                reason = reason.reason
+            if isinstance(reason, ReadTimeoutError):
+                raise RoarmTimeoutException(f"No answer from {self.url}: {e}") from e
+            raise
+        if response.status_code >= 400:
+            # the web server failed the command, count it as a try without an answer
+            raise RoarmTimeoutException(f"HTTP {response.status_code} from {self.url}: {response.reason}")
+        return response.text
+
+    def send(self, command):
+        """Send a command without waiting for the response
+        Args:
+            command: encoded json command, type: bytes
+        """
+        if not self.pipeline:
+            self._get(command)
+            return
+        if self._sender is None:
+            self._sender = threading.Thread(target=self._send_loop, name="roarm-http-sender")
+            self._sender.daemon = True
+            self._sender.start()
+        self._queue.put(command)
+
+    def flush(self):
+        """Wait until every pipelined command has been sent."""
+        self._queue.join()
+
+    def close(self):
+        if self._sender is not None:
+            self.flush()
+            self._queue.put(None)
+            self._sender.join()
+            self._sender = None
+        self.session.close()
+
+    def _send_loop(self):
+        while True:
+            command = self._queue.get()
+            try:
+                if command is None:
+                    return
+                self._get(command)
+            except Exception as e:
+                self.errors += 1
+                self.log.error(f"[http_session] pipelined command failed: {e}")
+            finally:
+                self._queue.task_done()
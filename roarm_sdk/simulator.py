@@ -0,0 +1,445 @@
+# coding=utf-8
+
+from __future__ import division
+import heapq
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from roarm_sdk.common import (JsonCmd, FrameParser, STEPS_PER_RADIAN, ANGLE_SPEED_STEPS, ANGLE_ACC_STEPS,
+                              COMMAND_RADIAN_KEYS, COMMAND_ANGLE_KEYS)
+from roarm_sdk.state import STATE_JOINTS, STATE_TORQUES
+from roarm_sdk.utils import SPEED_RANGE
+
+
+class VirtualRoarm(object):
+    """
+    Simulated RoArm-M2/M3 firmware.
+
+    Accepts the JSON commands of JsonCmd, moves the joints towards their
+    targets with the speed/acc limits of the command and answers T:105 with
+    a T:1051 feedback frame. Joint values are kept in firmware convention,
+    the gripper is mirrored by the SDK exactly as on the real arm.
+    Latency, jitter and frame corruption are drawn from a seeded random
+    generator so runs are reproducible.
+    """
+    def __init__(self, roarm_type="roarm_m2", feedback_rate=0, latency=0.0, jitter=0.0, corruption=0.0,
+                 max_speed=SPEED_RANGE[1], seed=0):
+        """
+        Args:
+            roarm_type    : "roarm_m2" or "roarm_m3", type : str
+            feedback_rate : unrequested T:1051 frames per second, 0 only answers T:105
+            latency       : response delay in seconds
+            jitter        : extra uniform random delay in seconds
+            corruption    : probability that a sent frame is damaged
+            max_speed     : joint speed in steps/s used for speed 0
+            seed          : random seed
+        """
+        self.type = roarm_type
+        self.joint_names = STATE_JOINTS[roarm_type]
+        self.feedback_rate = feedback_rate
+        self.latency = latency
+        self.jitter = jitter
+        self.corruption = corruption
+        self.max_speed = max_speed / STEPS_PER_RADIAN
+        self.random = random.Random(seed)
+        n = len(self.joint_names)
+        home = [0.0, 0.0, math.pi / 2] + [0.0] * (n - 4) + [math.pi]
+        self.position = list(home)
+        self.target = list(home)
+        self.velocity = [0.0] * n
+        self.speed = [self.max_speed] * n
+        self.acc = [float("inf")] * n
+        self.pose = [310.0, 0.0, 234.0]
+        try:
+            from roarm_sdk.kinematics import kinematics
+            self.kinematics = kinematics(roarm_type)
+        except ImportError:
+            # without numpy x/y/z only echo the last pose_ctrl
+            self.kinematics = None
+        self.torque = True
+        self.echo = False
+        self.commands = 0
+        self.lock = threading.Lock()
+        self._last = None
+
+    def handle(self, line, now=None):
+        """Handle one command line
+        Args:
+            line : json command, type : bytes or str
+            now  : monotonic time, default time.monotonic()
+        Return:
+            list of (delay, frame bytes) to send back
+        """
+        now = time.monotonic() if now is None else now
+        try:
+            command = json.loads(line)
+        except ValueError:
+            return []
+        if not isinstance(command, dict):
+            return []
+        with self.lock:
+            self.advance(now)
+            self.commands += 1
+            genre = command.get("T")
+            replies = []
+            if self.echo and genre != JsonCmd.FEEDBACK_GET:
+                replies.append(self._frame(command))
+            if genre == JsonCmd.FEEDBACK_GET:
+                replies.append(self._frame(self.feedback()))
+            else:
+                self._apply(genre, command)
+            return [(self.delay(), frame) for frame in replies]
+
+    def delay(self):
+        return self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def feedback(self):
+        pitch = 0.0
+        if self.kinematics is not None:
+            pose = self.kinematics.fk(self._sdk_joints(self.position))
+            self.pose = [float(v) for v in pose[:3]]
+            if self.type == "roarm_m3":
+                pitch = math.radians(pose[3])
+        data = {"T": 1051, "x": self.pose[0], "y": self.pose[1], "z": self.pose[2]}
+        if self.type == "roarm_m3":
+            data["tit"] = pitch
+        for name, value in zip(self.joint_names, self.position):
+            data[name] = value
+        for name, velocity in zip(STATE_TORQUES[self.type], self.velocity):
+            data[name] = int(abs(velocity) * 100)
+        return data
+
+    def advance(self, now):
+        """Move the joints up to time now"""
+        if self._last is None:
+            self._last = now
+            return
+        dt = now - self._last
+        self._last = now
+        if dt <= 0 or not self.torque:
+            return
+        for i, target in enumerate(self.target):
+            error = target - self.position[i]
+            if error == 0 and self.velocity[i] == 0:
+                continue
+            acc = self.acc[i]
+            braking = math.sqrt(2 * acc * abs(error)) if acc != float("inf") else float("inf")
+            wanted = math.copysign(min(self.speed[i], braking), error)
+            if acc == float("inf"):
+                velocity = wanted
+            else:
+                step = acc * dt
+                velocity = max(self.velocity[i] - step, min(self.velocity[i] + step, wanted))
+            position = self.position[i] + velocity * dt
+            if (target - position) * error <= 0:
+                position, velocity = target, 0.0
+            self.position[i] = position
+            self.velocity[i] = velocity
+
+    def _apply(self, genre, command):
+        if genre == JsonCmd.JOINT_RADIAN_CTRL:
+            self._move({int(command["joint"]) - 1: command["rad"]}, command["spd"], command["acc"])
+        elif genre == JsonCmd.JOINTS_RADIAN_CTRL:
+            keys = COMMAND_RADIAN_KEYS[self.type]
+            self._move({i: command[key] for i, key in enumerate(keys)}, command["spd"], command["acc"])
+        elif genre == JsonCmd.JOINT_ANGLE_CTRL:
+            self._move({int(command["joint"]) - 1: math.radians(command["angle"])},
+                       command["spd"] * ANGLE_SPEED_STEPS / 180, command["acc"] * ANGLE_ACC_STEPS / 180)
+        elif genre == JsonCmd.JOINTS_ANGLE_CTRL:
+            keys = COMMAND_ANGLE_KEYS[self.type]
+            self._move({i: math.radians(command[key]) for i, key in enumerate(keys)},
+                       command["spd"] * ANGLE_SPEED_STEPS / 180, command["acc"] * ANGLE_ACC_STEPS / 180)
+        elif genre == JsonCmd.POSE_CTRL:
+            self._move_to_pose(command)
+        elif genre == JsonCmd.TORQUE_SET:
+            self.torque = bool(command["cmd"])
+            if not self.torque:
+                self.target = list(self.position)
+                self.velocity = [0.0] * len(self.velocity)
+        elif genre == JsonCmd.ECHO_SET:
+            self.echo = bool(command["cmd"])
+
+    def _move(self, targets, speed, acc):
+        speed = speed / STEPS_PER_RADIAN if speed else self.max_speed
+        acc = acc * 100 / STEPS_PER_RADIAN if acc else float("inf")
+        for index, target in targets.items():
+            if 0 <= index < len(self.target):
+                self.target[index] = float(target)
+                self.speed[index] = speed
+                self.acc[index] = acc
+
+    def _move_to_pose(self, command):
+        if self.kinematics is None:
+            self.pose = [command["x"], command["y"], command["z"]]
+            return
+        if self.type == "roarm_m3":
+            angles = [command["t"], command["r"], math.pi - command["g"]]
+        else:
+            angles = [math.pi - command["t"]]
+        pose = [command["x"], command["y"], command["z"]] + [math.degrees(angle) for angle in angles]
+        joints, ok = self.kinematics.ik(pose, seed=self._sdk_joints(self.target))
+        if ok:
+            self._move(dict(enumerate(self._sdk_joints(joints))), 0, 0)
+
+    def _sdk_joints(self, joints):
+        # the gripper is mirrored between the firmware and the SDK, the same in both directions
+        return list(joints[:-1]) + [math.pi - joints[-1]]
+
+    def _frame(self, data):
+        frame = (json.dumps(data) + "\r\n").encode()
+        if self.corruption and self.random.random() < self.corruption:
+            frame = bytearray(frame)
+            position = self.random.randrange(len(frame))
+            if self.random.random() < 0.5:
+                del frame[position]
+            else:
+                frame[position] = self.random.randrange(256)
+            frame = bytes(frame)
+        return frame
+
+
+class _DeviceLink(object):
+    """Byte stream between a host and a VirtualRoarm with delayed delivery."""
+    def __init__(self, device):
+        self.device = device
+        self.parser = FrameParser(frame_start=b"{", frame_end=b"\n")
+        self._pending = []
+        self._count = 0
+        self._next_stream = None
+
+    def write(self, data, now):
+        for line in self.parser.feed(data):
+            for delay, frame in self.device.handle(line, now):
+                self._schedule(now + delay, frame)
+
+    def pump(self, now):
+        """Return the bytes due by now"""
+        self._stream(now)
+        out = b""
+        while self._pending and self._pending[0][0] <= now:
+            out += heapq.heappop(self._pending)[2]
+        return out
+
+    def next_release(self):
+        times = [self._pending[0][0]] if self._pending else []
+        if self.device.feedback_rate and self._next_stream is not None:
+            times.append(self._next_stream)
+        return min(times) if times else None
+
+    def _schedule(self, release, frame):
+        self._count += 1
+        heapq.heappush(self._pending, (release, self._count, frame))
+
+    def _stream(self, now):
+        device = self.device
+        if not device.feedback_rate:
+            return
+        period = 1.0 / device.feedback_rate
+        if self._next_stream is None:
+            self._next_stream = now
+        if now - self._next_stream > 1.0:
+            self._next_stream = now
+        while self._next_stream <= now:
+            with device.lock:
+                device.advance(self._next_stream)
+                frame = device._frame(device.feedback())
+                delay = device.delay()
+            self._schedule(self._next_stream + delay, frame)
+            self._next_stream += period
+
+
+class SimulatedSerial(object):
+    """
+    In-process stand-in for serial.Serial connected to a VirtualRoarm.
+
+        arm = roarm(roarm_type="roarm_m2", transport=SimulatedSerial(VirtualRoarm("roarm_m2")))
+    """
+    def __init__(self, device, timeout=0.1):
+        """
+        Args:
+            device  : VirtualRoarm
+            timeout : read timeout in seconds, default 0.1
+        """
+        self.device = device
+        self.timeout = timeout
+        self.is_open = True
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self._link = _DeviceLink(device)
+        self._buf = bytearray()
+        self._cond = threading.Condition()
+
+    @property
+    def in_waiting(self):
+        with self._cond:
+            self._buf += self._link.pump(time.monotonic())
+            return len(self._buf)
+
+    def read(self, size=1):
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._buf += self._link.pump(now)
+                if self._buf:
+                    data = bytes(self._buf[:size])
+                    del self._buf[:size]
+                    self.bytes_read += len(data)
+                    return data
+                if deadline is not None and now >= deadline:
+                    return b""
+                wake = self._link.next_release()
+                waits = [t - now for t in (wake, deadline) if t is not None]
+                self._cond.wait(max(0.0, min(waits)) if waits else None)
+
+    def write(self, data):
+        with self._cond:
+            self._link.write(bytes(data), time.monotonic())
+            self.bytes_written += len(data)
+            self._cond.notify_all()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        with self._cond:
+            self._buf += self._link.pump(time.monotonic())
+            del self._buf[:]
+
+    def open(self):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+
+class PtySimulator(object):
+    """
+    Serves a VirtualRoarm on a pseudo terminal so it can be opened like a real
+    serial port, e.g. roarm(roarm_type="roarm_m2", port=sim.port). POSIX only.
+    """
+    def __init__(self, device):
+        """
+        Args:
+            device : VirtualRoarm
+        """
+        import pty
+        import tty
+        self.log = logging.getLogger('PtySimulator')
+        self.device = device
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._link = _DeviceLink(device)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="roarm-pty-simulator")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        os.close(self._master)
+        os.close(self._slave)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _run(self):
+        import select
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            out = self._link.pump(now)
+            if out:
+                os.write(self._master, out)
+            wake = self._link.next_release()
+            timeout = 0.05 if wake is None else min(0.05, max(0.0, wake - now))
+            readable, _, _ = select.select([self._master], [], [], timeout)
+            if readable:
+                try:
+                    data = os.read(self._master, 4096)
+                except OSError as e:
+                    self.log.error(f"[pty_simulator] read error: {e}")
+                    return
+                self._link.write(data, time.monotonic())
+
+
+class SimulatorHTTPServer(ThreadingHTTPServer):
+    """
+    Serves a VirtualRoarm over the /js?json= HTTP interface of the arm, e.g.
+    roarm(roarm_type="roarm_m2", host=f"127.0.0.1:{server.server_port}").
+    """
+    daemon_threads = True
+
+    def __init__(self, device, host="127.0.0.1", port=0):
+        """
+        Args:
+            device : VirtualRoarm
+            host   : listen address, default "127.0.0.1"
+            port   : listen port, 0 picks a free port
+        """
+        self.device = device
+        self._thread = None
+        super(SimulatorHTTPServer, self).__init__((host, port), _SimulatorRequestHandler)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="roarm-http-simulator")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class _SimulatorRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        line = parse_qs(url.query).get("json", [""])[0]
+        if url.path != "/js" or not line:
+            self.send_error(404)
+            return
+        replies = self.server.device.handle(line)
+        body = b""
+        if replies:
+            delay, body = replies[-1]
+            if delay:
+                time.sleep(delay)
+            body = body.strip()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
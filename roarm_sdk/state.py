@@ -0,0 +1,118 @@
+# coding=utf-8
+
+from __future__ import division
+import math
+
+# feedback keys of the joints in joints_radian_get order, the last one is the mirrored gripper
+STATE_JOINTS = {
+    "roarm_m2": ("b", "s", "e", "t"),
+    "roarm_m3": ("b", "s", "e", "t", "r", "g"),
+}
+
+STATE_TORQUES = {
+    "roarm_m2": ("torB", "torS", "torE", "torH"),
+    "roarm_m3": ("tB", "tS", "tE", "tT", "tR", "tG"),
+}
+
+JOINT_NAMES = {
+    "roarm_m2": ("base", "shoulder", "elbow", "gripper"),
+    "roarm_m3": ("base", "shoulder", "elbow", "wrist", "roll", "gripper"),
+}
+
+NAN = float("nan")
+
+
+class ArmState(object):
+    """
+    One decoded T:1051 feedback frame.
+
+    Joints are radians in joints_radian_get order with the gripper already
+    mirrored, pitch is the M3 tool pitch in radians (None on the M2) and
+    torques are the servo loads in joint order, NaN when the firmware did
+    not send them. The feedback dict is read, never modified.
+
+        state = arm.state_get()
+        state.shoulder, state.pose, state.torques
+    """
+    __slots__ = ("type", "x", "y", "z", "pitch", "radians", "torques", "timestamp")
+
+    def __init__(self, roarm_type, x, y, z, pitch, radians, torques, timestamp=None):
+        self.type = roarm_type
+        self.x = x
+        self.y = y
+        self.z = z
+        self.pitch = pitch
+        self.radians = radians
+        self.torques = torques
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_feedback(cls, roarm_type, data, timestamp=None):
+        """Decode a feedback dict
+        Args:
+            roarm_type : "roarm_m2" or "roarm_m3", type : str
+            data       : T:1051 feedback, type : dict
+            timestamp  : receipt time in seconds, e.g. time.monotonic()
+        """
+        radians = [data[key] for key in STATE_JOINTS[roarm_type]]
+        radians[-1] = math.pi - radians[-1]
+        torques = tuple(data.get(key, NAN) for key in STATE_TORQUES[roarm_type])
+        return cls(roarm_type, data["x"], data["y"], data["z"], data.get("tit"), tuple(radians), torques, timestamp)
+
+    def __getattr__(self, name):
+        # base, shoulder, elbow, wrist, roll and gripper
+        names = JOINT_NAMES.get(object.__getattribute__(self, "type"), ())
+        if name in names:
+            return self.radians[names.index(name)]
+        raise AttributeError(name)
+
+    @property
+    def angles(self):
+        return tuple(radian * 180 / math.pi for radian in self.radians)
+
+    @property
+    def pose(self):
+        """Pose in pose_get units"""
+        if self.pitch is None:
+            return [self.x, self.y, self.z, self.radians[-1] * 180 / math.pi]
+        return [self.x, self.y, self.z] + [value * 180 / math.pi for value in (self.pitch,) + self.radians[-2:]]
+
+    def as_list(self):
+        """The flat list returned by feedback_get"""
+        head = [self.x, self.y, self.z] if self.pitch is None else [self.x, self.y, self.z, self.pitch]
+        return head + list(self.radians)
+
+    def as_row(self):
+        """Timestamp, x, y, z, pitch, radians and torques as one tuple, see state_columns()"""
+        timestamp = NAN if self.timestamp is None else self.timestamp
+        pitch = NAN if self.pitch is None else self.pitch
+        return (timestamp, self.x, self.y, self.z, pitch) + self.radians + self.torques
+
+    def __repr__(self):
+        joints = ", ".join(f"{name}={value:.4f}" for name, value in zip(JOINT_NAMES[self.type], self.radians))
+        return f"ArmState({self.type}, x={self.x}, y={self.y}, z={self.z}, {joints}, torques={self.torques})"
+
+
+def state_columns(roarm_type):
+    """Column names of ArmState.as_row() and states_array()"""
+    return (("timestamp", "x", "y", "z", "pitch") + JOINT_NAMES[roarm_type]
+            + tuple(f"{name}_torque" for name in JOINT_NAMES[roarm_type]))
+
+
+def states_array(states, columns=None):
+    """Stack ArmStates of one roarm type into an N x k numpy array
+    Args:
+        states  : ArmStates, type : iterable
+        columns : names from state_columns() to keep, default all
+    Return:
+        ndarray of shape (N, k)
+    """
+    import numpy as np
+    states = list(states)
+    if not states:
+        return np.empty((0, len(columns) if columns else 0))
+    rows = np.array([state.as_row() for state in states], dtype=float)
+    if columns is None:
+        return rows
+    names = state_columns(states[0].type)
+    return rows[:, [names.index(column) for column in columns]]
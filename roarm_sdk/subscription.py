@@ -0,0 +1,156 @@
+# coding=utf-8
+
+from __future__ import division
+import collections
+import logging
+import threading
+import time
+
+
+class SubscriptionStats(object):
+    """Counters of one Subscription."""
+    def __init__(self):
+        self.received = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.delivered = 0
+
+    def as_dict(self):
+        return {
+            "received": self.received,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+            "delivered": self.delivered,
+        }
+
+    def __repr__(self):
+        return "SubscriptionStats({})".format(", ".join(f"{k}={v!r}" for k, v in self.as_dict().items()))
+
+
+class Subscription(object):
+    """
+    One consumer of the decoded feedback stream of a roarm.
+
+    Every T:1051 frame read by the shared feedback reader is decoded once
+    into an ArmState and offered to each subscription. A subscription keeps
+    every n-th state and/or at most rate states per second, and holds them
+    in a queue of maxlen states; when a slow consumer lets the queue fill
+    up, the oldest state is dropped so the newest is always available.
+
+    Consume it as an iterator, with get(), or give a callback, which is
+    then called from the subscription's own thread so it never delays the
+    reader or the other subscribers.
+
+        with arm.subscribe(rate=10) as states:
+            for state in states:
+                log(state.as_row())
+
+        monitor = arm.subscribe(callback=check_torques, maxlen=1)
+    """
+    def __init__(self, maxlen=64, every=1, rate=None, callback=None, on_close=None):
+        """
+        Args:
+            maxlen   : most states waiting for the consumer, type : int
+            every    : keep every n-th frame, type : int
+            rate     : keep at most this many states per second, type : float
+            callback : function called with each ArmState from the subscription's thread
+            on_close : function called with the subscription when it is closed
+        """
+        self.log = logging.getLogger('Subscription')
+        self.maxlen = maxlen
+        self.every = max(1, int(every))
+        self.period = 1.0 / rate if rate else 0.0
+        self.callback = callback
+        self.stats = SubscriptionStats()
+        self._queue = collections.deque(maxlen=maxlen)
+        self._condition = threading.Condition()
+        self._on_close = on_close
+        self._last = None
+        self.closed = False
+        self._thread = None
+        if callback is not None:
+            self._thread = threading.Thread(target=self._run, name="roarm-subscription")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def offer(self, state):
+        """Queue a state unless downsampling skips it, called by the publisher"""
+        stats = self.stats
+        stats.received += 1
+        if self.every > 1 and (stats.received - 1) % self.every:
+            stats.skipped += 1
+            return
+        if self.period:
+            timestamp = state.timestamp if state.timestamp is not None else time.monotonic()
+            if self._last is not None and timestamp - self._last < self.period:
+                stats.skipped += 1
+                return
+            self._last = timestamp
+        with self._condition:
+            if len(self._queue) == self.maxlen:
+                stats.dropped += 1
+            self._queue.append(state)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """Return the oldest queued state
+        Args:
+            timeout : seconds to wait, None waits until a state arrives or the subscription is closed
+        Return:
+            ArmState, or None on timeout or when closed
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while not self._queue:
+                if self.closed:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            self.stats.delivered += 1
+            return self._queue.popleft()
+
+    def drain(self):
+        """Return every queued state without waiting"""
+        with self._condition:
+            states = list(self._queue)
+            self._queue.clear()
+        self.stats.delivered += len(states)
+        return states
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __iter__(self):
+        while True:
+            state = self.get()
+            if state is None:
+                return
+            yield state
+
+    def close(self):
+        """Stop receiving states, an iterator ends once the queued states are consumed"""
+        with self._condition:
+            if self.closed:
+                return
+            self.closed = True
+            self._condition.notify_all()
+        if self._on_close is not None:
+            self._on_close(self)
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(1.0)
+            self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _run(self):
+        for state in self:
+            try:
+                self.callback(state)
+            except Exception as e:
+                self.log.error("[subscription] callback failed: %s", e)
@@ -0,0 +1,134 @@
+# coding=utf-8
+
+from __future__ import division
+import logging
+import math
+import time
+
+
+class TrajectoryStats(object):
+    """Timing statistics of one trajectory run, lateness in seconds."""
+    def __init__(self):
+        self.sent = 0
+        self.skipped = 0
+        self.late = 0
+        self.max_lateness = 0.0
+        self.mean_lateness = 0.0
+        self.duration = 0.0
+        self._m2 = 0.0
+
+    @property
+    def jitter(self):
+        """Standard deviation of the lateness"""
+        return math.sqrt(self._m2 / self.sent) if self.sent else 0.0
+
+    def add(self, lateness, late_threshold):
+        self.sent += 1
+        delta = lateness - self.mean_lateness
+        self.mean_lateness += delta / self.sent
+        self._m2 += delta * (lateness - self.mean_lateness)
+        if lateness > self.max_lateness:
+            self.max_lateness = lateness
+        if lateness > late_threshold:
+            self.late += 1
+
+    def as_dict(self):
+        return {
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "late": self.late,
+            "max_lateness": self.max_lateness,
+            "mean_lateness": self.mean_lateness,
+            "jitter": self.jitter,
+            "duration": self.duration,
+        }
+
+    def __repr__(self):
+        return "TrajectoryStats({})".format(", ".join(f"{k}={v!r}" for k, v in self.as_dict().items()))
+
+
+def trajectory_point(point):
+    """Return (timestamp, radians) from a tuple or a drag teach record
+    radians may be any sequence, e.g. a numpy row or a tuple, and is returned as a list of floats
+    """
+    if isinstance(point, dict):
+        timestamp, radians = point["timestamped"], point["radians"]
+    else:
+        timestamp, radians = point[0], point[1]
+    return timestamp, [float(radian) for radian in radians]
+
+
+class TrajectoryExecutor(object):
+    """
+    Streams timestamped joint vectors to a roarm on a drift-free schedule.
+
+    Every setpoint is sent with one joints_radian_ctrl at an absolute deadline
+    measured from the start on the monotonic clock, so sleep errors do not
+    add up over long trajectories. Points are consumed one at a time and may
+    come from a generator.
+
+        executor = TrajectoryExecutor(arm)
+        stats = executor.run((0.02 * i, radians) for i, radians in enumerate(path))
+    """
+    def __init__(self, arm, speed=0, acc=0, skip_late=None, late_threshold=0.005):
+        """
+        Args:
+            arm            : roarm or CommandGenerator subclass
+            speed          : servo speed sent with each setpoint, 0 is the fastest
+            acc            : servo acceleration sent with each setpoint, 0 is the fastest
+            skip_late      : drop setpoints later than this many seconds, None sends all
+            late_threshold : lateness in seconds counted as late, default 0.005
+        """
+        self.log = logging.getLogger('TrajectoryExecutor')
+        self.arm = arm
+        self.speed = speed
+        self.acc = acc
+        self.skip_late = skip_late
+        self.late_threshold = late_threshold
+        self.stats = None
+        self._stop = False
+
+    def stop(self):
+        """Stop a running trajectory after the current setpoint"""
+        self._stop = True
+
+    def run(self, points, time_scale=1.0):
+        """Send a trajectory
+        Args:
+            points     : iterable of (timestamp, radians) or drag teach records, timestamps in seconds
+            time_scale : > 1 plays slower, < 1 plays faster
+        Return:
+            TrajectoryStats
+        """
+        self._stop = False
+        self.stats = stats = TrajectoryStats()
+        clock = time.monotonic
+        start = t0 = None
+        pending = None
+        for point in points:
+            if self._stop:
+                break
+            timestamp, radians = trajectory_point(point)
+            if start is None:
+                start, t0 = clock(), timestamp
+            deadline = start + (timestamp - t0) * time_scale
+            wait = deadline - clock()
+            if wait > 0:
+                time.sleep(wait)
+            lateness = clock() - deadline
+            if self.skip_late is not None and lateness > self.skip_late:
+                stats.skipped += 1
+                pending = (radians, deadline)
+                continue
+            pending = None
+            self.arm.joints_radian_ctrl(radians=radians, speed=self.speed, acc=self.acc)
+            stats.add(lateness, self.late_threshold)
+        if pending is not None and not self._stop:
+            # never skip the final setpoint, the arm has to end where the trajectory ends
+            stats.skipped -= 1
+            self.arm.joints_radian_ctrl(radians=pending[0], speed=self.speed, acc=self.acc)
+            stats.add(clock() - pending[1], self.late_threshold)
+        if start is not None:
+            stats.duration = clock() - start
+        self.log.debug("[trajectory] %s", stats)
+        return stats
@@ -1,7 +1,15 @@
 # coding=utf-8
+import logging
+import operator
+
+log = logging.getLogger('utils')
+
 class RoarmDataException(Exception):
     pass
 
+class RoarmTimeoutException(Exception):
+    pass
+
 def check_value_type(param_type, value_type, _type):
     if value_type is not _type:
         raise RoarmDataException(
@@ -37,101 +45,144 @@ def check_joint(value, valid_joints):
             f"The id not right, should be in {valid_joints}, but received {value}"
         )
 
-def check_joint_robot_limit(value, param_type, kwargs, roarm_type, param_name, robot_limit):
+def check_joint_robot_limit(value, param_type, kwargs, roarm_type, param_name):
     joint = kwargs.get('joint', None)
-    index = robot_limit[roarm_type]['joint'][joint - 1] - 1
-    limit_min = robot_limit[roarm_type][f"{param_type}_min"][index]
-    limit_max = robot_limit[roarm_type][f"{param_type}_max"][index]
+    index = ROBOT_LIMIT[roarm_type]['joint'][joint - 1] - 1
+    limit_min, limit_max = COMPILED_LIMITS[roarm_type][param_type]
+    limit_min = limit_min[index]
+    limit_max = limit_max[index]
 
     if value < limit_min or value > limit_max:
         raise RoarmDataException(f"{param_name} value not right, should be {limit_min} ~ {limit_max}, but received {value}")
             
-def check_joints_robot_limit(values, param_type, roarm_type, robot_limit):
-    if not isinstance(values, list):
-        raise RoarmDataException(f"{param_type} must be a list.")
+def check_joints_robot_limit(values, param_type, roarm_type):
+    # any sequence, e.g. a tuple or a numpy row, as check_trajectory accepts arrays
+    if isinstance(values, (str, bytes, dict)) or not hasattr(values, "__len__") or not hasattr(values, "__getitem__"):
+        raise RoarmDataException(f"{param_type} must be a list or sequence.")
     
-    values_len = len(robot_limit[roarm_type]["joint"])
-    if len(values) != values_len:
-        raise RoarmDataException("The length of {param_type} must be {values_len}.")
+    limit_min, limit_max = COMPILED_LIMITS[roarm_type][param_type]
+    if len(values) != len(limit_min):
+        raise RoarmDataException(f"The length of {param_type} must be {len(limit_min)}.")
+    if all(map(operator.le, limit_min, values)) and all(map(operator.le, values, limit_max)):
+        return
     for index, value in enumerate(values):
-        limit_min = robot_limit[roarm_type][f"{param_type}_min"][index]
-        limit_max = robot_limit[roarm_type][f"{param_type}_max"][index]
-        if not limit_min <= value <= limit_max:
+        if not limit_min[index] <= value <= limit_max[index]:
             raise RoarmDataException(
                 f"Has invalid {param_type} value, error on index {index}. "
-                f"Received {value} but {param_type} should be {limit_min} ~ {limit_max}."
+                f"Received {value} but {param_type} should be {limit_min[index]} ~ {limit_max[index]}."
             )
                         
 def check_joint_speed_acc(param_type, value, valid_range, value_type):
     check_value_type(param_type, value_type, int)
     min_value, max_value = valid_range
     if not min_value <= value <= max_value:
-        print(
-            f"{param_type} value not right, should be between {min_value} ~ {max_value}, "
-            f"but received {value}."
-        )   
+        log.warning("%s value not right, should be between %s ~ %s, but received %s.",
+                    param_type, min_value, max_value, value)
         if value < min_value:
             value = min_value + 10
         elif value > max_value:
             value = max_value - 10
                              
-def calibration_parameters(**kwargs):
-    robot_limit = {
-        "roarm_m2": {
-            "joint": [1, 2, 3, 4],            
-            "radians_min": [-3.3, -1.9, -1.2, -0.2],
-            "radians_max": [3.3, 1.9, 3.3, 1.9],            
-            "angles_min": [-190, -110, -70, -10],
-            "angles_max": [190, 110, 190, 100],
-            "positions_min": [-500, -500, 0, 0],
-            "positions_max": [500, 500, 600, 90],
-            "torques_min": [1, 1, 1, 1],
-            "torques_max": [1000, 1000, 1000, 1000],
-        },     
-        "roarm_m3": {
-            "joint": [1, 2, 3, 4, 5, 6],            
-            "radians_min": [-3.3, -1.9, -1.2, -1.9, -3.3, -0.2],
-            "radians_max": [3.3, 1.9, 3.3, 1.9, 3.3, 1.9],            
-            "angles_min": [-190, -110, -70, -110, -190, -10],
-            "angles_max": [190, 110, 190, 110, 190, 100],
-            "positions_min": [-500, -500, 0, -90,-180, 0],
-            "positions_max": [500, 500, 600, 90, 180, 90],
-            "torques_min": [1, 1, 1, 1, 1, 1],
-            "torques_max": [1000, 1000, 1000, 1000, 1000, 1000],
-        },          
-    }
+# servo speed in steps/s and acc in 100 steps/s^2, 0 is the fastest
+SPEED_RANGE = (0, 4096)
+ACC_RANGE = (0, 254)
+
+ROBOT_LIMIT = {
+    "roarm_m2": {
+        "joint": [1, 2, 3, 4],            
+        "radians_min": [-3.3, -1.9, -1.2, -0.2],
+        "radians_max": [3.3, 1.9, 3.3, 1.9],            
+        "angles_min": [-190, -110, -70, -10],
+        "angles_max": [190, 110, 190, 100],
+        "positions_min": [-500, -500, 0, 0],
+        "positions_max": [500, 500, 600, 90],
+        "torques_min": [1, 1, 1, 1],
+        "torques_max": [1000, 1000, 1000, 1000],
+    },     
+    "roarm_m3": {
+        "joint": [1, 2, 3, 4, 5, 6],            
+        "radians_min": [-3.3, -1.9, -1.2, -1.9, -3.3, -0.2],
+        "radians_max": [3.3, 1.9, 3.3, 1.9, 3.3, 1.9],            
+        "angles_min": [-190, -110, -70, -110, -190, -10],
+        "angles_max": [190, 110, 190, 110, 190, 100],
+        "positions_min": [-500, -500, 0, -90,-180, 0],
+        "positions_max": [500, 500, 600, 90, 180, 90],
+        "torques_min": [1, 1, 1, 1, 1, 1],
+        "torques_max": [1000, 1000, 1000, 1000, 1000, 1000],
+    },          
+}
 
-    parameter_validations = {
-        "cmd": lambda value, value_type, roarm_type, kwargs: check_cmd_or_mode("cmd", value, [0, 1], value_type),
-        "mode": lambda value, value_type, roarm_type, kwargs: check_cmd_or_mode("mode", value, [0, 1], value_type), 
-        "wifi_cmd": lambda value, value_type, roarm_type, kwargs: check_wifi_cmd("wifi_cmd", value, [0, 1, 2, 3], value_type),           
-        "joint": lambda value, value_type,  roarm_type, kwargs: check_joint(value, robot_limit[roarm_type]["joint"]),   
-        "radian": lambda value, value_type,  roarm_type, kwargs: check_joint_robot_limit(value, "radians", kwargs, roarm_type, "radian", robot_limit),
-        "angle": lambda value, value_type,  roarm_type, kwargs: check_joint_robot_limit(value, "angles", kwargs, roarm_type, "angle", robot_limit), 
-        "position": lambda value, value_type,  roarm_type, kwargs: check_joint_robot_limit(value, "positions", kwargs, roarm_type, "position", robot_limit),                
-        "radians": lambda value, value_type,  roarm_type, kwargs: check_joints_robot_limit(value, "radians", roarm_type, robot_limit),
-        "angles": lambda value, value_type,  roarm_type, kwargs: check_joints_robot_limit(value, "angles",  roarm_type, robot_limit),
-        "pose": lambda value, value_type,  roarm_type, kwargs: check_joints_robot_limit(value, "positions", roarm_type, robot_limit), 
-        "torques": lambda value, value_type,  roarm_type, kwargs: check_joints_robot_limit( value, "torques", roarm_type, robot_limit),       
-        "speed": lambda value, value_type,  roarm_type, kwargs: check_joint_speed_acc("speed", value, [0, 4096], value_type),
-        "acc": lambda value, value_type,  roarm_type, kwargs: check_joint_speed_acc("acc", value, [0, 254], value_type),
-        "ssid": lambda value, value_type, roarm_type, kwargs: check_value_type("ssid", value_type, str),   
-        "password": lambda value, value_type, roarm_type, kwargs: check_value_type("password", value_type, str)   
+# (min, max) tuples per arm type and parameter, compiled once from ROBOT_LIMIT
+COMPILED_LIMITS = {
+    roarm_type: {
+        param_type: (tuple(limits[f"{param_type}_min"]), tuple(limits[f"{param_type}_max"]))
+        for param_type in ("radians", "angles", "positions", "torques")
     }
+    for roarm_type, limits in ROBOT_LIMIT.items()
+}
 
+PARAMETER_VALIDATIONS = {
+    "cmd": lambda value, value_type, roarm_type, kwargs: check_cmd_or_mode("cmd", value, [0, 1], value_type),
+    "mode": lambda value, value_type, roarm_type, kwargs: check_cmd_or_mode("mode", value, [0, 1], value_type), 
+    "wifi_cmd": lambda value, value_type, roarm_type, kwargs: check_wifi_cmd("wifi_cmd", value, [0, 1, 2, 3], value_type),           
+    "joint": lambda value, value_type,  roarm_type, kwargs: check_joint(value, ROBOT_LIMIT[roarm_type]["joint"]),   
+    "radian": lambda value, value_type,  roarm_type, kwargs: check_joint_robot_limit(value, "radians", kwargs, roarm_type, "radian"),
+    "angle": lambda value, value_type,  roarm_type, kwargs: check_joint_robot_limit(value, "angles", kwargs, roarm_type, "angle"), 
+    "position": lambda value, value_type,  roarm_type, kwargs: check_joint_robot_limit(value, "positions", kwargs, roarm_type, "position"),                
+    "radians": lambda value, value_type,  roarm_type, kwargs: check_joints_robot_limit(value, "radians", roarm_type),
+    "angles": lambda value, value_type,  roarm_type, kwargs: check_joints_robot_limit(value, "angles", roarm_type),
+    "pose": lambda value, value_type,  roarm_type, kwargs: check_joints_robot_limit(value, "positions", roarm_type), 
+    "torques": lambda value, value_type,  roarm_type, kwargs: check_joints_robot_limit(value, "torques", roarm_type),       
+    "speed": lambda value, value_type,  roarm_type, kwargs: check_joint_speed_acc("speed", value, SPEED_RANGE, value_type),
+    "acc": lambda value, value_type,  roarm_type, kwargs: check_joint_speed_acc("acc", value, ACC_RANGE, value_type),
+    "ssid": lambda value, value_type, roarm_type, kwargs: check_value_type("ssid", value_type, str),   
+    "password": lambda value, value_type, roarm_type, kwargs: check_value_type("password", value_type, str)   
+}
+
+def calibration_parameters(**kwargs):
     roarm_type = kwargs.get("roarm_type", None)
-    if roarm_type not in robot_limit:
+    if roarm_type not in ROBOT_LIMIT:
         raise RoarmDataException(f"Unknown roarm_type: {roarm_type}")
 
     for parameter, value in kwargs.items():
         if parameter == "roarm_type":
             continue
         
-        if parameter in parameter_validations:
+        validation = PARAMETER_VALIDATIONS.get(parameter)
+        if validation is not None:
             try:
-                value_type = type(value)
-                parameter_validations[parameter](value, value_type, roarm_type, kwargs)
+                validation(value, type(value), roarm_type, kwargs)
             except RoarmDataException as e:
-                print(f"Error in parameter {parameter}: {str(e)}")
+                log.debug("Error in parameter %s: %s", parameter, e)
                 raise e  
-     
+
+def skip_calibration(**kwargs):
+    """Validation stand-in used when a roarm is told to skip validation."""
+    pass
+
+def check_trajectory(roarm_type, points, param_type="radians"):
+    """Validate a whole trajectory in one call
+    Args:
+        roarm_type : "roarm_m2" or "roarm_m3", type : str
+        points     : joint vectors, type : List[List[float]] or N x k numpy array
+        param_type : "radians", "angles", "positions" or "torques"
+    """
+    if roarm_type not in COMPILED_LIMITS:
+        raise RoarmDataException(f"Unknown roarm_type: {roarm_type}")
+    limit_min, limit_max = COMPILED_LIMITS[roarm_type][param_type]
+    if hasattr(points, "shape"):
+        import numpy as np
+        if points.ndim != 2 or points.shape[1] != len(limit_min):
+            raise RoarmDataException(f"{param_type} trajectory must have shape (N, {len(limit_min)}).")
+        invalid = ~((points >= np.asarray(limit_min)) & (points <= np.asarray(limit_max))).all(axis=1)
+        if not invalid.any():
+            return
+        points = points[np.flatnonzero(invalid)[:1]].tolist()
+        offset = int(np.flatnonzero(invalid)[0])
+    else:
+        offset = 0
+    for index, values in enumerate(points):
+        try:
+            check_joints_robot_limit(values, param_type, roarm_type)
+        except RoarmDataException as e:
+            raise RoarmDataException(f"Invalid trajectory point {offset + index}: {e}")
@@ -19,6 +19,10 @@ install_requires = [
 if sys.version_info >= (3, 10):
     install_requires.append("simplejson")
 
+extras_require = {
+    "kinematics": ["numpy"],
+}
+
 try:
     long_description = (
         open("README.md", encoding="utf-8").read()
@@ -55,5 +59,6 @@ setuptools.setup(
         "Operating System :: OS Independent",
     ],
     install_requires=install_requires,
+    extras_require=extras_require,
     python_requires=">=2.7, !=3.0.*, !=3.1.*, !=3.2.*, !=3.3.*, !=3.4.*",
 )
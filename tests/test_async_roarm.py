@@ -0,0 +1,94 @@
+# coding=utf-8
+import asyncio
+import time
+
+import pytest
+
+from roarm_sdk.async_roarm import AsyncRoarm
+from roarm_sdk.retry import RetryPolicy
+from roarm_sdk.simulator import PtySimulator, SimulatorHTTPServer, VirtualRoarm
+from roarm_sdk.utils import RoarmTimeoutException
+
+pytest.importorskip("pty")
+
+
+def test_serial_feedback_and_commands():
+    device = VirtualRoarm("roarm_m2")
+
+    async def run():
+        async with AsyncRoarm(roarm_type="roarm_m2", port=sim.port) as arm:
+            assert len(await arm.joints_radian_get()) == 4
+            await arm.joints_radian_ctrl(radians=[0.5, 0, 1.57, 1.0], speed=0, acc=0)
+            results = await asyncio.gather(*(arm.joints_radian_get() for _ in range(5)))
+            assert all(len(radians) == 4 for radians in results)
+
+    with PtySimulator(device) as sim:
+        asyncio.run(run())
+    assert device.target[0] == pytest.approx(0.5)
+
+
+def test_serial_unplugged_port_fails_fast_and_stops_reading():
+    sim = PtySimulator(VirtualRoarm("roarm_m2")).start()
+
+    async def run():
+        arm = AsyncRoarm(roarm_type="roarm_m2", port=sim.port, retry=RetryPolicy(attempts=3, deadline=5.0))
+        await arm.connect()
+        transport = arm._transport
+        assert len(await arm.joints_radian_get()) == 4
+        sim.stop()
+        start = time.monotonic()
+        with pytest.raises(OSError):
+            await arm.joints_radian_get()
+        assert time.monotonic() - start < 1.0
+        # the reader is removed once the port failed, so the loop does not spin on it
+        await asyncio.sleep(0.05)
+        assert transport.error is not None
+        assert transport._fd is None and transport._poll_task is None
+        with pytest.raises(OSError):
+            await arm.joints_radian_ctrl(radians=[0, 0, 1.57, 1.0], speed=0, acc=0)
+        await arm.disconnect()
+
+    asyncio.run(run())
+
+
+def test_http_feedback_and_commands():
+    device = VirtualRoarm("roarm_m2")
+
+    async def run(port):
+        async with AsyncRoarm(roarm_type="roarm_m2", host=f"127.0.0.1:{port}") as arm:
+            assert len(await arm.joints_radian_get()) == 4
+            await arm.joints_radian_ctrl(radians=[0.25, 0, 1.57, 1.0], speed=0, acc=0)
+
+    with SimulatorHTTPServer(device) as server:
+        asyncio.run(run(server.server_port))
+    assert device.target[0] == pytest.approx(0.25)
+
+
+@pytest.mark.parametrize("reply", [
+    b"HTTP/1.1 500 Internal Server Error\r\nContent-Length: 0\r\n\r\n",
+    b"HTTP/1.1 200 OK\r\nContent-Length: 7\r\n\r\n{\"T\":10",
+])
+def test_http_failed_tries_are_retried(reply):
+    requests = []
+
+    async def handle(reader, writer):
+        while await reader.readuntil(b"\r\n\r\n"):
+            requests.append(1)
+            writer.write(reply)
+            await writer.drain()
+
+    async def run():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        policy = RetryPolicy(attempts=3, deadline=2.0, timeout=0.5, backoff=0)
+        arm = AsyncRoarm(roarm_type="roarm_m2", host=f"127.0.0.1:{port}", retry=policy)
+        await arm.connect()
+        try:
+            with pytest.raises(RoarmTimeoutException):
+                await arm.joints_radian_get()
+        finally:
+            await arm.disconnect()
+            server.close()
+
+    asyncio.run(run())
+    assert len(requests) == 3
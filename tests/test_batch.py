@@ -0,0 +1,83 @@
+# coding=utf-8
+import json
+import threading
+
+import pytest
+
+from roarm_sdk import roarm
+from roarm_sdk.simulator import SimulatedSerial, VirtualRoarm
+from roarm_sdk.utils import RoarmDataException
+
+
+class Port(SimulatedSerial):
+    """SimulatedSerial keeping every write"""
+    def __init__(self, device):
+        super(Port, self).__init__(device)
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append(bytes(data))
+        return super(Port, self).write(data)
+
+
+def simulated_arm(**kwargs):
+    port = Port(VirtualRoarm("roarm_m2"))
+    return roarm(roarm_type="roarm_m2", transport=port, **kwargs), port
+
+
+def test_commands_are_sent_in_one_write():
+    arm, port = simulated_arm()
+    try:
+        with arm.batch() as batch:
+            arm.led_ctrl(255)
+            arm.torque_set(1)
+            arm.joints_radian_ctrl([0.1, 0, 1.57, 1.0], 1000, 50)
+            assert port.writes == []
+        assert len(port.writes) == 1
+        lines = port.writes[0].decode().splitlines()
+        assert [json.loads(line)["T"] for line in lines] == [114, 210, 102]
+        assert batch.results == [line.encode() + b"\n" for line in lines]
+    finally:
+        arm.disconnect()
+
+
+def test_invalid_command_sends_nothing():
+    arm, port = simulated_arm()
+    try:
+        with pytest.raises(RoarmDataException):
+            with arm.batch():
+                arm.led_ctrl(255)
+                arm.joints_radian_ctrl([9.0, 0, 1.57, 1.0], 1000, 50)
+        assert port.writes == []
+        with pytest.raises(RoarmDataException):
+            with arm.batch():
+                with arm.batch():
+                    pass
+    finally:
+        arm.disconnect()
+
+
+def test_other_threads_and_feedback_are_not_batched():
+    arm, port = simulated_arm()
+    try:
+        with arm.batch() as batch:
+            thread = threading.Thread(target=arm.led_ctrl, args=(1,))
+            thread.start()
+            thread.join()
+            assert len(arm.joints_radian_get()) == 4
+            arm.led_ctrl(2)
+        assert len(batch) == 1
+    finally:
+        arm.disconnect()
+
+
+def test_confirmed_batch_returns_the_echoes():
+    arm, port = simulated_arm(streaming=True, confirm=True)
+    try:
+        arm.echo_set(1)
+        with arm.batch() as batch:
+            arm.led_ctrl(255)
+            arm.torque_set(1)
+        assert [result["T"] for result in batch.results] == [114, 210]
+    finally:
+        arm.disconnect()
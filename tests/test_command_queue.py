@@ -0,0 +1,95 @@
+# coding=utf-8
+import threading
+import time
+
+import pytest
+
+from roarm_sdk.command_queue import CommandQueue, coalesce_key
+from roarm_sdk.common import JsonCmd
+from roarm_sdk.utils import RoarmDataException
+
+
+class GatedSender(object):
+    """Records the sent commands, each send waits until the test opens the gate."""
+    def __init__(self):
+        self.sent = []
+        self.gate = threading.Event()
+        self.started = threading.Event()
+
+    def __call__(self, genre, command):
+        self.started.set()
+        self.gate.wait(5)
+        self.sent.append(command)
+
+
+def blocked_queue(depth=64):
+    sender = GatedSender()
+    queue = CommandQueue(sender, depth=depth)
+    queue.start()
+    # the first command keeps the writer busy while the test fills the queue
+    queue.put(JsonCmd.LED_CTRL, b"first")
+    assert sender.started.wait(5)
+    return queue, sender
+
+
+def test_coalesce_key():
+    assert coalesce_key(JsonCmd.JOINTS_RADIAN_CTRL, ([0, 0, 1, 0], 0, 0)) == "arm"
+    assert coalesce_key(JsonCmd.POSE_CTRL, ([235, 0, 234, 0],)) == "arm"
+    assert coalesce_key(JsonCmd.JOINT_RADIAN_CTRL, (2, 0.5, 0, 0)) == ("joint", 2)
+    assert coalesce_key(JsonCmd.TORQUE_SET, (1,)) is None
+
+
+def test_setpoints_coalesce_and_keep_order():
+    queue, sender = blocked_queue()
+    queue.put(JsonCmd.JOINTS_RADIAN_CTRL, b"arm 1", "arm")
+    queue.put(JsonCmd.TORQUE_SET, b"torque", None)
+    queue.put(JsonCmd.JOINT_RADIAN_CTRL, b"joint 1 a", ("joint", 1))
+    queue.put(JsonCmd.JOINT_RADIAN_CTRL, b"joint 2", ("joint", 2))
+    assert queue.put(JsonCmd.POSE_CTRL, b"arm 2", "arm")
+    assert queue.put(JsonCmd.JOINT_RADIAN_CTRL, b"joint 1 b", ("joint", 1))
+    queue.put(JsonCmd.LED_CTRL, b"led", None)
+    assert len(queue) == 5
+    sender.gate.set()
+    assert queue.flush(5)
+    queue.stop()
+    assert sender.sent == [b"first", b"torque", b"joint 2", b"arm 2", b"joint 1 b", b"led"]
+    assert queue.stats.coalesced == 2
+    assert queue.stats.sent == 6
+
+
+def test_commands_without_key_are_all_sent():
+    queue, sender = blocked_queue()
+    for i in range(10):
+        queue.put(JsonCmd.LED_CTRL, b"led %d" % i, None)
+    sender.gate.set()
+    queue.stop()
+    assert sender.sent == [b"first"] + [b"led %d" % i for i in range(10)]
+    assert queue.stats.coalesced == 0
+
+
+def test_full_queue_times_out():
+    queue, sender = blocked_queue(depth=2)
+    queue.put(JsonCmd.POSE_CTRL, b"arm 1", "arm")
+    queue.put(JsonCmd.LED_CTRL, b"led", None)
+    with pytest.raises(RoarmDataException):
+        queue.put(JsonCmd.LED_CTRL, b"late", None, timeout=0.05)
+    # a setpoint replacing a pending one needs no room
+    assert queue.put(JsonCmd.POSE_CTRL, b"arm 2", "arm", timeout=0.05)
+    assert queue.stats.blocked == 1
+    sender.gate.set()
+    queue.stop()
+    assert sender.sent == [b"first", b"led", b"arm 2"]
+
+
+def test_stop_without_flush_drops_waiting_commands():
+    queue, sender = blocked_queue()
+    queue.put(JsonCmd.LED_CTRL, b"dropped", None)
+    stopper = threading.Thread(target=queue.stop, kwargs={"flush": False, "timeout": 5})
+    stopper.start()
+    while len(queue):
+        time.sleep(0.001)
+    sender.gate.set()
+    stopper.join(5)
+    assert b"dropped" not in sender.sent
+    with pytest.raises(RoarmDataException):
+        queue.put(JsonCmd.LED_CTRL, b"late", None)
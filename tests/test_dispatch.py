@@ -0,0 +1,80 @@
+# coding=utf-8
+import json
+import threading
+
+from roarm_sdk import roarm
+from roarm_sdk.common import FeedbackReader
+from roarm_sdk.simulator import SimulatedSerial, VirtualRoarm
+
+REQUEST = (json.dumps({"T": 105}) + "\n").encode()
+
+
+def listening_reader():
+    port = SimulatedSerial(VirtualRoarm("roarm_m2"))
+    reader = FeedbackReader(port, rate=0)
+    reader.start()
+    return port, reader
+
+
+def test_expect_is_resolved_by_its_code():
+    port, reader = listening_reader()
+    try:
+        future = reader.expect(1051)
+        port.write(REQUEST)
+        data, timestamp = future.result(1.0)
+        assert data["T"] == 1051 and timestamp > 0
+    finally:
+        reader.stop()
+
+
+def test_discarded_future_leaves_the_frame_to_the_next_caller():
+    port, reader = listening_reader()
+    try:
+        stale = reader.expect(1051)
+        reader.discard(1051, stale)
+        future = reader.expect(1051)
+        port.write(REQUEST)
+        assert future.result(1.0)[0]["T"] == 1051
+        assert stale.cancelled()
+    finally:
+        reader.stop()
+
+
+def test_listeners_by_code_and_for_every_code():
+    port, reader = listening_reader()
+    feedback, every = [], []
+    received = threading.Semaphore(0)
+
+    def failing(data, timestamp):
+        raise ValueError("listener bug")
+
+    def record(data, timestamp):
+        every.append(data["T"])
+        received.release()
+
+    # listeners of every code are called after those of the frame's code
+    reader.add_listener(failing, 1051)
+    reader.add_listener(lambda data, timestamp: feedback.append(data["T"]), 1051)
+    reader.add_listener(record)
+    try:
+        port.write(REQUEST)
+        assert received.acquire(timeout=1.0)
+        reader.remove_listener(failing, 1051)
+        port.write(REQUEST)
+        assert received.acquire(timeout=1.0)
+        assert feedback == [1051, 1051] and every == [1051, 1051]
+        assert reader.is_alive()
+    finally:
+        reader.stop()
+
+
+def test_confirmed_commands_return_their_echo():
+    arm = roarm(roarm_type="roarm_m2", transport=SimulatedSerial(VirtualRoarm("roarm_m2")), streaming=True,
+                confirm=True)
+    try:
+        arm.echo_set(1)
+        echo = arm.led_ctrl(128)
+        assert echo["T"] == 114 and echo["led"] == 128
+        assert len(arm.joints_radian_get()) == 4
+    finally:
+        arm.disconnect()
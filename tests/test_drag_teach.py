@@ -0,0 +1,77 @@
+# coding=utf-8
+import json
+import logging
+import time
+
+import pytest
+
+from roarm_sdk import roarm
+from roarm_sdk.recording import RecordingReader
+from roarm_sdk.sampler import DragTeachSampler
+from roarm_sdk.simulator import SimulatedSerial, VirtualRoarm
+from roarm_sdk.state import ArmState
+
+
+class DelayedArm(object):
+    """Answers state_get() with a frame received before a slow return, or fails."""
+    type = "roarm_m2"
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.received = []
+
+    def state_get(self):
+        if self.fail:
+            raise OSError("port gone")
+        timestamp = time.monotonic()
+        self.received.append(timestamp)
+        time.sleep(0.005)
+        return ArmState("roarm_m2", 0, 0, 0, None, (0.0, 0.0, 1.57, 0.5), (), timestamp)
+
+
+def sample(arm, seconds, **kwargs):
+    samples = []
+    sampler = DragTeachSampler(arm, **kwargs)
+    sampler.start(lambda timestamp, radians: samples.append((timestamp, radians)))
+    time.sleep(seconds)
+    sampler.stop()
+    return sampler, samples
+
+
+def test_samples_are_stamped_with_the_receipt_time():
+    arm = DelayedArm()
+    _, samples = sample(arm, 0.1, rate=100)
+    assert samples
+    assert [timestamp for timestamp, _ in samples] == arm.received[:len(samples)]
+    assert samples[0][1] == [0.0, 0.0, 1.57, 0.5]
+
+
+def test_failed_samples_are_counted_and_logged_once(caplog):
+    with caplog.at_level(logging.WARNING, logger="DragTeachSampler"):
+        sampler, samples = sample(DelayedArm(fail=True), 0.1, rate=200)
+    assert not samples
+    assert sampler.errors > 5
+    assert len([r for r in caplog.records if "sample failed" in r.getMessage()]) == 1
+
+
+@pytest.mark.parametrize("filename", ["teach.json", "teach.rarm"])
+def test_drag_teach_records_epoch_timestamps(tmp_path, filename):
+    path = str(tmp_path / filename)
+    arm = roarm(roarm_type="roarm_m2", transport=SimulatedSerial(VirtualRoarm("roarm_m2")))
+    before = time.time()
+    arm.drag_teach_start(path, rate=50, interactive=False)
+    time.sleep(0.2)
+    count = arm.drag_teach_stop()
+    after = time.time()
+    arm.disconnect()
+    assert count > 3
+    if filename.endswith(".json"):
+        with open(path) as file:
+            timestamps = [record["timestamped"] for record in json.load(file)]
+    else:
+        with RecordingReader(path) as reader:
+            timestamps = [timestamp for timestamp, _ in reader]
+    assert len(timestamps) == count
+    assert before <= timestamps[0] and timestamps[-1] <= after
+    assert timestamps == sorted(timestamps)
+
@@ -0,0 +1,54 @@
+# coding=utf-8
+import json
+
+import pytest
+
+from roarm_sdk.common import JsonCmd, command_encoders
+from roarm_sdk.generate import CommandGenerator
+
+JOINTS = {"roarm_m2": 4, "roarm_m3": 6}
+NUMBERS = [0, 1, -1, 0.5, -0.4, 1.5708, 3.141592653589793, 1e-7, 123456.789, 2 ** 40]
+STRINGS = ["roarm", "", 'quo"te', "back\\slash", "ünïcødé", "tab\tnew\nline"]
+
+
+def cases(roarm_type):
+    n = JOINTS[roarm_type]
+    vectors = [[NUMBERS[(i + shift) % len(NUMBERS)] for i in range(n)] for shift in range(len(NUMBERS))]
+    yield JsonCmd.ECHO_SET, (1,)
+    yield JsonCmd.MIDDLE_SET, (254,)
+    yield JsonCmd.LED_CTRL, (128,)
+    yield JsonCmd.TORQUE_SET, (0,)
+    yield JsonCmd.GRIPPER_MODE_SET, (1,)
+    yield JsonCmd.WIFI_ON_BOOT, (3,)
+    for text in STRINGS:
+        yield JsonCmd.AP_SET, (text, "12345678")
+        yield JsonCmd.STA_SET, ("ssid", text)
+        yield JsonCmd.APSTA_SET, (text, "pw", "sta", text)
+        yield JsonCmd.WIFI_CONFIG_CREATE_BY_INPUT, ("ap", text, text, "pw")
+    for vector in vectors:
+        yield JsonCmd.DYNAMIC_ADAPTATION_SET, (1, vector[:n])
+        yield JsonCmd.JOINTS_RADIAN_CTRL, (vector, 1000, 50)
+        yield JsonCmd.JOINTS_ANGLE_CTRL, (vector, 1000, 50)
+        yield JsonCmd.POSE_CTRL, (vector,)
+    for joint in range(1, n + 1):
+        for value in NUMBERS:
+            yield JsonCmd.JOINT_RADIAN_CTRL, (joint, value, 0, 10)
+            yield JsonCmd.JOINT_ANGLE_CTRL, (joint, value, 4096, 254)
+
+
+@pytest.mark.parametrize("roarm_type", sorted(JOINTS))
+def test_encoders_match_json_dumps(roarm_type):
+    generator = CommandGenerator(roarm_type)
+    covered = set()
+    for genre, args in cases(roarm_type):
+        fast = generator._mesg(genre, *args)
+        slow = generator._mesg_generic(genre, generator._process_data_command(args))
+        assert fast == slow, (genre, args)
+        assert json.loads(fast)["T"] == genre
+        covered.add(genre)
+    assert covered == set(command_encoders(roarm_type))
+
+
+def test_command_without_data():
+    generator = CommandGenerator("roarm_m2")
+    assert generator._mesg(JsonCmd.FEEDBACK_GET) == b'{"T": 105}\n'
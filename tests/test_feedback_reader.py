@@ -0,0 +1,96 @@
+# coding=utf-8
+import time
+
+import pytest
+
+from roarm_sdk import roarm
+from roarm_sdk.common import FeedbackReader
+from roarm_sdk.retry import RetryPolicy
+from roarm_sdk.simulator import SimulatedSerial, VirtualRoarm
+from roarm_sdk.utils import RoarmTimeoutException
+
+
+class Port(SimulatedSerial):
+    """SimulatedSerial that can stop answering or fail like an unplugged port"""
+    muted = False
+    dead = False
+
+    @property
+    def in_waiting(self):
+        if self.dead:
+            raise OSError(5, "Input/output error")
+        waiting = SimulatedSerial.in_waiting.fget(self)
+        return 0 if self.muted else waiting
+
+    def read(self, size=1):
+        if self.dead:
+            raise OSError(5, "Input/output error")
+        return b"" if self.muted else SimulatedSerial.read(self, size)
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_snapshots_follow_the_stream():
+    reader = FeedbackReader(Port(VirtualRoarm("roarm_m2")), rate=100)
+    reader.start()
+    try:
+        first = reader.wait(1.0)
+        assert first.data["T"] == 1051
+        wait_until(lambda: reader.latest.seq > first.seq + 3)
+        assert reader.latest.timestamp > first.timestamp
+    finally:
+        reader.stop()
+
+
+def test_stale_snapshot_is_not_returned():
+    port = Port(VirtualRoarm("roarm_m2"))
+    reader = FeedbackReader(port, rate=100)
+    reader.start()
+    try:
+        assert reader.wait(1.0) is not None
+        port.muted = True
+        time.sleep(0.1)
+        assert reader.latest is not None
+        assert reader.wait(0.05, max_age=0.05) is None
+        port.muted = False
+        assert reader.wait(1.0, max_age=0.05) is not None
+    finally:
+        reader.stop()
+
+
+def test_dead_port_stops_the_reader():
+    port = Port(VirtualRoarm("roarm_m2"))
+    reader = FeedbackReader(port, rate=100, max_errors=3)
+    reader.rl.timeout = 0.005
+    reader.start()
+    try:
+        assert reader.wait(1.0) is not None
+        port.dead = True
+        wait_until(lambda: not reader.is_alive())
+        assert isinstance(reader.error, OSError)
+        assert reader.latest is None
+        start = time.monotonic()
+        assert reader.wait(5.0) is None
+        assert time.monotonic() - start < 0.5
+    finally:
+        reader.stop()
+
+
+def test_streaming_arm_times_out_on_a_silent_link():
+    port = Port(VirtualRoarm("roarm_m2"))
+    arm = roarm(roarm_type="roarm_m2", transport=port, streaming=True, feedback_rate=100,
+                retry=RetryPolicy(attempts=2, deadline=None, timeout=0.02))
+    try:
+        assert len(arm.joints_radian_get()) == 4
+        port.muted = True
+        time.sleep(0.1)
+        with pytest.raises(RoarmTimeoutException):
+            arm.joints_radian_get()
+    finally:
+        port.muted = False
+        arm.disconnect()
@@ -0,0 +1,47 @@
+# coding=utf-8
+import threading
+
+from roarm_sdk.fleet import RoarmFleet
+
+
+class Arm(object):
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = 0
+
+    def work(self, stall):
+        self.calls += 1
+        if stall:
+            self.release.wait(5)
+        return self.calls
+
+
+def test_timed_out_arm_is_skipped_until_it_answers():
+    arms = {"left": Arm(), "right": Arm()}
+    fleet = RoarmFleet(arms, sync=False)
+    results = fleet.map(lambda name, arm: arm.work(name == "right"), timeout=0.1)
+    assert results["left"].value == 1 and results["left"].error is None
+    assert isinstance(results["right"].error, TimeoutError)
+    assert fleet.unhealthy == ["right"]
+
+    results = fleet.map(lambda name, arm: arm.work(False), timeout=0.1)
+    assert results["left"].value == 2
+    assert "still busy" in str(results["right"].error)
+    assert arms["right"].calls == 1
+
+    arms["right"].release.set()
+    for _ in range(100):
+        if not fleet.unhealthy:
+            break
+        threading.Event().wait(0.01)
+    assert fleet.unhealthy == []
+    results = fleet.map(lambda name, arm: arm.work(False), timeout=1)
+    assert results["right"].value == 2 and results["right"].error is None
+    fleet._shutdown_executor()
+
+
+def test_failures_are_results():
+    fleet = RoarmFleet({"a": Arm()}, sync=False)
+    result = fleet.map(lambda name, arm: 1 / 0)["a"]
+    assert isinstance(result.error, ZeroDivisionError) and result.value is None
+    fleet._shutdown_executor()
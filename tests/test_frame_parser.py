@@ -0,0 +1,92 @@
+# coding=utf-8
+import json
+
+from roarm_sdk.common import FrameParser
+
+FEEDBACK = b'{"T":1051,"x":1,"y":2,"z":3}\r\n'
+
+
+def test_frames_in_one_chunk():
+    parser = FrameParser()
+    assert parser.feed(FEEDBACK + FEEDBACK) == [FEEDBACK, FEEDBACK]
+    assert parser.stats() == {"frames": 2, "dropped_bytes": 0, "garbled_frames": 0}
+
+
+def test_frame_split_across_chunks():
+    parser = FrameParser()
+    frames = []
+    for i in range(len(FEEDBACK)):
+        frames += parser.feed(FEEDBACK[i:i + 1])
+    assert frames == [FEEDBACK]
+    assert parser.pending() == 0
+
+
+def test_truncated_frame_is_not_glued_to_the_next():
+    parser = FrameParser()
+    frames = parser.feed(b'{"T":1051,"x":0' + b'{"T":1051,"x":1}\r\n')
+    assert frames == [b'{"T":1051,"x":1}\r\n']
+    assert json.loads(frames[0])["x"] == 1
+    assert parser.stats() == {"frames": 1, "dropped_bytes": 15, "garbled_frames": 1}
+
+
+def test_noise_between_frames_is_dropped():
+    parser = FrameParser()
+    frames = parser.feed(b"boot\r\n" + FEEDBACK + b"\x00\xff" + FEEDBACK)
+    assert frames == [FEEDBACK, FEEDBACK]
+    assert parser.stats() == {"frames": 2, "dropped_bytes": 8, "garbled_frames": 0}
+
+
+def test_nested_object_is_one_frame():
+    parser = FrameParser()
+    frame = b'{"T":401,"info":{"ip":"192.168.4.1"}}\r\n'
+    assert parser.feed(b'{"T":1' + frame) == [frame]
+    assert parser.stats()["garbled_frames"] == 1
+
+
+def test_overlong_frame_is_dropped():
+    parser = FrameParser(max_frame_length=64)
+    long_frame = b'{"T":1051,"pad":"' + b"x" * 100 + b'"}\r\n'
+    assert parser.feed(long_frame + FEEDBACK) == [FEEDBACK]
+    assert parser.stats()["frames"] == 1
+    assert parser.stats()["dropped_bytes"] == len(long_frame)
+
+
+def test_many_frames_wrap_the_buffer():
+    parser = FrameParser(max_frame_length=64)
+    frames = []
+    for _ in range(100):
+        frames += parser.feed(FEEDBACK[:7])
+        frames += parser.feed(FEEDBACK[7:])
+    assert frames == [FEEDBACK] * 100
+
+
+def test_braces_in_strings_are_not_counted():
+    parser = FrameParser()
+    frames = [b'{"T":401,"ssid":"lab}{net","pass":"a\\"}"}\r\n', b'{"T":401,"info":{"ssid":"{x"}}\r\n',
+              b'{"T":401,"ssid":"{"}\r\n']
+    assert parser.feed(b"".join(frames)) == frames
+    assert [json.loads(frame)["T"] for frame in frames] == [401] * 3
+    assert parser.stats() == {"frames": 3, "dropped_bytes": 0, "garbled_frames": 0}
+
+
+def test_truncated_frame_before_a_string_with_braces():
+    parser = FrameParser()
+    frame = b'{"T":401,"ssid":"a{b}"}\r\n'
+    assert parser.feed(b'{"T":1051,"x":' + frame) == [frame]
+    assert parser.stats()["garbled_frames"] == 1
+
+
+def test_closing_delimiter_follows_frame_start():
+    parser = FrameParser(frame_start=b"[", frame_end=b"\n")
+    assert parser.feed(b'[1,[2,"]"]]\n[3' + b"[4]\n") == [b'[1,[2,"]"]]\n', b"[4]\n"]
+    assert parser.stats()["garbled_frames"] == 1
+
+
+def test_fragmented_frames_with_line_ends():
+    parser = FrameParser(frame_start=b"{", frame_end=b"\n")
+    frame = b'{"T":102,"base":0,"info":{"a":1}}\n'
+    frames = []
+    for _ in range(3):
+        for i in range(len(frame)):
+            frames += parser.feed(frame[i:i + 1])
+    assert frames == [frame] * 3
@@ -0,0 +1,104 @@
+# coding=utf-8
+import json
+
+import pytest
+
+from roarm_sdk import roarm, CommandGenerator
+from roarm_sdk.gateway import RoarmGateway, GatewayClient, _decode_command
+from roarm_sdk.simulator import SimulatedSerial, VirtualRoarm
+from roarm_sdk.utils import RoarmDataException
+
+CALLS = {
+    "roarm_m2": [
+        ("echo_set", {"cmd": 1}),
+        ("led_ctrl", {"led": 128}),
+        ("torque_set", {"cmd": 0}),
+        ("dynamic_adaptation_set", {"mode": 1, "torques": [100, 200, 300, 400]}),
+        ("joint_radian_ctrl", {"joint": 4, "radian": 0.5, "speed": 100, "acc": 10}),
+        ("joint_radian_ctrl", {"joint": 1, "radian": -1.5, "speed": 0, "acc": 0}),
+        ("joints_radian_ctrl", {"radians": [0.1, 0.2, 1.5, 0.4], "speed": 200, "acc": 20}),
+        ("joint_angle_ctrl", {"joint": 4, "angle": 30, "speed": 100, "acc": 10}),
+        ("joints_angle_ctrl", {"angles": [10, 20, 90, 30], "speed": 1000, "acc": 100}),
+        ("pose_ctrl", {"pose": [235, 0, 234, 10]}),
+        ("gripper_mode_set", {"mode": 1}),
+        ("wifi_on_boot", {"wifi_cmd": 3}),
+        ("ap_set", {"ssid": "RoArm {M2}", "password": "12345678"}),
+        ("apsta_set", {"ap_ssid": "a", "ap_password": "b", "sta_ssid": "c", "sta_password": "d"}),
+        ("wifi_stop", {}),
+    ],
+    "roarm_m3": [
+        ("joint_radian_ctrl", {"joint": 6, "radian": 0.5, "speed": 100, "acc": 10}),
+        ("joints_radian_ctrl", {"radians": [0.1, 0.2, 1.5, 0.4, 0.5, 0.6], "speed": 200, "acc": 20}),
+        ("joints_angle_ctrl", {"angles": [10, 20, 90, 30, 40, 50], "speed": 1000, "acc": 100}),
+        ("pose_ctrl", {"pose": [235, 0, 234, 10, 20, 30]}),
+        ("dynamic_adaptation_set", {"mode": 1, "torques": [100, 200, 300, 400, 500, 600]}),
+    ],
+}
+
+
+@pytest.mark.parametrize("roarm_type,method,kwargs",
+                         [(t, m, k) for t, calls in CALLS.items() for m, k in calls])
+def test_decode_undoes_the_encoders(roarm_type, method, kwargs):
+    command = json.loads(getattr(CommandGenerator(roarm_type), method)(**kwargs))
+    decoded_method, decoded = _decode_command(roarm_type, command)
+    assert decoded_method == method
+    assert decoded.keys() == kwargs.keys()
+    for key, value in kwargs.items():
+        assert decoded[key] == pytest.approx(value)
+
+
+@pytest.fixture
+def gateway():
+    device = VirtualRoarm("roarm_m2")
+    arm = roarm(roarm_type="roarm_m2", transport=SimulatedSerial(device))
+    gateway = RoarmGateway(arm, port=0).start()
+    clients = []
+
+    def client():
+        clients.append(roarm(roarm_type="roarm_m2", transport=GatewayClient(port=gateway.address[1])))
+        return clients[-1]
+
+    yield device, client
+    for arm_client in clients:
+        arm_client.disconnect()
+    gateway.stop()
+    arm.disconnect()
+
+
+def test_second_client_is_refused_with_an_exception(gateway):
+    device, client = gateway
+    first, second = client(), client()
+    first.joints_radian_ctrl(radians=[0.3, 0, 1.57, 1.0], speed=0, acc=0)
+    with pytest.raises(RoarmDataException, match="owned by"):
+        second.joints_radian_ctrl(radians=[-0.3, 0, 1.57, 1.0], speed=0, acc=0)
+    # shared settings are guarded as well, reads are not
+    with pytest.raises(RoarmDataException, match="owned by"):
+        second.echo_set(1)
+    assert len(second.joints_radian_get()) == 4
+    assert device.target[0] == pytest.approx(0.3)
+    first._serial_port.release()
+    second.joints_radian_ctrl(radians=[-0.3, 0, 1.57, 1.0], speed=0, acc=0)
+    assert device.target[0] == pytest.approx(-0.3)
+
+
+def test_raw_lines_are_checked_against_the_limits(gateway):
+    device, client = gateway
+    port = client()._serial_port
+    with pytest.raises(RoarmDataException, match="invalid radians"):
+        port.write(b'{"T":102,"base":9,"shoulder":0,"elbow":1.57,"hand":2,"spd":0,"acc":0}\n')
+    with pytest.raises(RoarmDataException, match="unsupported"):
+        port.write(b'{"T":999}\n')
+    with pytest.raises(RoarmDataException, match="invalid json"):
+        port.write(b'{"T":102,\n')
+    assert device.target[0] == 0.0
+
+
+def test_acquire_and_status(gateway):
+    _, client = gateway
+    first, second = client()._serial_port, client()._serial_port
+    assert first.acquire()
+    assert not second.acquire()
+    status = second.status()
+    assert len(status["clients"]) == 2 and status["owner"] is not None
+    first.release()
+    assert second.acquire()
@@ -0,0 +1,53 @@
+# coding=utf-8
+import numpy as np
+import pytest
+
+from roarm_sdk.kinematics import Kinematics, kinematics
+
+
+def random_joints(kin, count, seed=0):
+    rng = np.random.default_rng(seed)
+    margin = 0.05
+    return rng.uniform(kin.radians_min + margin, kin.radians_max - margin, (count, kin.joints))
+
+
+@pytest.mark.parametrize("roarm_type", ["roarm_m2", "roarm_m3"])
+def test_fk_ik_round_trip(roarm_type):
+    kin = kinematics(roarm_type)
+    joints = random_joints(kin, 2000)
+    poses = kin.fk(joints)
+    solved, ok = kin.ik(poses, seed=joints)
+    assert ok.all()
+    assert np.allclose(solved, joints, atol=1e-6)
+    assert np.allclose(kin.fk(solved), poses, atol=1e-6)
+
+
+@pytest.mark.parametrize("roarm_type", ["roarm_m2", "roarm_m3"])
+def test_ik_without_seed_reaches_the_pose(roarm_type):
+    kin = kinematics(roarm_type)
+    poses = kin.fk(random_joints(kin, 500, seed=1))
+    solved, ok = kin.ik(poses)
+    assert np.allclose(kin.fk(solved[ok]), poses[ok], atol=1e-6)
+    assert ok.mean() > 0.9
+
+
+def test_single_pose_keeps_its_shape():
+    kin = kinematics("roarm_m2")
+    pose = kin.fk([0.1, 0.2, 1.5, 1.0])
+    assert pose.shape == (4,)
+    joints, ok = kin.ik(pose, seed=[0.1, 0.2, 1.5, 1.0])
+    assert joints.shape == (4,) and ok is True
+    assert np.allclose(joints, [0.1, 0.2, 1.5, 1.0])
+
+
+def test_out_of_reach_is_nan():
+    joints, ok = kinematics("roarm_m2").ik([[2000, 0, 0, 30], [250, 0, 120, 30]])
+    assert ok.tolist() == [False, True]
+    assert np.isnan(joints[0]).all() and np.isfinite(joints[1]).all()
+
+
+def test_longer_tool_moves_the_pose():
+    joints = [0, 0, 1.57, 0, 0, 0]
+    default = kinematics("roarm_m3").fk(joints)
+    longer = Kinematics("roarm_m3", {"wrist": (167.85, 5.98)}).fk(joints)
+    assert np.hypot(*(longer[:3] - default[:3])[[0, 2]]) == pytest.approx(100, abs=1e-6)
@@ -0,0 +1,37 @@
+# coding=utf-8
+import numpy as np
+import pytest
+
+from roarm_sdk.motion import CartesianPath, cartesian_path
+
+REPEATED = [[250, -80, 120, 30], [250, 0, 120, 30], [250, 0, 120, 30], [250, 80, 120, 30]]
+
+
+@pytest.mark.parametrize("interpolation", ["linear", "cubic", "quintic"])
+def test_repeated_waypoints_are_merged(interpolation):
+    path = CartesianPath("roarm_m2", REPEATED, speed=100, interpolation=interpolation)
+    assert len(path.waypoints) == 3
+    assert np.isfinite(path.poses).all()
+    assert np.allclose(path.poses[0], REPEATED[0]) and np.allclose(path.poses[-1], REPEATED[-1])
+
+
+@pytest.mark.parametrize("interpolation", ["linear", "cubic", "quintic"])
+def test_orientation_only_segment_takes_time(interpolation):
+    waypoints = [[250, -80, 120, 30], [250, 0, 120, 30], [250, 0, 120, 60], [250, 80, 120, 60]]
+    path = CartesianPath("roarm_m2", waypoints, speed=100, interpolation=interpolation)
+    assert path.length == pytest.approx(190)
+    # the gripper turns smoothly instead of jumping between two setpoints
+    assert np.abs(np.diff(path.poses[:, 3])).max() < 5
+
+
+def test_no_move_is_one_pose():
+    path = CartesianPath("roarm_m2", [REPEATED[0]] * 3, speed=100, interpolation="cubic")
+    assert np.allclose(path.poses, REPEATED[0])
+
+
+def test_cached_path_is_reused_near_the_seed():
+    first = cartesian_path("roarm_m2", REPEATED, speed=120, interpolation="cubic")
+    assert cartesian_path("roarm_m2", REPEATED, speed=120, interpolation="cubic") is first
+    assert cartesian_path("roarm_m2", REPEATED, speed=120, interpolation="cubic", seed=first.joints[0] + 0.01) is first
+    # far from the cached start the path is solved again from the seed
+    assert cartesian_path("roarm_m2", REPEATED, speed=120, interpolation="cubic", seed=first.joints[0] + 3) is not first
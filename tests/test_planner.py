@@ -0,0 +1,52 @@
+# coding=utf-8
+import numpy as np
+import pytest
+
+from roarm_sdk.planner import TrajectoryPlan
+
+CORNERS = [[0, 0, 1.57, 0], [1, 0.5, 1.0, 0.5], [0.2, -0.5, 2.0, 1.0], [0, 0, 1.57, 0]]
+TOLERANCE = 1e-6
+
+
+def finite_differences(points):
+    times = np.array([point[0] for point in points])
+    radians = np.array([point[1] for point in points])
+    velocities = np.diff(radians, axis=0) / np.diff(times)[:, None]
+    middles = (times[:-1] + times[1:]) / 2
+    accelerations = np.diff(velocities, axis=0) / np.diff(middles)[:, None]
+    return radians, np.abs(velocities).max(axis=0), np.abs(accelerations).max(axis=0)
+
+
+@pytest.mark.parametrize("rate", [50, 100, 200, 1000])
+@pytest.mark.parametrize("mode", ["time_optimal", "min_jerk"])
+def test_points_keep_limits_at_corners(mode, rate):
+    plan = TrajectoryPlan(CORNERS, velocity=2.0, acceleration=8.0, mode=mode)
+    radians, velocity, acceleration = finite_differences(plan.points(rate))
+    assert (velocity <= 2.0 * (1 + TOLERANCE)).all()
+    assert (acceleration <= 8.0 * (1 + TOLERANCE)).all()
+    assert np.allclose(radians[0], CORNERS[0]) and np.allclose(radians[-1], CORNERS[-1])
+
+
+def test_reported_peaks_match_limits():
+    plan = TrajectoryPlan(CORNERS, velocity=2.0, acceleration=8.0)
+    assert plan.segment_velocities().max() == pytest.approx(2.0)
+    assert plan.segment_accelerations().max() == pytest.approx(8.0)
+
+
+def test_dense_path_keeps_per_joint_limits():
+    waypoints = np.cumsum(np.random.default_rng(1).normal(0, 0.05, (200, 4)), axis=0)
+    limits = np.array([1.0, 1.5, 2.0, 3.0])
+    plan = TrajectoryPlan(waypoints, velocity=limits, acceleration=2 * limits)
+    for rate in (50, 200):
+        radians, velocity, acceleration = finite_differences(plan.points(rate))
+        assert (velocity <= limits * (1 + TOLERANCE)).all()
+        assert (acceleration <= 2 * limits * (1 + TOLERANCE)).all()
+        assert np.allclose(radians[-1], waypoints[-1])
+
+
+def test_corners_are_cut_by_a_fraction_of_a_step():
+    plan = TrajectoryPlan(CORNERS, velocity=2.0, acceleration=8.0, resolution=0.01)
+    times = dict(plan.points(1000))
+    for time, waypoint in zip(plan.times, plan.waypoints):
+        nearest = min(times, key=lambda t: abs(t - time))
+        assert np.abs(np.array(times[nearest]) - waypoint).max() < 0.01
@@ -0,0 +1,51 @@
+# coding=utf-8
+import json
+
+import numpy as np
+import pytest
+
+from roarm_sdk.recording import RecordingReader, RecordingWriter, json_to_recording, recording_to_json
+from roarm_sdk.utils import RoarmDataException
+
+SAMPLES = [{"timestamped": 1700000000.0 + i * 0.02, "radians": [0.01 * i, -0.4, 1.5708, 3.0 - 0.01 * i]}
+           for i in range(50)]
+
+
+def test_json_round_trip(tmp_path):
+    source, recording, back = tmp_path / "teach.json", str(tmp_path / "teach.rarm"), tmp_path / "back.json"
+    source.write_text(json.dumps(SAMPLES))
+    assert json_to_recording(str(source), recording) == len(SAMPLES)
+    with RecordingReader(recording) as reader:
+        assert reader.roarm_type == "roarm_m2" and len(reader) == len(SAMPLES)
+        assert reader.as_array().shape == (len(SAMPLES), 5)
+        assert reader[3] == (SAMPLES[3]["timestamped"], SAMPLES[3]["radians"])
+        assert reader[-1][0] == SAMPLES[-1]["timestamped"]
+    assert recording_to_json(recording, str(back)) == len(SAMPLES)
+    assert json.loads(back.read_text()) == SAMPLES
+
+
+def test_append_drops_a_partial_record(tmp_path):
+    filename = str(tmp_path / "teach.rarm")
+    with RecordingWriter(filename, "roarm_m3") as writer:
+        for i in range(3):
+            writer.write(i, [i] * 6)
+    with open(filename, "ab") as file:
+        file.write(b"\x00" * 10)
+    with RecordingWriter(filename, "roarm_m3", append=True) as writer:
+        writer.write(3, [3] * 6)
+    with RecordingReader(filename) as reader:
+        assert np.array_equal(reader.as_array()[:, 0], [0, 1, 2, 3])
+
+
+def test_append_checks_the_joint_count(tmp_path):
+    filename = str(tmp_path / "teach.rarm")
+    RecordingWriter(filename, "roarm_m2").close()
+    with pytest.raises(RoarmDataException):
+        RecordingWriter(filename, "roarm_m3", append=True)
+
+
+def test_not_a_recording(tmp_path):
+    filename = tmp_path / "teach.rarm"
+    filename.write_bytes(b"{}" * 20)
+    with pytest.raises(RoarmDataException):
+        RecordingReader(str(filename))
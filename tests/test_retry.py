@@ -0,0 +1,123 @@
+# coding=utf-8
+import time
+
+import pytest
+
+from roarm_sdk import roarm
+from roarm_sdk.retry import RetryPolicy
+from roarm_sdk.simulator import SimulatedSerial, VirtualRoarm
+from roarm_sdk.utils import RoarmTimeoutException
+
+
+class FakeClock(object):
+    """Clock advanced by sleep() and by the simulated waits of each try."""
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def run(policy, clock, answered_after=None):
+    """Try like roarm does, every try waits its whole timeout, return the tried timeouts."""
+    timeouts = []
+    for attempt, timeout in policy.tries(clock=clock, sleep=clock.sleep):
+        timeouts.append(timeout)
+        if answered_after is not None and attempt == answered_after:
+            return timeouts
+        clock.now += timeout
+        policy.failed()
+    return timeouts
+
+
+def test_initial_timeout_until_measured():
+    policy = RetryPolicy(attempts=3, deadline=None, timeout=0.1)
+    assert run(policy, FakeClock()) == [0.1, 0.1, 0.1]
+
+
+def test_adaptive_timeout_follows_rtt():
+    policy = RetryPolicy(timeout=0.1, min_timeout=0.001)
+    for _ in range(50):
+        policy.observe(0.004)
+    assert policy.try_timeout == pytest.approx(0.004, abs=1e-3)
+    policy.observe(0.02)
+    assert 0.004 < policy.try_timeout <= 0.1
+
+
+def test_adaptive_timeout_is_clamped():
+    policy = RetryPolicy(timeout=0.1, min_timeout=0.02)
+    policy.observe(0.0001)
+    assert policy.try_timeout == 0.02
+    policy.observe(1.0)
+    assert policy.try_timeout == 0.1
+
+
+def test_unanswered_tries_back_off_until_a_first_try_is_answered():
+    policy = RetryPolicy(attempts=5, deadline=None, timeout=0.1, min_timeout=0.01, backoff=0.001)
+    for _ in range(20):
+        policy.observe(0.005)
+    timeouts = run(policy, FakeClock())
+    assert timeouts[0] == pytest.approx(0.01)
+    assert timeouts == sorted(timeouts)
+    assert timeouts[-1] == 0.1
+    # the longer wait is kept for the next request until a first try is timed again
+    assert policy.try_timeout == 0.1
+    policy.observe(0.005)
+    assert policy.try_timeout == pytest.approx(0.01)
+
+
+def test_pauses_grow_exponentially():
+    policy = RetryPolicy(attempts=6, deadline=None, backoff=0.002, backoff_factor=2.0, max_backoff=0.01)
+    clock = FakeClock()
+    run(policy, clock)
+    assert clock.sleeps == [0.002, 0.004, 0.008, 0.01, 0.01]
+
+
+def test_deadline_counts_from_the_first_try():
+    policy = RetryPolicy(attempts=100, deadline=0.25, timeout=0.1, backoff=0)
+    clock = FakeClock()
+    timeouts = run(policy, clock)
+    assert timeouts == pytest.approx([0.1, 0.1, 0.05])
+    assert clock.now == pytest.approx(0.25)
+
+
+def test_stops_when_answered():
+    policy = RetryPolicy(attempts=10, deadline=None)
+    assert len(run(policy, FakeClock(), answered_after=2)) == 3
+
+
+def test_roarm_raises_timeout_on_a_silent_link():
+    device = VirtualRoarm("roarm_m2", latency=10.0)
+    arm = roarm(roarm_type="roarm_m2", transport=SimulatedSerial(device),
+                retry=RetryPolicy(attempts=3, deadline=0.2, timeout=0.05), metrics=True)
+    with pytest.raises(RoarmTimeoutException):
+        arm.joints_radian_get()
+    assert arm.metrics.timeouts == 1
+    arm.disconnect()
+
+
+def test_roarm_answers_and_measures_rtt():
+    arm = roarm(roarm_type="roarm_m2", transport=SimulatedSerial(VirtualRoarm("roarm_m2")))
+    assert len(arm.joints_radian_get()) == 4
+    assert arm.retry.srtt is not None
+    arm.disconnect()
+
+
+def test_passed_transport_keeps_its_timeout():
+    device = VirtualRoarm("roarm_m2", latency=10.0)
+    transport = SimulatedSerial(device, timeout=2.0)
+    arm = roarm(roarm_type="roarm_m2", transport=transport,
+                retry=RetryPolicy(attempts=3, deadline=0.2, timeout=0.05))
+    assert transport.timeout == 2.0
+    start = time.monotonic()
+    with pytest.raises(RoarmTimeoutException):
+        arm.joints_radian_get()
+    # the tries poll the port instead of blocking for its whole timeout
+    assert time.monotonic() - start < 1.0
+    assert transport.timeout == 2.0
+    arm.disconnect()
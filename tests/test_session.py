@@ -0,0 +1,79 @@
+# coding=utf-8
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from roarm_sdk.retry import RetryPolicy
+from roarm_sdk.roarm import roarm
+from roarm_sdk.utils import RoarmTimeoutException
+
+FEEDBACK = json.dumps({"T": 1051, "x": 1, "y": 2, "z": 3, "b": 0, "s": 0, "e": 1.57, "t": 0, "r": 0, "g": 3.14,
+                       "tB": 0, "tS": 0, "tE": 0, "tT": 0, "tR": 0, "tG": 0})
+
+
+class FlakyServer(ThreadingHTTPServer):
+    """Answers the first failures requests with bodies[0], the rest with bodies[1]"""
+    daemon_threads = True
+
+    def __init__(self, failures, bodies):
+        self.failures = failures
+        self.bodies = bodies
+        self.requests = 0
+        super(FlakyServer, self).__init__(("127.0.0.1", 0), FlakyHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests += 1
+        code, body = self.server.bodies[self.server.requests > self.server.failures]
+        body = body.encode()
+        self.send_response(code)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def http_arm(server, attempts=3):
+    return roarm(roarm_type="roarm_m2", host=f"127.0.0.1:{server.server_port}", metrics=True,
+                 retry=RetryPolicy(attempts=attempts, deadline=None, timeout=0.5, backoff=0))
+
+
+@pytest.mark.parametrize("failure", [(500, "busy"), (200, '{"T":1051,"x":')])
+def test_failed_feedback_is_retried(failure):
+    server = FlakyServer(2, [failure, (200, FEEDBACK)])
+    arm = http_arm(server)
+    try:
+        assert arm.feedback_get()[:3] == [1, 2, 3]
+        assert server.requests == 3
+        metrics = arm.metrics.commands[105]
+        assert metrics.retries == 2 and metrics.errors == 0
+    finally:
+        arm.disconnect()
+        server.close()
+
+
+def test_http_error_on_a_command_is_retried_and_counted():
+    server = FlakyServer(5, [(500, "busy"), (200, "")])
+    arm = http_arm(server)
+    try:
+        with pytest.raises(RoarmTimeoutException):
+            arm.led_ctrl(128)
+        assert server.requests == 3
+        assert arm.metrics.commands[114].timeouts == 1
+        arm.led_ctrl(128)
+        assert server.requests == 6
+    finally:
+        arm.disconnect()
+        server.close()
@@ -0,0 +1,51 @@
+# coding=utf-8
+import math
+
+import numpy as np
+import pytest
+
+from roarm_sdk import roarm
+from roarm_sdk.simulator import SimulatedSerial, VirtualRoarm
+from roarm_sdk.state import ArmState, state_columns, states_array
+
+M2 = {"T": 1051, "x": 300, "y": 10, "z": 200, "b": 0.1, "s": 0.2, "e": 1.5, "t": 3.0,
+      "torB": 1, "torS": 2, "torE": 3, "torH": 4}
+M3 = {"T": 1051, "x": 235, "y": 0, "z": 234, "tit": 0.1, "b": 0.1, "s": 0.2, "e": 1.5, "t": 0.3, "r": 0.4,
+      "g": 3.0, "tB": 1, "tS": 2, "tE": 3, "tT": 4, "tR": 5}
+
+
+def test_m2_state_names_and_mirrors_the_gripper():
+    state = ArmState.from_feedback("roarm_m2", M2, 1.5)
+    assert state.shoulder == 0.2 and state.gripper == pytest.approx(math.pi - 3.0)
+    assert state.as_list() == [300, 10, 200, 0.1, 0.2, 1.5, state.gripper]
+    assert state.pose[:3] == [300, 10, 200]
+    assert state.torques == (1, 2, 3, 4)
+    assert M2["t"] == 3.0
+    with pytest.raises(AttributeError):
+        state.wrist
+
+
+def test_m3_state_has_pitch_and_missing_torques_are_nan():
+    state = ArmState.from_feedback("roarm_m3", M3)
+    assert state.pitch == 0.1 and state.roll == 0.4
+    assert state.as_list()[:4] == [235, 0, 234, 0.1]
+    assert math.isnan(state.torques[-1]) and math.isnan(state.as_row()[0])
+    assert state.pose[3] == pytest.approx(math.degrees(0.1))
+
+
+def test_states_array_columns():
+    states = [ArmState.from_feedback("roarm_m2", M2, t) for t in (1.0, 2.0)]
+    rows = states_array(states)
+    assert rows.shape == (2, len(state_columns("roarm_m2")))
+    assert np.array_equal(states_array(states, ["timestamp", "elbow"]), [[1.0, 1.5], [2.0, 1.5]])
+    assert states_array([]).shape == (0, 0)
+
+
+def test_state_get_matches_feedback_get():
+    arm = roarm(roarm_type="roarm_m2", transport=SimulatedSerial(VirtualRoarm("roarm_m2")))
+    try:
+        state = arm.state_get()
+        assert state.timestamp is not None
+        assert np.allclose(state.as_list(), arm.feedback_get()[:7])
+    finally:
+        arm.disconnect()
@@ -0,0 +1,72 @@
+# coding=utf-8
+import threading
+
+from roarm_sdk import roarm
+from roarm_sdk.simulator import SimulatedSerial, VirtualRoarm
+from roarm_sdk.state import ArmState
+from roarm_sdk.subscription import Subscription
+
+
+def state(timestamp):
+    return ArmState("roarm_m2", 0.0, 0.0, 0.0, None, [0.0] * 4, [0.0] * 4, timestamp)
+
+
+def test_every_nth_state_is_kept():
+    subscription = Subscription(every=3)
+    for i in range(9):
+        subscription.offer(state(i))
+    assert [s.timestamp for s in subscription.drain()] == [0, 3, 6]
+    assert subscription.stats.as_dict() == {"received": 9, "skipped": 6, "dropped": 0, "delivered": 3}
+
+
+def test_rate_limits_by_receipt_time():
+    subscription = Subscription(rate=10)
+    for i in range(10):
+        subscription.offer(state(i * 0.04))
+    assert [round(s.timestamp, 2) for s in subscription.drain()] == [0, 0.12, 0.24, 0.36]
+
+
+def test_full_queue_drops_the_oldest():
+    subscription = Subscription(maxlen=2)
+    for i in range(5):
+        subscription.offer(state(i))
+    assert [s.timestamp for s in subscription.drain()] == [3, 4]
+    assert subscription.stats.dropped == 3
+
+
+def test_close_ends_the_iterator_after_the_queue():
+    subscription = Subscription()
+    subscription.offer(state(1))
+    subscription.close()
+    assert [s.timestamp for s in subscription] == [1]
+    assert subscription.get(timeout=0) is None
+
+
+def test_callback_runs_on_its_own_thread():
+    called = threading.Event()
+    threads = []
+
+    def callback(s):
+        threads.append(threading.current_thread())
+        called.set()
+
+    subscription = Subscription(callback=callback)
+    subscription.offer(state(1))
+    assert called.wait(1.0)
+    subscription.close()
+    assert threads[0] is not threading.current_thread()
+
+
+def test_subscribers_share_one_stream():
+    arm = roarm(roarm_type="roarm_m2", transport=SimulatedSerial(VirtualRoarm("roarm_m2")), feedback_rate=100)
+    try:
+        first, second = arm.subscribe(), arm.subscribe(every=2)
+        states = [first.get(1.0) for _ in range(6)]
+        assert all(isinstance(s, ArmState) and len(s.radians) == 4 for s in states)
+        assert states[-1].timestamp > states[0].timestamp
+        assert second.get(1.0) is not None
+        first.close()
+        second.close()
+        assert arm.feedback_reader._listeners.get(1051) is None
+    finally:
+        arm.disconnect()
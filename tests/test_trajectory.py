@@ -0,0 +1,60 @@
+# coding=utf-8
+import time
+
+import numpy as np
+
+from roarm_sdk.trajectory import TrajectoryExecutor
+
+
+class Arm(object):
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+
+    def joints_radian_ctrl(self, radians, speed, acc):
+        self.sent.append((time.monotonic(), radians))
+        time.sleep(self.delay)
+
+
+def test_setpoints_follow_the_schedule():
+    arm = Arm()
+    points = [(0.01 * i, np.array([0.01 * i, 0, 1.57, 1])) for i in range(20)]
+    stats = TrajectoryExecutor(arm).run(points)
+    assert stats.sent == 20 and stats.skipped == 0
+    times = np.array([sent[0] for sent in arm.sent])
+    # deadlines are measured from the start, so sleep errors do not add up
+    assert abs(times[-1] - times[0] - 0.19) < 0.02
+    assert all(type(radians) is list and type(radians[0]) is float for _, radians in arm.sent)
+
+
+def test_time_scale_slows_down():
+    arm = Arm()
+    stats = TrajectoryExecutor(arm).run([(0, [0] * 4), (0.05, [0.1] * 4)], time_scale=2)
+    assert stats.duration >= 0.1
+
+
+def test_late_setpoints_are_skipped_but_not_the_last():
+    arm = Arm(delay=0.03)
+    points = [(0.005 * i, [0.01 * i, 0, 1.57, 1]) for i in range(10)]
+    stats = TrajectoryExecutor(arm, skip_late=0.01).run(points)
+    assert stats.skipped > 0
+    assert stats.sent + stats.skipped == 10
+    assert arm.sent[-1][1] == points[-1][1]
+
+
+def test_drag_teach_records_are_accepted():
+    arm = Arm()
+    records = [{"timestamped": 1700000000.0 + 0.01 * i, "radians": [0, 0, 1.57, 1]} for i in range(3)]
+    assert TrajectoryExecutor(arm).run(records).sent == 3
+
+
+def test_stop_ends_the_run():
+    arm = Arm()
+    executor = TrajectoryExecutor(arm)
+
+    def points():
+        for i in range(100):
+            if i == 5:
+                executor.stop()
+            yield 0.001 * i, [0, 0, 1.57, 1]
+    assert executor.run(points()).sent == 5
@@ -0,0 +1,55 @@
+# coding=utf-8
+import threading
+
+import pytest
+
+from roarm_sdk import roarm
+from roarm_sdk.simulator import SimulatedSerial, VirtualRoarm
+from roarm_sdk.utils import RoarmDataException
+
+OUT_OF_RANGE = [10.0, 10.0, 10.0, 10.0]
+
+
+@pytest.fixture
+def arm():
+    arm = roarm(roarm_type="roarm_m2", transport=SimulatedSerial(VirtualRoarm("roarm_m2")))
+    yield arm
+    arm.disconnect()
+
+
+def test_skip_validation_only_skips_the_calling_thread(arm):
+    entered, release = threading.Event(), threading.Event()
+    skipped = []
+
+    def skipping():
+        with arm.skip_validation():
+            skipped.append(arm.joints_radian_ctrl(radians=OUT_OF_RANGE, speed=0, acc=0))
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=skipping)
+    thread.start()
+    try:
+        assert entered.wait(5)
+        with pytest.raises(RoarmDataException):
+            arm.joints_radian_ctrl(radians=OUT_OF_RANGE, speed=0, acc=0)
+    finally:
+        release.set()
+        thread.join(5)
+    assert len(skipped) == 1
+    assert arm.validate
+
+
+def test_skip_validation_restores_checks(arm):
+    with arm.skip_validation():
+        with arm.skip_validation():
+            arm.joints_radian_ctrl(radians=OUT_OF_RANGE, speed=0, acc=0)
+        arm.joints_radian_ctrl(radians=OUT_OF_RANGE, speed=0, acc=0)
+    with pytest.raises(RoarmDataException):
+        arm.joints_radian_ctrl(radians=OUT_OF_RANGE, speed=0, acc=0)
+
+
+def test_validate_off_skips_checks():
+    arm = roarm(roarm_type="roarm_m2", transport=SimulatedSerial(VirtualRoarm("roarm_m2")), validate=False)
+    arm.joints_radian_ctrl(radians=OUT_OF_RANGE, speed=0, acc=0)
+    arm.disconnect()